@@ -0,0 +1,52 @@
+'''Micro-benchmark for UNC to local path mapping
+
+Compares the per-request `Path.is_relative_to` scan against `MountPrefixIndex`.
+
+    python benchmarks/bench_path_index.py
+'''
+import timeit
+from pathlib import Path
+from typing import Dict
+
+from fishsense_data_processing_spider.path_index import MountPrefixIndex
+
+MAPPING: Dict[Path, Path] = {
+    Path('//e4e-nas.ucsd.edu/fishsense_data/REEF/data'):
+        Path('/mnt/fishsense_data_reef/REEF/data'),
+    Path('//e4e-nas.ucsd.edu/fishsense/Fishsense Lite Calibration Parameters'):
+        Path('/mnt/fishsense_lens_cal'),
+    Path('//e4e-nas.ucsd.edu/fishsense_process_work'):
+        Path('/mnt/fishsense_process_work'),
+}
+UNC_PATH = Path('//e4e-nas.ucsd.edu/fishsense_data/REEF/data/2023-05-01/FSL-01/dive_3/'
+                'P5010123.ORF')
+
+
+def relative_to_scan(unc_path: Path) -> Path:
+    """Original implementation"""
+    matching_paths = {
+        volume: mount
+        for volume, mount in MAPPING.items()
+        if unc_path.is_relative_to(volume)
+    }
+    if len(matching_paths) == 0:
+        raise FileNotFoundError(f'{unc_path.parent} not mounted!')
+    volume = list(matching_paths.keys())[0]
+    return matching_paths[volume] / unc_path.relative_to(volume)
+
+
+def main():
+    """Runs the benchmark
+    """
+    index = MountPrefixIndex(MAPPING)
+    assert index.map(UNC_PATH) == relative_to_scan(UNC_PATH)
+    n_runs = 100_000
+    for name, func in (('is_relative_to scan', relative_to_scan),
+                       ('MountPrefixIndex.map', index.map),
+                       ('MountPrefixIndex.split', index.split)):
+        elapsed = min(timeit.repeat(lambda f=func: f(UNC_PATH), number=n_runs, repeat=5))
+        print(f'{name:24s} {elapsed / n_runs * 1e6:8.2f} us/call')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Streamed tar archives"""
+
+import tarfile
+import time
+from typing import Optional
+
+BLOCK_SIZE = tarfile.BLOCKSIZE
+END_OF_ARCHIVE = bytes(2 * BLOCK_SIZE)
+
+
+def member_header(name: str, size: int, mtime: Optional[float] = None) -> bytes:
+    """Builds the header blocks for a regular file member
+
+    The member contents follow the header, then `member_padding(size)`.  This allows members
+    to be written as they are read instead of building the archive in memory.
+
+    Args:
+        name (str): Member name
+        size (int): Member size in bytes
+        mtime (Optional[float], optional): Modification time. Defaults to now.
+
+    Returns:
+        bytes: Header blocks
+    """
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mode = 0o644
+    info.mtime = int(time.time() if mtime is None else mtime)
+    return info.tobuf(format=tarfile.PAX_FORMAT)
+
+
+def member_padding(size: int) -> bytes:
+    """Builds the padding that completes a member's last block
+
+    Args:
+        size (int): Member size in bytes
+
+    Returns:
+        bytes: Zero padding
+    """
+    return bytes(-size % BLOCK_SIZE)
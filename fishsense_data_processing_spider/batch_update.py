@@ -0,0 +1,109 @@
+"""Coalesced Postgres updates"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from psycopg_pool import AsyncConnectionPool
+
+from fishsense_data_processing_spider.metrics import get_histogram
+from fishsense_data_processing_spider.sql_utils import do_query_async
+
+
+class BatchedPathUpdate:
+    """Coalesces per-checksum path updates into one statement per batch
+
+    Updates are collected for up to `max_delay` seconds, or until `max_batch` are pending, then
+    written with a single statement.  The query receives the parallel arrays `cksums` and
+    `unc_paths`.  Callers wait until the batch holding their update is committed.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        query_path: str,
+        *,
+        name: str,
+        max_delay: float = 0.05,
+        max_batch: int = 500,
+    ):
+        self.__pool = pool
+        self.__query_path = query_path
+        self.__name = name
+        self.__max_delay = max_delay
+        self.__max_batch = max_batch
+        self.__pending: Dict[str, Tuple[str, List[asyncio.Future]]] = {}
+        self.__timer: Optional[asyncio.TimerHandle] = None
+        self.__flushes: Set[asyncio.Task] = set()
+        self.__log = logging.getLogger("BatchedPathUpdate")
+
+        self.__batch_size = get_histogram(
+            "batched_update_size",
+            "Rows written per batched update",
+            labelnames=["update"],
+            namespace="e4efs",
+            subsystem="spider",
+            buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+        )
+
+    async def submit(self, checksum: str, unc_path: str) -> None:
+        """Queues an update and waits until it is committed
+
+        A later update for the same checksum in the same batch replaces the earlier one.
+
+        Args:
+            checksum (str): Raw file checksum
+            unc_path (str): New UNC path
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        _, waiters = self.__pending.get(checksum, (None, []))
+        waiters.append(future)
+        self.__pending[checksum] = (unc_path, waiters)
+        if len(self.__pending) >= self.__max_batch:
+            self.__start_flush()
+        elif self.__timer is None:
+            self.__timer = loop.call_later(self.__max_delay, self.__start_flush)
+        await future
+
+    async def flush(self) -> None:
+        """Writes all pending updates and waits for every batch in flight"""
+        self.__start_flush()
+        if self.__flushes:
+            await asyncio.gather(*self.__flushes, return_exceptions=True)
+
+    def __start_flush(self) -> None:
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        if not self.__pending:
+            return
+        batch = self.__pending
+        self.__pending = {}
+        task = asyncio.create_task(self.__write(batch))
+        self.__flushes.add(task)
+        task.add_done_callback(self.__flushes.discard)
+
+    async def __write(self, batch: Dict[str, Tuple[str, List[asyncio.Future]]]) -> None:
+        params = {
+            "cksums": list(batch),
+            "unc_paths": [unc_path for unc_path, _ in batch.values()],
+        }
+        try:
+            async with self.__pool.connection() as con, con.cursor() as cur:
+                await do_query_async(path=self.__query_path, cur=cur, params=params)
+                await con.commit()
+        except Exception as exc:  # pylint: disable=broad-except
+            self.__log.exception("Batched %s update failed", self.__name)
+            result = exc
+        else:
+            result = None
+            self.__batch_size.labels(update=self.__name).observe(len(batch))
+        for _, waiters in batch.values():
+            for waiter in waiters:
+                if waiter.done():
+                    continue
+                if result is None:
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(result)
@@ -0,0 +1,164 @@
+"""Response blobs"""
+
+import asyncio
+import re
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+
+BYTE_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(ValueError):
+    """Requested byte range lies outside the blob"""
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parses a single range `Range` header
+
+    Multiple ranges and malformed headers are ignored, as permitted by RFC 9110, so that the
+    caller falls back to sending the whole blob.
+
+    Args:
+        header (Optional[str]): Range header value
+        size (int): Blob size
+
+    Raises:
+        RangeNotSatisfiable: Range does not overlap the blob
+
+    Returns:
+        Optional[Tuple[int, int]]: Start and stop offsets, stop exclusive, or None to send the
+        whole blob
+    """
+    if not header:
+        return None
+    match = BYTE_RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - suffix, 0), size
+    start = int(first)
+    stop = size if not last else int(last) + 1
+    if last and stop <= start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, min(stop, size)
+
+
+class Blob:
+    """File contents destined for a client, held in memory or streamed from disk
+
+    File backed blobs are read in chunks on an executor so that the event loop never blocks on
+    disk or network storage and only one chunk per response is held in memory.
+    """
+
+    def __init__(self, size: int, *, data: Optional[bytes] = None, path: Optional[Path] = None):
+        if (data is None) == (path is None):
+            raise ValueError("Exactly one of data and path is required")
+        self.__size = size
+        self.__data = data
+        self.__path = path
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Blob":
+        """Creates an in-memory blob
+
+        Args:
+            data (bytes): Contents
+
+        Returns:
+            Blob: Blob
+        """
+        return cls(len(data), data=data)
+
+    @classmethod
+    def from_file(cls, path: Path, max_size: Optional[int] = None) -> "Blob":
+        """Creates a file backed blob
+
+        Args:
+            path (Path): File path
+            max_size (Optional[int], optional): Maximum number of bytes to send. Defaults to
+            None.
+
+        Raises:
+            FileNotFoundError: File not found
+
+        Returns:
+            Blob: Blob
+        """
+        if not path.is_file():
+            raise FileNotFoundError(f"{path} not found!")
+        size = path.stat().st_size
+        if max_size is not None:
+            size = min(size, max_size)
+        return cls(size, path=path)
+
+    @property
+    def size(self) -> int:
+        """Number of bytes"""
+        return self.__size
+
+    @property
+    def path(self) -> Optional[Path]:
+        """Backing file, if any"""
+        return self.__path
+
+    def read(self) -> bytes:
+        """Reads the entire blob
+
+        Returns:
+            bytes: Contents
+        """
+        if self.__data is not None:
+            return self.__data
+        with open(self.__path, "rb") as handle:
+            return handle.read(self.__size)
+
+    async def iter_chunks(
+        self,
+        chunk_size: int,
+        executor: Optional[Executor] = None,
+        *,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """Yields the contents in chunks
+
+        Args:
+            chunk_size (int): Maximum chunk size
+            executor (Optional[Executor], optional): Executor for file reads. Defaults to the
+            event loop's default executor.
+            start (int, optional): First byte offset. Defaults to 0.
+            stop (Optional[int], optional): Offset to stop before. Defaults to the blob size.
+
+        Yields:
+            bytes: Next chunk
+        """
+        stop = self.__size if stop is None else min(stop, self.__size)
+        if self.__data is not None:
+            for offset in range(start, stop, chunk_size):
+                yield self.__data[offset : min(offset + chunk_size, stop)]
+            return
+        loop = asyncio.get_running_loop()
+        handle = await loop.run_in_executor(executor, open, self.__path, "rb")
+        try:
+            if start:
+                await loop.run_in_executor(executor, handle.seek, start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = await loop.run_in_executor(
+                    executor, handle.read, min(chunk_size, remaining)
+                )
+                if not chunk:
+                    raise IOError(f"{self.__path} was truncated while reading")
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            handle.close()
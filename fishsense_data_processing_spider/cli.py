@@ -25,6 +25,11 @@ def _set_api_key_perms(key: str, permission: str, value: bool):
         value
     )
 
+def _list_api_keys():
+    keys = rpyc.connect('localhost', 18861).root.list_api_keys()
+    for key_hash, (comment, perms) in keys.items():
+        print(f'{key_hash} {comment}: {", ".join(perms)}')
+
 def main():
     """Main entry point
     """
@@ -34,6 +39,7 @@ def main():
 
     __get_api_key_setup(subparsers)
     __set_api_key_perms_setup(subparsers)
+    __list_api_keys_setup(subparsers)
 
     arg_dict = vars(parser.parse_args())
     arg_fn = arg_dict.pop('func')
@@ -75,5 +81,10 @@ def __set_api_key_perms_setup(subparsers: argparse._SubParsersAction[argparse.Ar
     )
     parser.set_defaults(func=_set_api_key_perms)
 
+
+def __list_api_keys_setup(subparsers: argparse._SubParsersAction[argparse.ArgumentParser]):
+    parser = subparsers.add_parser('list_api_keys')
+    parser.set_defaults(func=_list_api_keys)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,112 @@
+"""Response compression"""
+
+import zlib
+from typing import Optional, Tuple
+
+from tornado import httputil
+from tornado.web import OutputTransform
+
+# Preferred first when the client weights them equally
+ENCODINGS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Picks a content coding from an `Accept-Encoding` header
+
+    Args:
+        accept_encoding (str): Accept-Encoding value
+
+    Returns:
+        Optional[str]: Preferred supported coding, or None to send the response as is
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding == "*":
+            for encoding in ENCODINGS:
+                weights.setdefault(encoding, weight)
+        elif coding in ENCODINGS:
+            weights[coding] = weight
+    candidates = [encoding for encoding in ENCODINGS if weights.get(encoding, 0) > 0]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda encoding: weights[encoding])
+
+
+class CompressedJsonEncoding(OutputTransform):
+    """Applies gzip or deflate content coding to JSON and text responses
+
+    Unlike Tornado's `GZipContentEncoding`, this negotiates deflate as well as gzip, and the
+    size threshold and compression level are configurable.  Responses written in multiple
+    chunks are compressed regardless of size, as their size is not known up front.
+    """
+
+    CONTENT_TYPES = {"application/json"}
+    LEVEL = 6
+    MIN_LENGTH = 1024
+
+    def __init__(
+        self,
+        request: httputil.HTTPServerRequest,
+        *,
+        level: Optional[int] = None,
+        min_length: Optional[int] = None,
+    ) -> None:
+        self.__encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+        self.__level = self.LEVEL if level is None else level
+        self.__min_length = self.MIN_LENGTH if min_length is None else min_length
+        self.__compressor: Optional["zlib._Compress"] = None
+
+    def _compressible_type(self, ctype: str) -> bool:
+        return ctype.startswith("text/") or ctype in self.CONTENT_TYPES
+
+    def transform_first_chunk(
+        self,
+        status_code: int,
+        headers: httputil.HTTPHeaders,
+        chunk: bytes,
+        finishing: bool,
+    ) -> Tuple[int, httputil.HTTPHeaders, bytes]:
+        if "Vary" in headers:
+            headers["Vary"] += ", Accept-Encoding"
+        else:
+            headers["Vary"] = "Accept-Encoding"
+        ctype = headers.get("Content-Type", "").split(";")[0].strip()
+        if (
+            self.__encoding is None
+            or not self._compressible_type(ctype)
+            or (finishing and len(chunk) < self.__min_length)
+            or "Content-Encoding" in headers
+        ):
+            return status_code, headers, chunk
+        headers["Content-Encoding"] = self.__encoding
+        self.__compressor = zlib.compressobj(
+            self.__level, zlib.DEFLATED, ENCODINGS[self.__encoding]
+        )
+        chunk = self.transform_chunk(chunk, finishing)
+        if "Content-Length" in headers:
+            if finishing:
+                headers["Content-Length"] = str(len(chunk))
+            else:
+                del headers["Content-Length"]
+        return status_code, headers, chunk
+
+    def transform_chunk(self, chunk: bytes, finishing: bool) -> bytes:
+        if self.__compressor is None:
+            return chunk
+        chunk = self.__compressor.compress(chunk)
+        if finishing:
+            return chunk + self.__compressor.flush()
+        return chunk + self.__compressor.flush(zlib.Z_SYNC_FLUSH)
@@ -109,6 +109,36 @@ validators = [
         cast=str,
         default='postgres'
     ),
+    Validator(
+        'postgres.pool_min_size',
+        cast=int,
+        default=2
+    ),
+    Validator(
+        'postgres.pool_max_size',
+        cast=int,
+        default=16
+    ),
+    Validator(
+        'postgres.pool_timeout',
+        cast=parse_timespan,
+        default='30s'
+    ),
+    Validator(
+        'postgres.pool_max_idle',
+        cast=parse_timespan,
+        default='10m'
+    ),
+    Validator(
+        'postgres.pool_max_lifetime',
+        cast=parse_timespan,
+        default='1h'
+    ),
+    Validator(
+        'postgres.pool_check',
+        cast=bool,
+        default=True
+    ),
     Validator(
         'exiftool.path',
         required=True,
@@ -128,20 +158,105 @@ validators = [
         'label_studio.api_key',
         cast=str
     ),
+    Validator(
+        'label_studio.image_width',
+        cast=int,
+        default=1920
+    ),
+    Validator(
+        'label_studio.image_quality',
+        cast=int,
+        default=85
+    ),
     Validator(
         'web_api.key_store',
         cast=Path
     ),
+    Validator(
+        'web_api.key_cache_ttl',
+        cast=parse_timespan,
+        default='1m'
+    ),
+    Validator(
+        'web_api.key_cache_size',
+        cast=int,
+        default=10000
+    ),
+    Validator(
+        'web_api.key_hash_workers',
+        cast=int,
+        default=2
+    ),
     Validator(
         'orchestrator.reaper_interval',
         cast=lambda x: dt.timedelta(seconds=parse_timespan(x)),
         default='5m'
     ),
+    Validator(
+        'orchestrator.max_long_poll',
+        cast=parse_timespan,
+        default='60s'
+    ),
+    Validator(
+        'orchestrator.long_poll_recheck',
+        cast=parse_timespan,
+        default='15s'
+    ),
     Validator(
         'data_model.max_load_size',
         cast=parse_size,
         default='20M'
     ),
+    Validator(
+        'data_model.path_cache_size',
+        cast=int,
+        default=100000
+    ),
+    Validator(
+        'data_model.path_cache_ttl',
+        cast=parse_timespan,
+        default='1h'
+    ),
+    Validator(
+        'data_model.unknown_checksum_ttl',
+        cast=parse_timespan,
+        default='1m'
+    ),
+    Validator(
+        'data_model.io_workers',
+        cast=int,
+        default=8
+    ),
+    Validator(
+        'data_model.path_update_delay',
+        cast=parse_timespan,
+        default='50ms'
+    ),
+    Validator(
+        'data_model.path_update_batch_size',
+        cast=int,
+        default=500
+    ),
+    Validator(
+        'data_model.derivative_workers',
+        cast=int,
+        default=2
+    ),
+    Validator(
+        'data_model.derivative_widths',
+        cast=lambda x: sorted(int(width) for width in x),
+        default=[320, 640, 1280, 1920]
+    ),
+    Validator(
+        'data_model.derivative_qualities',
+        cast=lambda x: sorted(int(quality) for quality in x),
+        default=[60, 75, 85]
+    ),
+    Validator(
+        'data_model.derivative_default_quality',
+        cast=int,
+        default=75
+    ),
     Validator(
         'data_model.preprocess_jpg_store',
         cast=Path
@@ -154,6 +269,46 @@ validators = [
         'data_model.debug_data_store',
         cast=Path
     ),
+    Validator(
+        'web_api.stream_chunk_size',
+        cast=parse_size,
+        default='1M'
+    ),
+    Validator(
+        'web_api.max_jpeg_upload_size',
+        cast=parse_size,
+        default='32M'
+    ),
+    Validator(
+        'web_api.max_debug_upload_size',
+        cast=parse_size,
+        default='2G'
+    ),
+    Validator(
+        'web_api.max_batch_checksums',
+        cast=int,
+        default=5000
+    ),
+    Validator(
+        'web_api.archive_prefetch',
+        cast=int,
+        default=8
+    ),
+    Validator(
+        'web_api.compress_min_size',
+        cast=parse_size,
+        default='1K'
+    ),
+    Validator(
+        'web_api.compress_level',
+        cast=int,
+        default=6
+    ),
+    Validator(
+        'web_api.processes',
+        cast=int,
+        default=1
+    ),
     Validator(
         'web_api.root_url',
         cast=str,
@@ -168,6 +323,32 @@ validators = [
         'cache.max_storage_mb',
         cast=parse_size,
         default='2G'
+    ),
+    Validator(
+        'cache.content_addressed',
+        cast=bool,
+        default=True
+    ),
+    Validator(
+        'cache.memory_max_storage',
+        cast=parse_size,
+        default='256M'
+    ),
+    Validator(
+        'cache.memory_max_blob_size',
+        cast=parse_size,
+        default='4M'
+    ),
+    Validator(
+        'limits',
+        default={
+            'getRawFile': {
+                'concurrency': 64,
+                'queue': 256,
+                'key_concurrency': 16,
+                'key_queue': 64
+            }
+        }
     )
 ]
 
@@ -1,33 +1,81 @@
 """Data Model"""
 
+import asyncio
+import contextvars
+import functools
+import hashlib
 import logging
+import os
+import threading
 import uuid
+from collections import deque
+from concurrent.futures import Executor
 from pathlib import Path
-from typing import Any, Collection, Dict, List, Optional
+from typing import (Any, AsyncIterator, Callable, Collection, Deque, Dict,
+                    Hashable, Iterable, List, Optional, Tuple, TypeVar)
 
-import psycopg
-from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
 
-from fishsense_data_processing_spider.file_cache import FileCache
-from fishsense_data_processing_spider.sql_utils import do_query
+from fishsense_data_processing_spider.batch_update import BatchedPathUpdate
+from fishsense_data_processing_spider.blob import Blob
+from fishsense_data_processing_spider.derivatives import (derivative_artifact,
+                                                          render_jpeg)
+from fishsense_data_processing_spider.events import EventBus
+from fishsense_data_processing_spider.file_cache import (CacheArtifact,
+                                                         CacheKey, FileCache)
+from fishsense_data_processing_spider.memory_cache import MemoryCache, TTLCache
+from fishsense_data_processing_spider.path_index import MountPrefixIndex
+from fishsense_data_processing_spider.sql_utils import do_query, do_query_async
+from fishsense_data_processing_spider.timing import phase
+from fishsense_data_processing_spider.upload import UploadSpool
+
+_UNRESOLVED = object()
+
+# Checksums per cache event, which keeps each event well under the NOTIFY payload limit
+_EVENT_CHECKSUMS = 100
+
+T = TypeVar("T")
 
 
 class DataModel:
-    """Postgres Data Model"""
+    """Postgres Data Model
+
+    Methods suffixed with `_async` query Postgres through the async pool so that web handlers
+    do not block the event loop while waiting on the database.
+
+    When serving from several processes, cache invalidations and cache admin operations are
+    published on the event bus and applied by every other process as well.
+    """
 
     def __init__(
         self,
         data_path_mapping: Dict[Path, Path],
-        pg_conn_str: str,
+        pg_pool: ConnectionPool,
         preprocess_jpeg_path: Path,
         preprocess_laser_jpeg_path: Path,
         debug_data_path: Path,
         *,
+        async_pg_pool: AsyncConnectionPool,
         max_raw_data_file_size: int = 20_000_000,
         bad_query_handler: Collection[logging.Handler] = [],
+        content_addressed_cache: bool = True,
+        memory_cache: Optional[MemoryCache] = None,
+        path_cache: Optional[TTLCache] = None,
+        digest_cache: Optional[TTLCache] = None,
+        unknown_checksum_ttl: float = 60.0,
+        io_executor: Optional[Executor] = None,
+        path_update_delay: float = 0.05,
+        path_update_batch_size: int = 500,
+        derivative_executor: Optional[Executor] = None,
+        derivative_widths: Collection[int] = (320, 640, 1280, 1920),
+        derivative_qualities: Collection[int] = (60, 75, 85),
+        event_bus: Optional[EventBus] = None,
     ):
+        # pylint: disable=too-many-arguments
         self._data_path_mapping = data_path_mapping
-        self._pg_conn = pg_conn_str
+        self._mount_index = MountPrefixIndex(data_path_mapping)
+        self._pg_pool = pg_pool
+        self._async_pg_pool = async_pg_pool
         self._log = logging.getLogger("DataModel")
         self.__bad_query_handler = logging.getLogger("DataModelBadQuery")
         for handler in bad_query_handler:
@@ -37,6 +85,46 @@ class DataModel:
         self._preprocess_jpg_store = preprocess_jpeg_path
         self._preprocess_laser_jpg_store = preprocess_laser_jpeg_path
         self._debug_data_path = debug_data_path
+        self._content_addressed_cache = content_addressed_cache
+        self._memory_cache = memory_cache
+        self._path_cache = path_cache
+        self._digest_cache = digest_cache
+        # Advanced whenever an artifact changes, so that a digest computed concurrently with the
+        # change is not cached
+        self._digest_epoch = 0
+        self._digest_epoch_lock = threading.Lock()
+        self._unknown_checksum_ttl = unknown_checksum_ttl
+        self._io_executor = io_executor
+        self._derivative_executor = derivative_executor
+        self._derivative_widths = frozenset(derivative_widths)
+        self._derivative_qualities = frozenset(derivative_qualities)
+        self._derivative_renders: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._event_bus = event_bus
+        if event_bus is not None:
+            event_bus.subscribe("artifact_invalidated", self.__on_artifact_invalidated)
+            event_bus.subscribe("paths_invalidated", self.__on_paths_invalidated)
+            event_bus.subscribe("cache_warmed", self.__on_cache_warmed)
+            event_bus.subscribe("cache_pinned", self.__on_cache_pinned)
+            event_bus.subscribe(EventBus.RESYNC, self.__on_resync)
+        self._path_updates = {
+            artifact: BatchedPathUpdate(
+                async_pg_pool,
+                query_path,
+                name=artifact.value,
+                max_delay=path_update_delay,
+                max_batch=path_update_batch_size,
+            )
+            for artifact, query_path in (
+                (
+                    CacheArtifact.PREPROCESS_JPEG,
+                    "sql/update_preprocess_jpeg_paths.sql",
+                ),
+                (
+                    CacheArtifact.PREPROCESS_LASER_JPEG,
+                    "sql/update_preprocess_laser_jpeg_paths.sql",
+                ),
+            )
+        }
 
     def get_lens_cal_bytes(self, camera_id: int) -> bytes:
         """Retrieves the lens calibration package
@@ -50,24 +138,46 @@ class DataModel:
         Returns:
             bytes: Lens calibration package bytes
         """
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path="sql/select_camera_lens_cal_unc_by_id.sql",
                 cur=cur,
                 params={"camera_id": camera_id},
             )
             result = cur.fetchone()
+        return self._open_lens_cal(camera_id, result).read()
+
+    async def get_lens_cal_blob_async(self, camera_id: int) -> Blob:
+        """Retrieves the lens calibration package
+
+        Args:
+            camera_id (int): Camera ID
+
+        Raises:
+            KeyError: Camera ID not found
+
+        Returns:
+            Blob: Lens calibration package
+        """
+        async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(
+                path="sql/select_camera_lens_cal_unc_by_id.sql",
+                cur=cur,
+                params={"camera_id": camera_id},
+            )
+            result = await cur.fetchone()
+        return await self._run_io(self._open_lens_cal, camera_id, result)
+
+    def _open_lens_cal(self, camera_id: int, result: Optional[Dict[str, Any]]) -> Blob:
         if result is None:
             raise KeyError(f"{camera_id} is not a recognized camera")
         path = Path(result["path"])
+        cache_key = ("lens_cal", path.as_posix())
+        data = self._get_memory_cached(cache_key)
+        if data is not None:
+            return Blob.from_bytes(data)
         local_path = self.map_cache_path(path)
-        if not local_path.is_file():
-            raise FileNotFoundError(f"{local_path} not found!")
-
-        with open(local_path, "rb") as handle:
-            return handle.read(self._max_raw_data_size)
+        return self._open_file(local_path, cache_key=cache_key)
 
     def get_raw_file_bytes(self, checksum: str) -> bytes:
         """Retrieves the raw file bytes
@@ -84,12 +194,139 @@ class DataModel:
             bytes: Raw file bytes
         """
         path = self.verify_raw_checksum(checksum)
-        local_path = self.map_cache_path(path)
-        if not local_path.is_file():
-            raise FileNotFoundError(f"{local_path} not found!")
+        local_path = self.map_cache_path(path, checksum=checksum)
+        return self._open_file(local_path).read()
+
+    async def get_raw_file_blob_async(self, checksum: str) -> Blob:
+        """Retrieves the raw file
 
-        with open(local_path, "rb") as handle:
-            return handle.read(self._max_raw_data_size)
+        Args:
+            checksum (str): Checksum of raw file
+
+        Raises:
+            KeyError: Checksum not found
+            FileNotFoundError: Mount not found
+            FileNotFoundError: File not found
+
+        Returns:
+            Blob: Raw file
+        """
+        path = await self.verify_raw_checksum_async(checksum)
+        return await self._run_io(self._open_raw_file, checksum, path)
+
+    async def iter_raw_file_blobs_async(
+        self, checksums: Iterable[str], prefetch: int
+    ) -> AsyncIterator[Tuple[str, Optional[Path], Optional[Blob]]]:
+        """Opens many raw files, yielding them in request order
+
+        Paths are resolved with one query.  Up to `prefetch` files are copied into the cache and
+        opened ahead of the consumer on the I/O executor, so that NAS reads overlap.  Only
+        file backed blobs are held, never file contents.
+
+        Args:
+            checksums (Iterable[str]): Raw file checksums
+            prefetch (int): Number of files to open ahead of the consumer
+
+        Yields:
+            Tuple[str, Optional[Path], Optional[Blob]]: Checksum, UNC path if the checksum is
+            recognized, and the raw file if it could be opened
+        """
+        checksums = list(dict.fromkeys(checksums))
+        unc_paths = await self.warm_path_cache_async(checksums)
+        loop = asyncio.get_running_loop()
+        queue = iter(checksums)
+        pending: Deque[Tuple[str, asyncio.Future]] = deque()
+
+        def submit() -> None:
+            checksum = next(queue, None)
+            if checksum is None:
+                return
+            unc_path = unc_paths.get(checksum)
+            if unc_path is None:
+                future = loop.create_future()
+                future.set_result(None)
+            else:
+                future = asyncio.ensure_future(
+                    self._run_io(self._open_raw_file, checksum, unc_path)
+                )
+            pending.append((checksum, future))
+
+        for _ in range(max(prefetch, 1)):
+            submit()
+        try:
+            while pending:
+                checksum, future = pending.popleft()
+                submit()
+                try:
+                    blob = await future
+                except FileNotFoundError as exc:
+                    self._log.warning("Could not open %s: %s", checksum, exc)
+                    blob = None
+                yield checksum, unc_paths.get(checksum), blob
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def _open_raw_file(self, checksum: str, unc_path: Path) -> Blob:
+        local_path = self.map_cache_path(unc_path, checksum=checksum)
+        return self._open_file(local_path)
+
+    async def get_job_checksums_async(self, job_id: uuid.UUID) -> List[str]:
+        """Lists the frames assigned to a job
+
+        Args:
+            job_id (uuid.UUID): Job ID
+
+        Returns:
+            List[str]: Raw file checksums
+        """
+        async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(
+                path="sql/select_cksums_by_job_id.sql",
+                cur=cur,
+                params={"job_id": job_id},
+            )
+            return [row["cksum"] for row in await cur.fetchall()]
+
+    def _get_memory_cached(self, cache_key: Hashable) -> Optional[bytes]:
+        if self._memory_cache is None:
+            return None
+        return self._memory_cache.get(cache_key)
+
+    async def _run_io(self, func: Callable[..., T], *args: Any) -> T:
+        # The context is copied so that phases entered on the executor count against the request
+        return await asyncio.get_running_loop().run_in_executor(
+            self._io_executor, contextvars.copy_context().run, func, *args
+        )
+
+    def _open_file(self, local_path: Path, cache_key: Optional[Hashable] = None) -> Blob:
+        """Opens a file, up to the max raw data size
+
+        If a key is given and the file is small enough for the memory cache, the file is read
+        and offered to the memory cache.  Otherwise the returned blob streams from disk.
+
+        Args:
+            local_path (Path): Local or cache path
+            cache_key (Optional[Hashable], optional): Memory cache key. Defaults to None.
+
+        Raises:
+            FileNotFoundError: File not found
+
+        Returns:
+            Blob: File contents
+        """
+        with phase("fs_open"):
+            blob = Blob.from_file(local_path, max_size=self._max_raw_data_size)
+        if (
+            cache_key is None
+            or self._memory_cache is None
+            or blob.size > self._memory_cache.max_blob_size
+        ):
+            return blob
+        with phase("fs_read"):
+            data = blob.read()
+        self._memory_cache.put(cache_key, data)
+        return Blob.from_bytes(data)
 
     def verify_raw_checksum(self, checksum: str) -> Path:
         """Verifies the raw checksum
@@ -103,24 +340,141 @@ class DataModel:
         Returns:
             Path: UNC path to raw file
         """
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
-            do_query(
-                path="sql/select_unc_path_by_cksum.sql",
-                cur=cur,
-                params={"cksum": checksum},
+        unc_path = self._lookup_unc_path(checksum)
+        if unc_path is _UNRESOLVED:
+            with self._pg_pool.connection() as con, con.cursor() as cur:
+                do_query(
+                    path="sql/select_unc_path_by_cksum.sql",
+                    cur=cur,
+                    params={"cksum": checksum},
+                )
+                unc_path = self._store_unc_path(checksum, cur.fetchone())
+        return self._get_unc_path(checksum, unc_path)
+
+    async def verify_raw_checksum_async(self, checksum: str) -> Path:
+        """Verifies the raw checksum
+
+        Args:
+            checksum (str): Raw file checksum
+
+        Raises:
+            KeyError: Checksum does not exist
+
+        Returns:
+            Path: UNC path to raw file
+        """
+        unc_path = self._lookup_unc_path(checksum)
+        if unc_path is _UNRESOLVED:
+            async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+                await do_query_async(
+                    path="sql/select_unc_path_by_cksum.sql",
+                    cur=cur,
+                    params={"cksum": checksum},
+                )
+                unc_path = self._store_unc_path(checksum, await cur.fetchone())
+        return self._get_unc_path(checksum, unc_path)
+
+    def _lookup_unc_path(self, checksum: str) -> Any:
+        if self._path_cache is None:
+            return _UNRESOLVED
+        return self._path_cache.get(checksum, _UNRESOLVED)
+
+    def _store_unc_path(
+        self, checksum: str, result: Optional[Dict[str, Any]]
+    ) -> Optional[Path]:
+        unc_path = None if result is None else Path(result["path"])
+        if self._path_cache is not None:
+            self._path_cache.put(
+                checksum,
+                unc_path,
+                ttl=self._unknown_checksum_ttl if unc_path is None else None,
             )
-            result = cur.fetchone()
-        if result is None:
+        return unc_path
+
+    def _get_unc_path(self, checksum: str, unc_path: Optional[Path]) -> Path:
+        if unc_path is None:
             self.__bad_query_handler.error("%s is not a recognized checksum", checksum)
             raise KeyError(f"{checksum} is not a recognized checksum")
-        path = Path(result["path"])
-        return path
+        return unc_path
+
+    def warm_path_cache(self, checksums: Iterable[str]) -> Dict[str, Path]:
+        """Resolves many checksums with one query and stores the results in the path cache
+
+        Checksums that do not resolve are cached as unknown.
+
+        Args:
+            checksums (Iterable[str]): Raw file checksums
+
+        Returns:
+            Dict[str, Path]: UNC paths of the checksums that resolved
+        """
+        checksums = list(set(checksums))
+        with self._pg_pool.connection() as con, con.cursor() as cur:
+            do_query(
+                path="sql/select_unc_paths_by_cksums.sql",
+                cur=cur,
+                params={"cksums": checksums},
+            )
+            results = {row["cksum"]: row for row in cur.fetchall()}
+        unc_paths: Dict[str, Path] = {}
+        for checksum in checksums:
+            unc_path = self._store_unc_path(checksum, results.get(checksum))
+            if unc_path is not None:
+                unc_paths[checksum] = unc_path
+        return unc_paths
+
+    async def warm_path_cache_async(self, checksums: Iterable[str]) -> Dict[str, Path]:
+        """Resolves many checksums with one query and stores the results in the path cache
+
+        Checksums that do not resolve are cached as unknown.
+
+        Args:
+            checksums (Iterable[str]): Raw file checksums
+
+        Returns:
+            Dict[str, Path]: UNC paths of the checksums that resolved
+        """
+        checksums = list(set(checksums))
+        async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(
+                path="sql/select_unc_paths_by_cksums.sql",
+                cur=cur,
+                params={"cksums": checksums},
+            )
+            results = {row["cksum"]: row for row in await cur.fetchall()}
+        unc_paths: Dict[str, Path] = {}
+        for checksum in checksums:
+            unc_path = self._store_unc_path(checksum, results.get(checksum))
+            if unc_path is not None:
+                unc_paths[checksum] = unc_path
+        return unc_paths
+
+    def invalidate_path_cache(self, checksum: Optional[str] = None) -> None:
+        """Drops cached checksum resolutions
+
+        Call this when image paths or `ignore` flags change.
+
+        Args:
+            checksum (Optional[str], optional): Checksum to drop. Defaults to None, which drops
+            every entry.
+        """
+        self._invalidate_path_cache(checksum)
+        if self._event_bus is not None:
+            self._event_bus.publish("paths_invalidated", checksum=checksum)
+
+    def _invalidate_path_cache(self, checksum: Optional[str]) -> None:
+        if self._path_cache is None:
+            return
+        if checksum is None:
+            self._path_cache.clear()
+        else:
+            self._path_cache.invalidate(checksum)
 
     def map_local_path(self, unc_path: Path) -> Path:
         """Map UNC path to local path
 
+        The deepest mounted volume containing the path is used.
+
         Args:
             unc_path (Path): UNC path
 
@@ -131,29 +485,26 @@ class DataModel:
         Returns:
             Path: Local path
         """
-        matching_paths = {
-            volume: mount
-            for volume, mount in self._data_path_mapping.items()
-            if unc_path.is_relative_to(volume)
-        }
-        if len(matching_paths) == 0:
-            raise FileNotFoundError(f"{unc_path.parent} not mounted!")
-        if len(matching_paths) > 1:
-            self._log.warning("Multiple mounts found! %s", matching_paths)
-        volume = list(matching_paths.keys())[0]
-        mount = matching_paths[volume]
-        local_path = mount / unc_path.relative_to(volume)
-        self._log.debug("path: %s", unc_path.as_posix())
-        self._log.debug("volume: %s", volume.as_posix())
-        self._log.debug("mount: %s", mount.as_posix())
-        self._log.debug("local_path: %s", local_path.as_posix())
+        local_path = self._mount_index.map(unc_path)
+        self._log.debug("%s mapped to %s", unc_path, local_path)
         return local_path
 
-    def map_cache_path(self, unc_path: Path) -> Path:
+    def map_cache_path(
+        self,
+        unc_path: Path,
+        *,
+        checksum: Optional[str] = None,
+        artifact: CacheArtifact = CacheArtifact.RAW,
+    ) -> Path:
         """Map UNC path to cache path
 
+        If a checksum is provided and the content-addressed cache is enabled, the file is cached
+        by checksum and artifact type instead of by its local path.
+
         Args:
             unc_path (Path): UNC path
+            checksum (Optional[str], optional): Raw file checksum. Defaults to None.
+            artifact (CacheArtifact, optional): Artifact type. Defaults to CacheArtifact.RAW.
 
         Raises:
             FileNotFoundError: Volume not mounted
@@ -162,30 +513,577 @@ class DataModel:
         Returns:
             Path: Cache path
         """
-        file_cache = FileCache.instance
+        file_cache = FileCache.get_instance()
 
         local_path = self.map_local_path(unc_path)
-        cache_path = file_cache.get_cached_file(local_path)
+        if checksum is not None and self._content_addressed_cache:
+            cache_path = file_cache.get_cached_blob(
+                checksum=checksum, source=local_path, artifact=artifact
+            )
+        else:
+            cache_path = file_cache.get_cached_file(local_path)
 
         self._log.debug("cache_path: %s", cache_path.as_posix())
 
         return cache_path
 
-    def put_preprocess_jpeg(self, checksum: str, data: bytes) -> None:
-        """Put Preprocessed JPEG
+    def invalidate_cache(self, unc_path: Path, checksum: str, artifact: CacheArtifact) -> None:
+        """Removes any cached copy of the given file
+
+        Args:
+            unc_path (Path): UNC path
+            checksum (str): Raw file checksum
+            artifact (CacheArtifact): Artifact type
+        """
+        self._invalidate_cache(unc_path, checksum, artifact)
+        if self._event_bus is not None:
+            self._event_bus.publish(
+                "artifact_invalidated",
+                path=unc_path.as_posix(),
+                checksum=checksum,
+                artifact=artifact.value,
+            )
+
+    def _invalidate_cache(self, unc_path: Path, checksum: str, artifact: CacheArtifact) -> None:
+        if artifact != CacheArtifact.RAW:
+            with self._digest_epoch_lock:
+                self._digest_epoch += 1
+            if self._digest_cache is not None:
+                self._digest_cache.invalidate((checksum, artifact))
+        if self._memory_cache is not None:
+            self._memory_cache.invalidate((checksum, artifact))
+        file_cache = FileCache.get_instance()
+        file_cache.remove_blob_from_cache(checksum=checksum, artifact=artifact)
+        if artifact != CacheArtifact.RAW:
+            for width in self._derivative_widths:
+                for quality in self._derivative_qualities:
+                    variant = derivative_artifact(artifact, width, quality)
+                    if self._memory_cache is not None:
+                        self._memory_cache.invalidate((checksum, variant))
+                    file_cache.remove_blob_from_cache(checksum=checksum, artifact=variant)
+        file_cache.remove_from_cache(self.map_local_path(unc_path))
+
+    def _get_artifact_unc_path(self, checksum: str, artifact: CacheArtifact) -> Path:
+        """Resolves the UNC path of a checksum's artifact
+
+        Args:
+            checksum (str): Raw file checksum
+            artifact (CacheArtifact): Artifact type
+
+        Raises:
+            KeyError: Checksum does not exist
+
+        Returns:
+            Path: UNC path
+        """
+        unc_path = self.verify_raw_checksum(checksum)
+        if artifact == CacheArtifact.RAW:
+            return unc_path
+        return self._get_artifact_store_path(checksum, artifact)
+
+    def _get_artifact_store_path(self, checksum: str, artifact: CacheArtifact) -> Path:
+        """Resolves the UNC path of a preprocessed artifact in its store
+
+        Args:
+            checksum (str): Raw file checksum
+            artifact (CacheArtifact): Preprocessed artifact type
+
+        Raises:
+            ValueError: Artifact is not stored by the spider
+
+        Returns:
+            Path: UNC path
+        """
+        if artifact == CacheArtifact.PREPROCESS_JPEG:
+            return self._preprocess_jpg_store / (checksum + ".JPG")
+        if artifact == CacheArtifact.PREPROCESS_LASER_JPEG:
+            return self._preprocess_laser_jpg_store / (checksum + ".JPG")
+        raise ValueError(f"{artifact} is not a stored artifact")
+
+    def _get_cache_entries(
+        self, checksums: List[str], artifact: CacheArtifact, unc_paths: Dict[str, Path]
+    ) -> Tuple[Dict[CacheKey, Path], List[str]]:
+        entries: Dict[CacheKey, Path] = {}
+        unknown: List[str] = []
+        for checksum in checksums:
+            try:
+                local_path = self.map_local_path(
+                    self._get_resolved_artifact_path(checksum, artifact, unc_paths)
+                )
+                if self._content_addressed_cache:
+                    key = FileCache.get_blob_key(checksum, artifact)
+                else:
+                    key = local_path
+            except (KeyError, ValueError, FileNotFoundError):
+                unknown.append(checksum)
+                continue
+            entries[key] = local_path
+        return entries, unknown
+
+    def _get_resolved_artifact_path(
+        self, checksum: str, artifact: CacheArtifact, unc_paths: Dict[str, Path]
+    ) -> Path:
+        # Like `_get_artifact_unc_path`, but with raw paths already resolved in bulk
+        unc_path = self._get_unc_path(checksum, unc_paths.get(checksum))
+        if artifact == CacheArtifact.RAW:
+            return unc_path
+        return self._get_artifact_store_path(checksum, artifact)
+
+    def warm_cache(
+        self, checksums: Iterable[str], artifact: CacheArtifact = CacheArtifact.RAW
+    ) -> Dict[str, List[str]]:
+        """Queues the given checksums for caching
+
+        Args:
+            checksums (Iterable[str]): Raw file checksums
+            artifact (CacheArtifact, optional): Artifact type. Defaults to CacheArtifact.RAW.
+
+        Returns:
+            Dict[str, List[str]]: Queued and unknown checksums
+        """
+        checksums = list(checksums)
+        result = self._warm_cache(checksums, artifact, self.warm_path_cache(checksums))
+        self._publish_checksums("cache_warmed", result["queued"], artifact=artifact.value)
+        return result
+
+    async def warm_cache_async(
+        self, checksums: Iterable[str], artifact: CacheArtifact = CacheArtifact.RAW
+    ) -> Dict[str, List[str]]:
+        """Queues the given checksums for caching
+
+        Paths are resolved through the async pool, and the mounts are touched on the I/O
+        executor.
+
+        Args:
+            checksums (Iterable[str]): Raw file checksums
+            artifact (CacheArtifact, optional): Artifact type. Defaults to CacheArtifact.RAW.
+
+        Returns:
+            Dict[str, List[str]]: Queued and unknown checksums
+        """
+        checksums = list(checksums)
+        unc_paths = await self.warm_path_cache_async(checksums)
+        result = await asyncio.get_running_loop().run_in_executor(
+            self._io_executor, self._warm_cache, checksums, artifact, unc_paths
+        )
+        self._publish_checksums("cache_warmed", result["queued"], artifact=artifact.value)
+        return result
+
+    def _warm_cache(
+        self, checksums: List[str], artifact: CacheArtifact, unc_paths: Dict[str, Path]
+    ) -> Dict[str, List[str]]:
+        entries, unknown = self._get_cache_entries(checksums, artifact, unc_paths)
+        FileCache.get_instance().warm(entries)
+        return {
+            "queued": [cksum for cksum in checksums if cksum not in unknown],
+            "unknown": unknown,
+        }
+
+    def warm_dive_cache(
+        self, dive_checksum: str, artifact: CacheArtifact = CacheArtifact.RAW
+    ) -> Dict[str, List[str]]:
+        """Queues every frame of the given dive for caching
+
+        Args:
+            dive_checksum (str): Dive checksum
+            artifact (CacheArtifact, optional): Artifact type. Defaults to CacheArtifact.RAW.
+
+        Returns:
+            Dict[str, List[str]]: Queued and unknown checksums
+        """
+        frames = self.get_dive_metadata(dive_checksum)["frames"]
+        return self.warm_cache([cksum for cksum in frames if cksum], artifact)
+
+    async def warm_dive_cache_async(
+        self, dive_checksum: str, artifact: CacheArtifact = CacheArtifact.RAW
+    ) -> Dict[str, List[str]]:
+        """Queues every frame of the given dive for caching
+
+        Args:
+            dive_checksum (str): Dive checksum
+            artifact (CacheArtifact, optional): Artifact type. Defaults to CacheArtifact.RAW.
+
+        Returns:
+            Dict[str, List[str]]: Queued and unknown checksums
+        """
+        frames = (await self.get_dive_metadata_async(dive_checksum))["frames"]
+        return await self.warm_cache_async([cksum for cksum in frames if cksum], artifact)
+
+    def pin_cache(
+        self,
+        checksums: Iterable[str],
+        artifact: CacheArtifact = CacheArtifact.RAW,
+        pin: bool = True,
+    ) -> Dict[str, List[str]]:
+        """Pins or unpins cached checksums
+
+        Pinned checksums are also queued for caching.
+
+        Args:
+            checksums (Iterable[str]): Raw file checksums
+            artifact (CacheArtifact, optional): Artifact type. Defaults to CacheArtifact.RAW.
+            pin (bool, optional): True to pin, False to unpin. Defaults to True.
+
+        Returns:
+            Dict[str, List[str]]: Updated and unknown checksums
+        """
+        checksums = list(checksums)
+        result = self._pin_cache(checksums, artifact, pin, self.warm_path_cache(checksums))
+        self._publish_checksums(
+            "cache_pinned", result["updated"], artifact=artifact.value, pin=pin
+        )
+        return result
+
+    async def pin_cache_async(
+        self,
+        checksums: Iterable[str],
+        artifact: CacheArtifact = CacheArtifact.RAW,
+        pin: bool = True,
+    ) -> Dict[str, List[str]]:
+        """Pins or unpins cached checksums
+
+        Pinned checksums are also queued for caching.
+
+        Args:
+            checksums (Iterable[str]): Raw file checksums
+            artifact (CacheArtifact, optional): Artifact type. Defaults to CacheArtifact.RAW.
+            pin (bool, optional): True to pin, False to unpin. Defaults to True.
+
+        Returns:
+            Dict[str, List[str]]: Updated and unknown checksums
+        """
+        checksums = list(checksums)
+        unc_paths = await self.warm_path_cache_async(checksums)
+        result = await asyncio.get_running_loop().run_in_executor(
+            self._io_executor, self._pin_cache, checksums, artifact, pin, unc_paths
+        )
+        self._publish_checksums(
+            "cache_pinned", result["updated"], artifact=artifact.value, pin=pin
+        )
+        return result
+
+    def _pin_cache(
+        self,
+        checksums: List[str],
+        artifact: CacheArtifact,
+        pin: bool,
+        unc_paths: Dict[str, Path],
+    ) -> Dict[str, List[str]]:
+        entries, unknown = self._get_cache_entries(checksums, artifact, unc_paths)
+        file_cache = FileCache.get_instance()
+        for key in entries:
+            if pin:
+                file_cache.pin(key)
+            else:
+                file_cache.unpin(key)
+        if pin:
+            file_cache.warm(entries)
+        return {
+            "updated": [cksum for cksum in checksums if cksum not in unknown],
+            "unknown": unknown,
+        }
+
+    def evict_cache(
+        self, checksums: Iterable[str], artifact: CacheArtifact = CacheArtifact.RAW
+    ) -> Dict[str, List[str]]:
+        """Removes cached copies of the given checksums
+
+        Args:
+            checksums (Iterable[str]): Raw file checksums
+            artifact (CacheArtifact, optional): Artifact type. Defaults to CacheArtifact.RAW.
+
+        Returns:
+            Dict[str, List[str]]: Evicted and unknown checksums
+        """
+        checksums = list(checksums)
+        return self._evict_cache(checksums, artifact, self.warm_path_cache(checksums))
+
+    async def evict_cache_async(
+        self, checksums: Iterable[str], artifact: CacheArtifact = CacheArtifact.RAW
+    ) -> Dict[str, List[str]]:
+        """Removes cached copies of the given checksums
+
+        Args:
+            checksums (Iterable[str]): Raw file checksums
+            artifact (CacheArtifact, optional): Artifact type. Defaults to CacheArtifact.RAW.
+
+        Returns:
+            Dict[str, List[str]]: Evicted and unknown checksums
+        """
+        checksums = list(checksums)
+        unc_paths = await self.warm_path_cache_async(checksums)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._io_executor, self._evict_cache, checksums, artifact, unc_paths
+        )
+
+    def _evict_cache(
+        self, checksums: List[str], artifact: CacheArtifact, unc_paths: Dict[str, Path]
+    ) -> Dict[str, List[str]]:
+        evicted: List[str] = []
+        unknown: List[str] = []
+        file_cache = FileCache.get_instance()
+        for checksum in checksums:
+            try:
+                unc_path = self._get_resolved_artifact_path(checksum, artifact, unc_paths)
+                self.invalidate_cache(unc_path, checksum, artifact)
+            except (KeyError, ValueError, FileNotFoundError):
+                unknown.append(checksum)
+                continue
+            file_cache.unpin(FileCache.get_blob_key(checksum, artifact))
+            evicted.append(checksum)
+        # The cached copies were invalidated above, which leaves the pins
+        self._publish_checksums("cache_pinned", evicted, artifact=artifact.value, pin=False)
+        return {"evicted": evicted, "unknown": unknown}
+
+    def _publish_checksums(self, event: str, checksums: List[str], **payload: Any) -> None:
+        if self._event_bus is None:
+            return
+        for start in range(0, len(checksums), _EVENT_CHECKSUMS):
+            self._event_bus.publish(
+                event, checksums=checksums[start : start + _EVENT_CHECKSUMS], **payload
+            )
+
+    async def __on_artifact_invalidated(self, payload: Dict[str, Any]) -> None:
+        await self._run_io(
+            self._invalidate_cache,
+            Path(payload["path"]),
+            payload["checksum"],
+            CacheArtifact(payload["artifact"]),
+        )
+
+    def __on_paths_invalidated(self, payload: Dict[str, Any]) -> None:
+        self._invalidate_path_cache(payload["checksum"])
+
+    async def __on_cache_warmed(self, payload: Dict[str, Any]) -> None:
+        checksums = payload["checksums"]
+        unc_paths = await self.warm_path_cache_async(checksums)
+        await self._run_io(
+            self._warm_cache, checksums, CacheArtifact(payload["artifact"]), unc_paths
+        )
+
+    async def __on_cache_pinned(self, payload: Dict[str, Any]) -> None:
+        checksums = payload["checksums"]
+        unc_paths = await self.warm_path_cache_async(checksums)
+        await self._run_io(
+            self._pin_cache,
+            checksums,
+            CacheArtifact(payload["artifact"]),
+            payload["pin"],
+            unc_paths,
+        )
+
+    def __on_resync(self, _: Dict[str, Any]) -> None:
+        # Invalidations may have been missed, so drop everything that has no expiry
+        if self._memory_cache is not None:
+            self._memory_cache.clear()
+        self._invalidate_path_cache(None)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Retrieves cache statistics
+
+        Returns:
+            Dict[str, Any]: File and memory cache statistics
+        """
+        stats = {"file": FileCache.get_instance().get_stats()}
+        if self._memory_cache is not None:
+            stats["memory"] = {
+                "entries": len(self._memory_cache),
+                "occupiedBytes": self._memory_cache.size,
+                "maxBytes": self._memory_cache.max_size,
+                "maxBlobBytes": self._memory_cache.max_blob_size,
+            }
+        return stats
+
+    async def get_cache_stats_async(self) -> Dict[str, Any]:
+        """Retrieves cache statistics on the I/O executor
+
+        Returns:
+            Dict[str, Any]: File and memory cache statistics
+        """
+        return await self._run_io(self.get_cache_stats)
+
+    def _write_artifact(self, checksum: str, artifact: CacheArtifact, data: bytes) -> Path:
+        """Stores a preprocessed artifact and drops any cached copy
+
+        The data is written to a temporary file beside the target, synced, then renamed over
+        the target, so readers never see a partial file and a crash leaves the old file intact.
 
         Args:
             checksum (str): Raw File checksum
+            artifact (CacheArtifact): Preprocessed artifact type
             data (bytes): File data
+
+        Returns:
+            Path: UNC path of the stored artifact
         """
-        final_path = self._preprocess_jpg_store / (checksum + ".JPG")
+        final_path = self._get_artifact_store_path(checksum, artifact)
         local_path = self.map_local_path(final_path)
         local_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(local_path, "wb") as handle:
-            handle.write(data)
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        temp_path = local_path.with_name(f".{local_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp_path, "xb") as handle:
+                handle.write(data)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temp_path, local_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        self.invalidate_cache(final_path, checksum, artifact)
+        if self._digest_cache is not None:
+            self._digest_cache.put((checksum, artifact), hashlib.md5(data).hexdigest())
+        return final_path
+
+    async def _put_artifact_async(
+        self, checksum: str, artifact: CacheArtifact, data: bytes
+    ) -> None:
+        """Stores a preprocessed artifact on the I/O executor and records its path
+
+        Returns once the file is synced and the batched path update holding it is committed.
+
+        Args:
+            checksum (str): Raw File checksum
+            artifact (CacheArtifact): Preprocessed artifact type
+            data (bytes): File data
+        """
+        with phase("fs_write"):
+            final_path = await asyncio.get_running_loop().run_in_executor(
+                self._io_executor, self._write_artifact, checksum, artifact, data
+            )
+        with phase("db"):
+            await self._path_updates[artifact].submit(checksum, final_path.as_posix())
+
+    async def open_artifact_upload_async(
+        self, checksum: str, artifact: CacheArtifact, max_size: int
+    ) -> UploadSpool:
+        """Starts a streamed upload of a preprocessed artifact
+
+        Args:
+            checksum (str): Raw File checksum
+            artifact (CacheArtifact): Preprocessed artifact type
+            max_size (int): Maximum upload size in bytes
+
+        Returns:
+            UploadSpool: Open upload, to be committed with `commit_artifact_upload_async`
+        """
+        final_path = self._get_artifact_store_path(checksum, artifact)
+        spool = UploadSpool(self.map_local_path(final_path), max_size, self._io_executor)
+        await spool.open()
+        return spool
+
+    async def commit_artifact_upload_async(
+        self, checksum: str, artifact: CacheArtifact, spool: UploadSpool
+    ) -> None:
+        """Stores a streamed artifact upload and records its path
+
+        Returns once the file is synced and the batched path update holding it is committed.
+
+        Args:
+            checksum (str): Raw File checksum
+            artifact (CacheArtifact): Preprocessed artifact type
+            spool (UploadSpool): Upload from `open_artifact_upload_async`
+        """
+        final_path = self._get_artifact_store_path(checksum, artifact)
+        with phase("fs_write"):
+            await asyncio.get_running_loop().run_in_executor(
+                self._io_executor, self._commit_artifact_upload, checksum, artifact, spool
+            )
+        with phase("db"):
+            await self._path_updates[artifact].submit(checksum, final_path.as_posix())
+
+    def _commit_artifact_upload(
+        self, checksum: str, artifact: CacheArtifact, spool: UploadSpool
+    ) -> None:
+        spool.commit()
+        self.invalidate_cache(
+            self._get_artifact_store_path(checksum, artifact), checksum, artifact
+        )
+        if self._digest_cache is not None:
+            self._digest_cache.put((checksum, artifact), spool.md5)
+
+    async def flush_path_updates_async(self) -> None:
+        """Commits all queued artifact path updates"""
+        for updates in self._path_updates.values():
+            await updates.flush()
+
+    def _open_artifact(self, checksum: str, artifact: CacheArtifact) -> Blob:
+        """Opens a preprocessed artifact through the caches
+
+        Args:
+            checksum (str): Raw File checksum
+            artifact (CacheArtifact): Preprocessed artifact type
+
+        Raises:
+            FileNotFoundError: File not found
+
+        Returns:
+            Blob: Contents of file
+        """
+        cache_key = (checksum, artifact)
+        data = self._get_memory_cached(cache_key)
+        if data is not None:
+            return Blob.from_bytes(data)
+        final_path = self._get_artifact_store_path(checksum, artifact)
+        local_path = self.map_cache_path(final_path, checksum=checksum, artifact=artifact)
+        return self._open_file(local_path, cache_key=cache_key)
+
+    async def _open_artifact_async(
+        self, checksum: str, artifact: CacheArtifact
+    ) -> Tuple[Blob, str]:
+        """Opens a preprocessed artifact through the caches, along with its content digest
+
+        Memory cache hits with a known digest are served directly, everything else is opened on
+        the I/O executor.
+
+        Args:
+            checksum (str): Raw File checksum
+            artifact (CacheArtifact): Preprocessed artifact type
+
+        Raises:
+            FileNotFoundError: File not found
+
+        Returns:
+            Tuple[Blob, str]: Contents of file and hex MD5 digest of the contents
+        """
+        data = self._get_memory_cached((checksum, artifact))
+        digest = None
+        if self._digest_cache is not None:
+            digest = self._digest_cache.get((checksum, artifact))
+        if data is not None and digest is not None:
+            return Blob.from_bytes(data), digest
+        return await self._run_io(self._open_versioned_artifact, checksum, artifact)
+
+    def _open_versioned_artifact(
+        self, checksum: str, artifact: CacheArtifact
+    ) -> Tuple[Blob, str]:
+        epoch = self._digest_epoch
+        blob = self._open_artifact(checksum, artifact)
+        key = (checksum, artifact)
+        digest = None if self._digest_cache is None else self._digest_cache.get(key)
+        if digest is None:
+            with phase("digest"):
+                digest = hashlib.md5(blob.read()).hexdigest()
+            with self._digest_epoch_lock:
+                if self._digest_cache is not None and self._digest_epoch == epoch:
+                    self._digest_cache.put(key, digest)
+        return blob, digest
+
+    def _remove_artifact(self, checksum: str, artifact: CacheArtifact) -> None:
+        final_path = self._get_artifact_store_path(checksum, artifact)
+        local_path = self.map_local_path(final_path)
+        if local_path.is_file():
+            local_path.unlink()
+        self.invalidate_cache(final_path, checksum, artifact)
+
+    def put_preprocess_jpeg(self, checksum: str, data: bytes) -> None:
+        """Put Preprocessed JPEG
+
+        Args:
+            checksum (str): Raw File checksum
+            data (bytes): File data
+        """
+        final_path = self._write_artifact(checksum, CacheArtifact.PREPROCESS_JPEG, data)
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path="sql/update_preprocess_jpeg_path.sql",
                 cur=cur,
@@ -193,6 +1091,15 @@ class DataModel:
             )
             con.commit()
 
+    async def put_preprocess_jpeg_async(self, checksum: str, data: bytes) -> None:
+        """Put Preprocessed JPEG
+
+        Args:
+            checksum (str): Raw File checksum
+            data (bytes): File data
+        """
+        await self._put_artifact_async(checksum, CacheArtifact.PREPROCESS_JPEG, data)
+
     def put_preprocess_laser_jpeg(self, checksum: str, data: bytes) -> None:
         """Put Preprocessed Laser JPEG
 
@@ -200,14 +1107,10 @@ class DataModel:
             checksum (str): Raw File checksum
             data (bytes): File data
         """
-        final_path = self._preprocess_laser_jpg_store / (checksum + ".JPG")
-        local_path = self.map_local_path(final_path)
-        local_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(local_path, "wb") as handle:
-            handle.write(data)
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        final_path = self._write_artifact(
+            checksum, CacheArtifact.PREPROCESS_LASER_JPEG, data
+        )
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path="sql/update_preprocess_laser_jpeg_path.sql",
                 cur=cur,
@@ -215,6 +1118,17 @@ class DataModel:
             )
             con.commit()
 
+    async def put_preprocess_laser_jpeg_async(self, checksum: str, data: bytes) -> None:
+        """Put Preprocessed Laser JPEG
+
+        Args:
+            checksum (str): Raw File checksum
+            data (bytes): File data
+        """
+        await self._put_artifact_async(
+            checksum, CacheArtifact.PREPROCESS_LASER_JPEG, data
+        )
+
     def get_preprocess_jpeg(self, checksum: str) -> bytes:
         """Retrievs the preprocess jpeg data
 
@@ -228,13 +1142,24 @@ class DataModel:
             bytes: Binary contents of file
         """
         self.verify_raw_checksum(checksum=checksum)
-        final_path = self._preprocess_jpg_store / (checksum + ".JPG")
-        local_path = self.map_cache_path(final_path)
-        if not local_path.is_file():
-            raise FileNotFoundError(f"{local_path} not found!")
+        return self._open_artifact(checksum, CacheArtifact.PREPROCESS_JPEG).read()
+
+    async def get_preprocess_jpeg_blob_async(
+        self, checksum: str
+    ) -> Tuple[Blob, str]:
+        """Retrievs the preprocess jpeg data
 
-        with open(local_path, "rb") as handle:
-            return handle.read(self._max_raw_data_size)
+        Args:
+            checksum (str): Raw File checksum
+
+        Raises:
+            FileNotFoundError: File not found
+
+        Returns:
+            Tuple[Blob, str]: Contents of file and hex MD5 digest of the contents
+        """
+        await self.verify_raw_checksum_async(checksum=checksum)
+        return await self._open_artifact_async(checksum, CacheArtifact.PREPROCESS_JPEG)
 
     def get_preprocess_laser_jpeg(self, checksum: str) -> bytes:
         """Retrievs the preprocess laser jpeg data
@@ -249,23 +1174,117 @@ class DataModel:
             bytes: Binary contents of file
         """
         self.verify_raw_checksum(checksum=checksum)
-        final_path = self._preprocess_laser_jpg_store / (checksum + ".JPG")
-        local_path = self.map_cache_path(final_path)
-        if not local_path.is_file():
-            raise FileNotFoundError(f"{local_path} not found!")
+        return self._open_artifact(checksum, CacheArtifact.PREPROCESS_LASER_JPEG).read()
+
+    async def get_preprocess_laser_jpeg_blob_async(
+        self, checksum: str
+    ) -> Tuple[Blob, str]:
+        """Retrievs the preprocess laser jpeg data
 
-        with open(local_path, "rb") as handle:
-            return handle.read(self._max_raw_data_size)
+        Args:
+            checksum (str): Raw File checksum
+
+        Raises:
+            FileNotFoundError: File not found
+
+        Returns:
+            Tuple[Blob, str]: Contents of file and hex MD5 digest of the contents
+        """
+        await self.verify_raw_checksum_async(checksum=checksum)
+        return await self._open_artifact_async(checksum, CacheArtifact.PREPROCESS_LASER_JPEG)
+
+    async def get_derivative_blob_async(
+        self, checksum: str, artifact: CacheArtifact, width: int, quality: int
+    ) -> Tuple[Blob, str]:
+        """Retrieves a downscaled, recompressed copy of a preprocessed JPEG
+
+        Derivatives are rendered on the derivative executor the first time they are requested,
+        then served from the memory and file caches.  Concurrent requests for the same
+        derivative share one render.  Only the configured widths and qualities are rendered,
+        which bounds the number of derivatives per image.  Derivatives are dropped along with
+        their source, and are versioned by the digest of the source they were rendered from.
+
+        Args:
+            checksum (str): Raw File checksum
+            artifact (CacheArtifact): Preprocessed JPEG artifact type
+            width (int): Maximum width in pixels
+            quality (int): JPEG quality
+
+        Raises:
+            ValueError: Width or quality is not one of the configured values
+            KeyError: Checksum not found
+            FileNotFoundError: File not found
+
+        Returns:
+            Tuple[Blob, str]: JPEG and hex MD5 digest of the source JPEG
+        """
+        if width not in self._derivative_widths:
+            raise ValueError(f"Width must be one of {sorted(self._derivative_widths)}")
+        if quality not in self._derivative_qualities:
+            raise ValueError(f"Quality must be one of {sorted(self._derivative_qualities)}")
+        await self.verify_raw_checksum_async(checksum=checksum)
+        source_digest = await self._get_artifact_digest_async(checksum, artifact)
+        variant = derivative_artifact(artifact, width, quality)
+        cache_key = (checksum, variant)
+        data = self._get_memory_cached(cache_key)
+        if data is not None:
+            return Blob.from_bytes(data), source_digest
+        blob = await self._run_io(self._open_cached_derivative, checksum, variant)
+        if blob is not None:
+            return blob, source_digest
+        render = self._derivative_renders.get(cache_key)
+        if render is None:
+            render = asyncio.ensure_future(
+                self._render_derivative(checksum, artifact, width, quality)
+            )
+            self._derivative_renders[cache_key] = render
+            render.add_done_callback(
+                lambda _: self._derivative_renders.pop(cache_key, None)
+            )
+        # Shielded so that one cancelled request does not abort the render for the others
+        return Blob.from_bytes(await asyncio.shield(render)), source_digest
+
+    async def _get_artifact_digest_async(self, checksum: str, artifact: CacheArtifact) -> str:
+        if self._digest_cache is not None:
+            digest = self._digest_cache.get((checksum, artifact))
+            if digest is not None:
+                return digest
+        _, digest = await self._run_io(self._open_versioned_artifact, checksum, artifact)
+        return digest
+
+    def _open_cached_derivative(self, checksum: str, variant: str) -> Optional[Blob]:
+        cached_path = FileCache.get_instance().lookup_blob(checksum, variant)
+        if cached_path is None:
+            return None
+        try:
+            return self._open_file(cached_path, cache_key=(checksum, variant))
+        except FileNotFoundError:
+            # Evicted since the lookup
+            return None
+
+    async def _render_derivative(
+        self, checksum: str, artifact: CacheArtifact, width: int, quality: int
+    ) -> bytes:
+        final_path = self._get_artifact_store_path(checksum, artifact)
+        source = await self._run_io(
+            functools.partial(self.map_cache_path, checksum=checksum, artifact=artifact),
+            final_path,
+        )
+        with phase("render"):
+            data = await asyncio.get_running_loop().run_in_executor(
+                self._derivative_executor, render_jpeg, source, width, quality
+            )
+        variant = derivative_artifact(artifact, width, quality)
+        with phase("fs_write"):
+            await self._run_io(FileCache.get_instance().put_blob, checksum, variant, data)
+        if self._memory_cache is not None:
+            self._memory_cache.put((checksum, variant), data)
+        return data
 
     def delete_preprocess_laser_jpeg(self, checksum: str) -> None:
         self.verify_raw_checksum(checksum=checksum)
-        final_path = self._preprocess_laser_jpg_store / (checksum + ".JPG")
-        local_path = self.map_local_path(final_path)
-        if local_path.is_file():
-            local_path.unlink()
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        self._remove_artifact(checksum, CacheArtifact.PREPROCESS_LASER_JPEG)
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path="sql/delete_preprocess_laser_jpeg_path.sql",
                 cur=cur,
@@ -273,6 +1292,17 @@ class DataModel:
             )
             con.commit()
 
+    async def delete_preprocess_laser_jpeg_async(self, checksum: str) -> None:
+        await self.verify_raw_checksum_async(checksum=checksum)
+        await self._run_io(self._remove_artifact, checksum, CacheArtifact.PREPROCESS_LASER_JPEG)
+        async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(
+                path="sql/delete_preprocess_laser_jpeg_path.sql",
+                cur=cur,
+                params={"cksum": checksum},
+            )
+            await con.commit()
+
     def get_laser_label(self, checksum: str) -> Optional[Dict[str, int]]:
         """Retrieves the laser label
 
@@ -285,9 +1315,7 @@ class DataModel:
             KeyError: Raw file does not exist
         """
         self.verify_raw_checksum(checksum=checksum)
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path="sql/select_laser_label_by_cksum.sql",
                 cur=cur,
@@ -298,6 +1326,29 @@ class DataModel:
             return None
         return {"task_id": result["task_id"], "x": result["x"], "y": result["y"]}
 
+    async def get_laser_label_async(self, checksum: str) -> Optional[Dict[str, int]]:
+        """Retrieves the laser label
+
+        Args:
+            checksum (str): Raw file checksum
+
+        Returns:
+            Optional[Dict[str, int]]: Laser Label dict if exists, otherwise None
+        Raises:
+            KeyError: Raw file does not exist
+        """
+        await self.verify_raw_checksum_async(checksum=checksum)
+        async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(
+                path="sql/select_laser_label_by_cksum.sql",
+                cur=cur,
+                params={"cksum": checksum},
+            )
+            result = await cur.fetchone()
+        if result is None:
+            return None
+        return {"task_id": result["task_id"], "x": result["x"], "y": result["y"]}
+
     def put_debug_data(self, job_id: uuid.UUID, data: bytes) -> None:
         """Put Debug Data
 
@@ -309,17 +1360,45 @@ class DataModel:
             data (bytes): File data
         """
         self._log.debug("put_debug_data %s", job_id)
-        final_path = self._debug_data_path / (str(job_id) + ".zip")
-        local_path = self.map_local_path(final_path)
+        local_path = self.map_local_path(self._get_debug_data_path(job_id))
         local_path.parent.mkdir(parents=True, exist_ok=True)
         with open(local_path, "wb") as handle:
             handle.write(data)
 
+    def _get_debug_data_path(self, job_id: uuid.UUID) -> Path:
+        return self._debug_data_path / (str(job_id) + ".zip")
+
+    async def open_debug_upload_async(self, job_id: uuid.UUID, max_size: int) -> UploadSpool:
+        """Starts a streamed upload of a job's debug data
+
+        Args:
+            job_id (uuid.UUID): Job ID
+            max_size (int): Maximum upload size in bytes
+
+        Returns:
+            UploadSpool: Open upload, to be committed with `commit_upload_async`
+        """
+        local_path = self.map_local_path(self._get_debug_data_path(job_id))
+        spool = UploadSpool(local_path, max_size, self._io_executor)
+        await spool.open()
+        return spool
+
+    async def commit_upload_async(self, spool: UploadSpool) -> Path:
+        """Syncs a streamed upload and moves it into place on the I/O executor
+
+        Args:
+            spool (UploadSpool): Open upload
+
+        Returns:
+            Path: Local path of the stored file
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._io_executor, spool.commit
+        )
+
     def delete_headtail_label(self, checksum: str) -> None:
         self.verify_raw_checksum(checksum=checksum)
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path="sql/delete_headtail_label_by_cksum.sql",
                 cur=cur,
@@ -327,11 +1406,19 @@ class DataModel:
             )
             con.commit()
 
+    async def delete_headtail_label_async(self, checksum: str) -> None:
+        await self.verify_raw_checksum_async(checksum=checksum)
+        async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(
+                path="sql/delete_headtail_label_by_cksum.sql",
+                cur=cur,
+                params={"cksum": checksum},
+            )
+            await con.commit()
+
     def get_frame_metadata(self, checksum: str) -> Dict[str, Any]:
         self.verify_raw_checksum(checksum=checksum)
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path="sql/select_frame_metadata_by_cksum.sql",
                 cur=cur,
@@ -340,6 +1427,53 @@ class DataModel:
             result = cur.fetchone()
         return dict(result)
 
+    async def get_frame_metadata_async(self, checksum: str) -> Dict[str, Any]:
+        await self.verify_raw_checksum_async(checksum=checksum)
+        async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(
+                path="sql/select_frame_metadata_by_cksum.sql",
+                cur=cur,
+                params={"cksum": checksum},
+            )
+            result = await cur.fetchone()
+        return dict(result)
+
+    async def get_frames_metadata_async(self, checksums: Iterable[str]) -> Dict[str, Any]:
+        """Gets the frame metadata for many raw files with one query
+
+        Resolved UNC paths are also stored in the path cache, as the raw files are usually
+        requested next.
+
+        Args:
+            checksums (Iterable[str]): Raw file checksums
+
+        Returns:
+            Dict[str, Any]: Frame metadata by checksum under `frames`, and the checksums that
+            are not recognized under `unknown`
+        """
+        checksums = list(dict.fromkeys(checksums))
+        async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(
+                path="sql/select_frame_metadata_by_cksums.sql",
+                cur=cur,
+                params={"cksums": checksums},
+            )
+            results = {row["cksum"]: row for row in await cur.fetchall()}
+        frames: Dict[str, Dict[str, Any]] = {}
+        unknown: List[str] = []
+        for checksum in checksums:
+            result = results.get(checksum)
+            self._store_unc_path(checksum, result)
+            if result is None:
+                unknown.append(checksum)
+                continue
+            frames[checksum] = {
+                key: value
+                for key, value in result.items()
+                if key not in ("cksum", "path")
+            }
+        return {"frames": frames, "unknown": unknown}
+
     def get_dive_metadata(self, checksum: str) -> Dict[str, Any]:
         """Gets the dive metadata
 
@@ -349,9 +1483,7 @@ class DataModel:
         Returns:
             Dict[str, Any]: Dictionary of dive data
         """
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path="sql/select_dive_frame_checksum_by_dive_checksum.sql",
                 cur=cur,
@@ -360,14 +1492,40 @@ class DataModel:
             frame_ids = [row["frames"] for row in cur.fetchall()]
         return {"frames": frame_ids}
 
+    async def get_dive_metadata_async(self, checksum: str) -> Dict[str, Any]:
+        """Gets the dive metadata
+
+        Args:
+            checksum (str): Dive checksum
+
+        Returns:
+            Dict[str, Any]: Dictionary of dive data
+        """
+        async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(
+                path="sql/select_dive_frame_checksum_by_dive_checksum.sql",
+                cur=cur,
+                params={"cksum": checksum},
+            )
+            frame_ids = [row["frames"] for row in await cur.fetchall()]
+        return {"frames": frame_ids}
+
     def list_dives(self) -> List[str]:
         """List dives
 
         Returns:
             List[str]: List of dive checksums
         """
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(path="sql/select_dive_checksums.sql", cur=cur)
             return [row["checksum"] for row in cur.fetchall()]
+
+    async def list_dives_async(self) -> List[str]:
+        """List dives
+
+        Returns:
+            List[str]: List of dive checksums
+        """
+        async with self._async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(path="sql/select_dive_checksums.sql", cur=cur)
+            return [row["checksum"] for row in await cur.fetchall()]
@@ -0,0 +1,47 @@
+"""Resized image derivatives"""
+
+import io
+from pathlib import Path
+
+from PIL import Image
+
+
+def derivative_artifact(artifact: str, width: int, quality: int) -> str:
+    """Names the cache artifact of a derivative
+
+    Args:
+        artifact (str): Source artifact type
+        width (int): Maximum width in pixels
+        quality (int): JPEG quality
+
+    Returns:
+        str: Artifact type of the derivative
+    """
+    return f"{artifact}_w{width}_q{quality}"
+
+
+def render_jpeg(source: Path, width: int, quality: int) -> bytes:
+    """Renders a downscaled, recompressed copy of a JPEG
+
+    Images no wider than `width` are only recompressed.  The aspect ratio is preserved.  This
+    is CPU bound, and is run in a process pool by the data model.
+
+    Args:
+        source (Path): Source JPEG
+        width (int): Maximum width in pixels
+        quality (int): JPEG quality
+
+    Returns:
+        bytes: Progressive JPEG
+    """
+    with Image.open(source) as image:
+        if image.width > width:
+            size = (width, max(1, round(image.height * width / image.width)))
+            # Let the decoder skip DCT scales that would be discarded by the resize anyway
+            image.draft("RGB", size)
+            image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, "JPEG", quality=quality, optimize=True, progressive=True)
+        return output.getvalue()
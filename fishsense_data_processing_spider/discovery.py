@@ -3,13 +3,13 @@
 import datetime as dt
 import itertools
 import logging
+import multiprocessing.synchronize
 from pathlib import Path
 from threading import Event, Thread
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Union
 
 import numpy as np
-import psycopg
-from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 
 from fishsense_data_processing_spider.backend import (get_camera_sns,
                                                       get_file_checksum,
@@ -17,7 +17,7 @@ from fishsense_data_processing_spider.backend import (get_camera_sns,
 from fishsense_data_processing_spider.config import get_log_path
 from fishsense_data_processing_spider.metrics import (add_thread_to_monitor,
                                                       get_counter, get_gauge,
-                                                      get_summary)
+                                                      get_histogram)
 from fishsense_data_processing_spider.sql_utils import (do_many_query,
                                                         do_query, load_query)
 
@@ -28,31 +28,39 @@ class Crawler:
     # pylint: disable=too-many-instance-attributes
     def __init__(self,
                  data_paths: List[Union[Path, str]],
-                 conn_str: str,
+                 pg_pool: ConnectionPool,
                  *,
                  failed_images_path: Path = get_log_path() / 'failed_images.log',
                  multi_camera_dives_path: Path = get_log_path() / 'multiple_camera_dives.log',
-                 dive_insert_path: Path = get_log_path() / 'insert_canonical_dive.sql'
+                 dive_insert_path: Path = get_log_path() / 'insert_canonical_dive.sql',
+                 on_paths_changed: Optional[Callable[[], None]] = None,
+                 sleep_interrupt: Optional[multiprocessing.synchronize.Event] = None
                  ): # pylint: disable=too-many-arguments,
         """Creates the new crawler
 
         Args:
             data_paths (List[Union[Path, str]]): List of data paths
-            conn_str (str): PG Connection String
+            pg_pool (ConnectionPool): Postgres connection pool
             interval (dt.timedelta): Scrape interval
             failed_images_path (Path, optional): Path to failed images log. Defaults to 
                 `$LOGS/failed_images.log`.
             multi_camera_dives_path (Path, optional): Path to multi camera dives log. Defaults to 
                 `$LOGS/multiple_camera_dives.log`.
+            on_paths_changed (Optional[Callable[[], None]], optional): Called after each
+                discovery run, as image paths and canonical dives may have changed. Defaults to
+                None.
+            sleep_interrupt (Optional[multiprocessing.synchronize.Event], optional): Event that
+                triggers discovery, shared with forked web processes. Defaults to a thread event.
         """
         self.__log = logging.getLogger('Crawler')
         self.__data_paths = data_paths
-        self.__conn = conn_str
+        self.__pg_pool = pg_pool
         self.__failed_images_path = failed_images_path
         self.__multi_camera_dives = multi_camera_dives_path
         self.__dive_insert_path = dive_insert_path
+        self.__on_paths_changed = on_paths_changed
         self.stop_event = Event()
-        self.sleep_interrupt = Event()
+        self.sleep_interrupt = Event() if sleep_interrupt is None else sleep_interrupt
         self.__process_thread: Optional[Thread] = None
 
 
@@ -94,10 +102,13 @@ class Crawler:
                     return
             except Exception as exc:  # pylint: disable=broad-except
                 self.__log.exception('Image discovery failed due to %s', exc)
+            finally:
+                if self.__on_paths_changed is not None:
+                    self.__on_paths_changed()
 
 
     def __conslidate_dives(self):
-        with psycopg.connect(self.__conn, row_factory=dict_row) as con, con.cursor() as cur:
+        with self.__pg_pool.connection() as con, con.cursor() as cur:
             # for each dive
             do_query('sql/select_all_dives.sql', cur)
             dives = [row['path'] for row in cur.fetchall()]
@@ -154,7 +165,7 @@ class Crawler:
     def __extract_image_dates(self):
         failed_images: Dict[str, Exception] = {}
         while True:
-            with psycopg.connect(self.__conn, row_factory=dict_row) as con, con.cursor() as cur:
+            with self.__pg_pool.connection() as con, con.cursor() as cur:
                 do_query(
                     path='sql/select_next_image_for_date.sql',
                     cur=cur,
@@ -163,7 +174,7 @@ class Crawler:
                     }
                 )
                 results = cur.fetchall()
-                get_summary('query_result_length').labels(
+                get_histogram('query_result_length').labels(
                     query='select_next_image_for_date').observe(len(results))
                 if len(results) == 0:
                     break
@@ -197,7 +208,7 @@ class Crawler:
         failed_images = self.__extract_image_dates()
 
         # image dates are now in pg, coalesce per dive
-        with psycopg.connect(self.__conn, row_factory=dict_row) as con, con.cursor() as cur:
+        with self.__pg_pool.connection() as con, con.cursor() as cur:
             # For each dive
             do_query('sql/select_all_dives.sql', cur)
             dives = [row['path'] for row in cur.fetchall()]
@@ -247,7 +258,7 @@ class Crawler:
             get_counter('images_processed').labels(
                 phase='discover_dives'
             ).inc(len(image_keys))
-            with psycopg.connect(self.__conn, row_factory=dict_row) as con, con.cursor() as cur:
+            with self.__pg_pool.connection() as con, con.cursor() as cur:
                 do_many_query(
                     path='sql/select_image_by_path.sql',
                     cur=cur,
@@ -294,7 +305,7 @@ class Crawler:
 
     def __compute_camera_sns(self, batch_size=1024):
         while True:
-            with psycopg.connect(self.__conn, row_factory=dict_row) as con, con.cursor() as cur:
+            with self.__pg_pool.connection() as con, con.cursor() as cur:
                 do_query(
                     path='sql/select_images_without_camerasn.sql',
                     cur=cur,
@@ -305,7 +316,7 @@ class Crawler:
                 results = cur.fetchall()
                 if len(results) == 0:
                     return
-                get_summary('query_result_length').labels(
+                get_histogram('query_result_length').labels(
                     query='select_images_without_camerasn').observe(len(results))
                 get_counter('images_processed').labels(
                     phase='camera_sns').inc(len(results))
@@ -328,7 +339,7 @@ class Crawler:
                 con.commit()
 
     def __process_canonical_dives(self):
-        with psycopg.connect(self.__conn, row_factory=dict_row) as con, con.cursor() as cur:
+        with self.__pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path='sql/select_canonical_dives.sql',
                 cur=cur
@@ -341,7 +352,7 @@ class Crawler:
                  for data_root in data_roots}
         multiple_camera_dives: List[Path] = []
         for dive in itertools.chain(*dives.values()):
-            with psycopg.connect(self.__conn, row_factory=dict_row) as con, con.cursor() as cur:
+            with self.__pg_pool.connection() as con, con.cursor() as cur:
                 do_query(
                     path='sql/select_cameras_per_dive.sql',
                     cur=cur,
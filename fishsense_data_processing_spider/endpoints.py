@@ -1,31 +1,87 @@
 """Tornado Endpoints"""
 
+import asyncio
+import base64
+import binascii
 import datetime as dt
-import json
 import logging
+import math
 import uuid
 from abc import ABC
+from contextlib import aclosing
 from http import HTTPStatus
 from importlib.metadata import version
-from typing import Optional
-
-from tornado.web import HTTPError, RequestHandler
-
-from fishsense_data_processing_spider import __version__
+from typing import List, Optional, Tuple, Union
+
+from tornado.escape import utf8
+from tornado.web import HTTPError, RequestHandler, stream_request_body
+
+from fishsense_data_processing_spider import __version__, json_utils
+from fishsense_data_processing_spider.archive import (
+    END_OF_ARCHIVE,
+    member_header,
+    member_padding,
+)
+from fishsense_data_processing_spider.blob import (
+    Blob,
+    RangeNotSatisfiable,
+    parse_byte_range,
+)
 from fishsense_data_processing_spider.config import settings
 from fishsense_data_processing_spider.data_model import DataModel
 from fishsense_data_processing_spider.discovery import Crawler
+from fishsense_data_processing_spider.file_cache import CacheArtifact
 from fishsense_data_processing_spider.label_studio_sync import LabelStudioSync
-from fishsense_data_processing_spider.metrics import get_counter, get_summary
+from fishsense_data_processing_spider.limits import (
+    Admission,
+    LimitExceeded,
+    RequestLimits,
+)
+from fishsense_data_processing_spider.metrics import (
+    LATENCY_BUCKETS,
+    get_counter,
+    get_histogram,
+)
 from fishsense_data_processing_spider.orchestrator import JobStatus, Orchestrator
+from fishsense_data_processing_spider.timing import (
+    current_timings,
+    end_request,
+    phase,
+    start_request,
+)
+from fishsense_data_processing_spider.upload import UploadSpool, UploadTooLarge
 from fishsense_data_processing_spider.web_auth import KeyStore, Permission
 
 # pylint: disable=abstract-method, arguments-differ, attribute-defined-outside-init
 # This is typical behavior for tornado
 
 
+class ServiceUnavailable(HTTPError):
+    """Request was shed, and may be retried after `retry_after` seconds"""
+
+    def __init__(self, retry_after: float, log_message: Optional[str] = None):
+        super().__init__(HTTPStatus.SERVICE_UNAVAILABLE, log_message)
+        self.retry_after = retry_after
+
+
 class BaseHandler(RequestHandler):
-    """Base Handler for E4EFS"""
+    """Base Handler for E4EFS
+
+    Metrics are labelled by the route template the handler is served under, e.g.
+    `/api/v1/data/raw/{checksum}`, which the service passes as the `route` keyword.
+    """
+
+    _admission: Optional[Admission] = None
+    _response_size = 0
+
+    def __init__(self, application, request, *, route: Optional[str] = None, **kwargs):
+        self._route = route
+        super().__init__(application, request, **kwargs)
+
+    @property
+    def endpoint(self) -> str:
+        """Route template, or the request path if the route is not known"""
+        return self._route if self._route is not None else self.request.path
 
     def _request_summary(self):
         remote_ip = (
@@ -37,29 +93,55 @@ class BaseHandler(RequestHandler):
         return f"{self.request.method} {self.request.uri} ({remote_ip})"
 
     def prepare(self):
-        if hasattr(self, "PATH_OVERRIDE"):
-            request_path = self.PATH_OVERRIDE
-        else:
-            request_path = self.request.path
         request_counter = get_counter(name="request_call")
-        request_counter.labels(endpoint=request_path).inc()
+        request_counter.labels(endpoint=self.endpoint).inc()
         return super().prepare()
 
     def on_finish(self):
-        if hasattr(self, "PATH_OVERRIDE"):
-            request_path = self.PATH_OVERRIDE
-        else:
-            request_path = self.request.path
         request_counter = get_counter(name="request_result")
-        request_counter.labels(endpoint=request_path, code=self._status_code).inc()
+        request_counter.labels(endpoint=self.endpoint, code=self._status_code).inc()
+        get_histogram("request_size").labels(endpoint=self.endpoint).observe(
+            self._request_size()
+        )
+        get_histogram("response_size").labels(endpoint=self.endpoint).observe(
+            self._response_size
+        )
+
+    def _request_size(self) -> int:
+        if self.request.body:
+            return len(self.request.body)
+        try:
+            return int(self.request.headers.get("Content-Length", 0))
+        except ValueError:
+            return 0
 
     async def _execute(self, transforms, *args, **kwargs):
-        if hasattr(self, "PATH_OVERRIDE"):
-            request_path = self.PATH_OVERRIDE
-        else:
-            request_path = self.request.path
-        with get_summary("request_timing").labels(endpoint=request_path).time():
-            await super()._execute(transforms, *args, **kwargs)
+        token = start_request()
+        try:
+            with get_histogram("request_timing").labels(endpoint=self.endpoint).time():
+                await super()._execute(transforms, *args, **kwargs)
+        finally:
+            timings = current_timings()
+            end_request(token)
+            phase_timer = get_histogram(
+                "request_phase_duration",
+                "Time spent in each phase of a request",
+                labelnames=["endpoint", "phase"],
+                namespace="e4efs",
+                subsystem="spider",
+                unit="seconds",
+                buckets=LATENCY_BUCKETS,
+            )
+            for name, duration in timings.phases.items():
+                phase_timer.labels(endpoint=self.endpoint, phase=name).observe(duration)
+
+    def flush(self, include_footers: bool = False):
+        if not self._headers_written:
+            # Phases up to the first byte, as later phases cannot be reported in the headers
+            timings = current_timings()
+            if timings is not None:
+                self.set_header("Server-Timing", timings.server_timing())
+        return super().flush(include_footers)
 
     def set_default_headers(self):
         super().set_default_headers()
@@ -73,11 +155,91 @@ class BaseHandler(RequestHandler):
             "Access-Control-Allow-Methods", ", ".join(self.SUPPORTED_METHODS)
         )
 
+    def write(self, chunk: Union[str, bytes, dict]) -> None:
+        """Writes the given chunk to the output buffer
+
+        Dictionaries are encoded with the shared JSON encoder rather than Tornado's.
+
+        Args:
+            chunk (Union[str, bytes, dict]): Chunk
+        """
+        if isinstance(chunk, dict):
+            self.set_header("Content-Type", "application/json; charset=UTF-8")
+            chunk = json_utils.dumps(chunk)
+        chunk = utf8(chunk)
+        self._response_size += len(chunk)
+        super().write(chunk)
+
+    def write_error(self, status_code: int, **kwargs) -> None:
+        exc_info = kwargs.get("exc_info")
+        if exc_info is not None and isinstance(exc_info[1], ServiceUnavailable):
+            self.set_header("Retry-After", max(1, math.ceil(exc_info[1].retry_after)))
+        super().write_error(status_code, **kwargs)
+
     def options(self, *_, **__):
         """Options handler"""
         self.set_status(204)
         self.finish()
 
+    async def write_blob(
+        self, blob: Blob, content_type: str, etag: Optional[str] = None
+    ) -> None:
+        """Streams a blob to the client and finishes the response
+
+        Each chunk is flushed before the next is read, so a slow client holds at most one chunk
+        in memory.  If an ETag is given, matching `If-None-Match` requests get a 304.  A single
+        byte range is honored with a 206, unless `If-Range` does not match the ETag.
+
+        Args:
+            blob (Blob): Response body
+            content_type (str): Content type
+            etag (Optional[str], optional): Strong entity tag, without quotes. Defaults to None.
+        """
+        self.set_header("Content-Type", content_type)
+        self.set_header("Accept-Ranges", "bytes")
+        if etag is not None:
+            self.set_header("Etag", f'"{etag}"')
+            if self.check_etag_header():
+                self.set_status(HTTPStatus.NOT_MODIFIED)
+                self.finish()
+                return
+
+        start, stop = 0, blob.size
+        if self._if_range_matches(etag):
+            try:
+                byte_range = parse_byte_range(self.request.headers.get("Range"), blob.size)
+            except RangeNotSatisfiable:
+                self.set_status(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.set_header("Content-Range", f"bytes */{blob.size}")
+                self.clear_header("Content-Type")
+                self.finish()
+                return
+            if byte_range is not None:
+                start, stop = byte_range
+                self.set_status(HTTPStatus.PARTIAL_CONTENT)
+                self.set_header("Content-Range", f"bytes {start}-{stop - 1}/{blob.size}")
+
+        self.set_header("Content-Length", stop - start)
+        async with aclosing(
+            blob.iter_chunks(settings.web_api.stream_chunk_size, start=start, stop=stop)
+        ) as chunks:
+            with phase("send"):
+                async for chunk in chunks:
+                    await self._throttle(len(chunk))
+                    self.write(chunk)
+                    await self.flush()
+        self.finish()
+
+    async def _throttle(self, size: int) -> None:
+        if self._admission is not None:
+            await self._admission.throttle(size)
+
+    def _if_range_matches(self, etag: Optional[str]) -> bool:
+        if_range = self.request.headers.get("If-Range")
+        if if_range is None:
+            return True
+        return etag is not None and if_range.strip() == f'"{etag}"'
+
 
 class HomePageHandler(BaseHandler):
     """Home Page Handler"""
@@ -110,7 +272,7 @@ class VersionHandler(BaseHandler):
 
     async def get(self, *_, **__) -> None:
         """Gets the version information for this app"""
-        self.write(json.dumps({"version": version("fishsense_data_processing_worker")}))
+        self.write({"version": version("fishsense_data_processing_worker")})
 
 
 class AuthenticatedHandler(BaseHandler, ABC):
@@ -126,7 +288,7 @@ class AuthenticatedHandler(BaseHandler, ABC):
         # This is the correct pattern for tornado
         self._key_store = key_store
 
-    def authenticate(self, perms: Optional[Permission] = None) -> bool:
+    async def authenticate(self, perms: Optional[Permission] = None) -> bool:
         """Checks whether this request is authorized or not.
 
         If false, this method will also set up the status and content
@@ -134,8 +296,30 @@ class AuthenticatedHandler(BaseHandler, ABC):
         api_key = self.request.headers.get("api_key")
         if not api_key:
             raise HTTPError(HTTPStatus.UNAUTHORIZED, "Key not provided")
-        if not self._key_store.authorize_key(api_key, perms):
+        if not await self._key_store.authorize_key_async(api_key, perms):
             raise HTTPError(HTTPStatus.UNAUTHORIZED, f"Key {api_key} failed")
+        if perms is not None and self._admission is None:
+            await self._admit(perms, self._key_store.get_key_id(api_key))
+
+    async def _admit(self, perms: Permission, key_id: bytes) -> None:
+        # Requests are limited by the permission they are authorized under, so that batch
+        # downloads cannot starve interactive labeling
+        try:
+            self._admission = await RequestLimits.get_instance().admit(perms.value, key_id)
+        except LimitExceeded as exc:
+            raise ServiceUnavailable(exc.retry_after, str(exc)) from exc
+
+    def on_finish(self) -> None:
+        self._release_admission()
+        super().on_finish()
+
+    def on_connection_close(self) -> None:
+        self._release_admission()
+        super().on_connection_close()
+
+    def _release_admission(self) -> None:
+        if self._admission is not None:
+            self._admission.release()
 
 
 class AuthenticatedDataHandler(AuthenticatedHandler):
@@ -153,6 +337,23 @@ class AuthenticatedDataHandler(AuthenticatedHandler):
         super().initialize(key_store=key_store)
         self._data_model = data_model
 
+    def _parse_body(self) -> dict:
+        try:
+            body = json_utils.loads(self.request.body)
+        except json_utils.JSONDecodeError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not JSON") from exc
+        if not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not an object")
+        return body
+
+    def _parse_checksum_list(self, body: dict) -> List[str]:
+        checksums = body.get("checksums", [])
+        if not isinstance(checksums, list) or not all(
+            isinstance(x, str) for x in checksums
+        ):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Checksums not a list of strings")
+        return checksums
+
 
 class AuthenticatedJobHandler(AuthenticatedHandler, ABC):
     """Authenticated Job Handler"""
@@ -170,6 +371,91 @@ class AuthenticatedJobHandler(AuthenticatedHandler, ABC):
         self._orchestrator = orchestrator
 
 
+class SpooledUploadMixin(RequestHandler, ABC):
+    """Spools PUT bodies to a temporary file as they arrive
+
+    Subclasses must be decorated with `stream_request_body`.  `_open_spool` runs before any of
+    the body is read, so it should authenticate and validate the request.  The PUT method then
+    calls `_get_upload` to check the complete body before committing it.
+    """
+
+    def _get_upload_limit(self) -> int:
+        raise NotImplementedError
+
+    async def _open_spool(self, *args, **kwargs) -> UploadSpool:
+        raise NotImplementedError
+
+    async def prepare(self) -> None:
+        # pylint: disable=attribute-defined-outside-init
+        self._spool: Optional[UploadSpool] = None
+        self._upload_error: Optional[UploadTooLarge] = None
+        if self.request.method != "PUT":
+            return
+        limit = self._get_upload_limit()
+        content_length = self.request.headers.get("Content-Length")
+        if content_length is not None and int(content_length) > limit:
+            raise HTTPError(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Upload exceeds {limit} bytes"
+            )
+        self.request.connection.set_max_body_size(limit)
+        self._spool = await self._open_spool(*self.path_args, **self.path_kwargs)
+
+    async def data_received(self, chunk: bytes) -> None:
+        if self._spool is None or self._upload_error is not None:
+            return
+        try:
+            await self._spool.write(chunk)
+        except UploadTooLarge as exc:
+            self._upload_error = exc
+
+    def _get_upload(self) -> UploadSpool:
+        """Checks the complete upload
+
+        A `Content-MD5` header, if present, must match the body.
+
+        Raises:
+            HTTPError: Upload too large or corrupt
+
+        Returns:
+            UploadSpool: Upload, ready to commit
+        """
+        if self._upload_error is not None:
+            raise HTTPError(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE, str(self._upload_error)
+            ) from self._upload_error
+        content_md5 = self.request.headers.get("Content-MD5")
+        if content_md5 is not None:
+            try:
+                expected = base64.b64decode(content_md5, validate=True).hex()
+            except binascii.Error as exc:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-MD5") from exc
+            if expected != self._spool.md5:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-MD5 mismatch")
+        self.set_header("Etag", f'"{self._spool.md5}"')
+        return self._spool
+
+    def on_finish(self) -> None:
+        self._discard_spool()
+        super().on_finish()
+
+    def _request_size(self) -> int:
+        spool = getattr(self, "_spool", None)
+        if spool is not None:
+            return spool.size
+        return super()._request_size()
+
+    def on_connection_close(self) -> None:
+        self._discard_spool()
+        super().on_connection_close()
+
+    def _discard_spool(self) -> None:
+        # Committed uploads have already been moved into place, so this only removes the
+        # temporary file of a failed or abandoned upload
+        spool = getattr(self, "_spool", None)
+        if spool is not None:
+            spool.discard()
+
+
 class RetrieveBatch(AuthenticatedJobHandler):
     """Retrieves a batch of jobs"""
 
@@ -177,19 +463,40 @@ class RetrieveBatch(AuthenticatedJobHandler):
 
     async def post(self, *_, **__) -> None:
         """HTTP POST entry point"""
-        self.authenticate()
+        await self.authenticate()
 
         worker = self.get_query_argument("worker")
         n_images = int(self.get_query_argument("nImages", "1000"))
-        job_document = self._orchestrator.get_next_job_dict(
-            worker=worker,
-            n_images=n_images,
-            origin=self.request.headers.get("api_key"),
-            expiration=int(self.get_query_argument("expiration", "3600")),
+        try:
+            wait = float(self.get_query_argument("wait", "0"))
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "bad wait value") from exc
+        if not 0 <= wait <= settings.orchestrator.max_long_poll:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "bad wait value")
+        # pylint: disable=attribute-defined-outside-init
+        self._poll = asyncio.ensure_future(
+            self._orchestrator.get_next_job_dict_async(
+                worker=worker,
+                n_images=n_images,
+                origin=self.request.headers.get("api_key"),
+                expiration=int(self.get_query_argument("expiration", "3600")),
+                wait=wait,
+            )
         )
+        try:
+            job_document = await self._poll
+        except asyncio.CancelledError:
+            # The worker disconnected while waiting, so must not be handed jobs
+            return
         self.set_status(HTTPStatus.OK)
         self.write(job_document)
 
+    def on_connection_close(self) -> None:
+        poll = getattr(self, "_poll", None)
+        if poll is not None and not poll.done():
+            poll.cancel()
+        super().on_connection_close()
+
 
 class JobStatusHandler(AuthenticatedJobHandler):
     """Job Statuhandler"""
@@ -198,7 +505,7 @@ class JobStatusHandler(AuthenticatedJobHandler):
 
     async def put(self, *_, **__) -> None:
         """Put method handler"""
-        self.authenticate()
+        await self.authenticate()
 
         job_id = uuid.UUID(self.get_query_argument("jobId"))
         status = self.get_query_argument("status")
@@ -209,7 +516,7 @@ class JobStatusHandler(AuthenticatedJobHandler):
             progress = int(progress)
             if not 0 <= progress <= 100:
                 raise HTTPError(HTTPStatus.BAD_REQUEST, "bad progress value")
-        self._orchestrator.set_job_status(
+        await self._orchestrator.set_job_status_async(
             job_id=job_id, status=JobStatus(status), progress=progress
         )
         self.set_status(HTTPStatus.OK)
@@ -272,7 +579,7 @@ class DoDiscoveryHandler(AuthenticatedHandler):
 
     async def post(self, *_, **__) -> None:
         """POST method"""
-        self.authenticate(Permission.DO_DISCOVERY)
+        await self.authenticate(Permission.DO_DISCOVERY)
         self._crawler.sleep_interrupt.set()
 
 
@@ -296,7 +603,7 @@ class DoLabelStudioSyncHandler(AuthenticatedHandler):
 
     async def post(self, *_, **__) -> None:
         """POST method"""
-        self.authenticate(Permission.DO_LABEL_STUDIO_SYNC)
+        await self.authenticate(Permission.DO_LABEL_STUDIO_SYNC)
         self._label_studio.sleep_interrupt.set()
 
 
@@ -304,7 +611,6 @@ class RawDataHandler(AuthenticatedDataHandler):
     """Raw Data Handler"""
 
     SUPPORTED_METHODS = ("GET", "OPTIONS")
-    PATH_OVERRIDE = "/api/v1/data/raw"
 
     def initialize(self, key_store, data_model: DataModel):
         self._logger = logging.getLogger("RawDataHandler")
@@ -316,23 +622,93 @@ class RawDataHandler(AuthenticatedDataHandler):
         Args:
             checksum (str): Raw File checksum
         """
-        self.authenticate(Permission.GET_RAW_FILE)
+        await self.authenticate(Permission.GET_RAW_FILE)
         try:
-            blob = self._data_model.get_raw_file_bytes(checksum)
+            blob = await self._data_model.get_raw_file_blob_async(checksum)
         except KeyError as exc:
             raise HTTPError(HTTPStatus.NOT_FOUND, "Invalid checksum") from exc
-        self._logger.debug("Retrieved %d bytes", len(blob))
-        self.set_header("Content-Type", "application/octet-stream")
-        self.write(blob)
-        self.flush()
+        self._logger.debug("Sending %d bytes", blob.size)
+        await self.write_blob(blob, "application/octet-stream", etag=checksum)
+
+
+class RawArchiveHandler(AuthenticatedDataHandler):
+    """Streams many raw files as one uncompressed tar archive
+
+    Members are named by checksum and keep the raw file extension.  Frames that could not be
+    sent are listed in a final `missing.json` member.
+    """
+
+    SUPPORTED_METHODS = ("POST", "OPTIONS")
+
+    def initialize(self, key_store, data_model: DataModel):
+        self._logger = logging.getLogger("RawArchiveHandler")
+        return super().initialize(key_store, data_model)
+
+    async def post(self) -> None:
+        """Post method implementation"""
+        await self.authenticate(Permission.GET_RAW_FILE)
+        checksums = await self._parse_archive_checksums()
+        if len(checksums) > settings.web_api.max_batch_checksums:
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST,
+                f"At most {settings.web_api.max_batch_checksums} checksums per request",
+            )
+
+        self.set_header("Content-Type", "application/x-tar")
+        self.set_header("Content-Disposition", 'attachment; filename="raw.tar"')
+        missing = {}
+        n_bytes = 0
+        async with aclosing(
+            self._data_model.iter_raw_file_blobs_async(
+                checksums, prefetch=settings.web_api.archive_prefetch
+            )
+        ) as blobs:
+            async for checksum, unc_path, blob in blobs:
+                if blob is None:
+                    missing[checksum] = "unknown" if unc_path is None else "not found"
+                    continue
+                await self._write_member(f"{checksum}{unc_path.suffix}", blob)
+                n_bytes += blob.size
+        document = json_utils.dumps({"missing": missing})
+        await self._write_member("missing.json", Blob.from_bytes(document))
+        self.write(END_OF_ARCHIVE)
+        self._logger.debug(
+            "Sent %d of %d frames, %d bytes",
+            len(checksums) - len(missing),
+            len(checksums),
+            n_bytes,
+        )
         self.finish()
 
+    async def _parse_archive_checksums(self) -> List[str]:
+        body = self._parse_body()
+        if "jobId" not in body:
+            return list(dict.fromkeys(self._parse_checksum_list(body)))
+        try:
+            job_id = uuid.UUID(body["jobId"])
+        except (TypeError, ValueError, AttributeError) as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid job ID") from exc
+        checksums = await self._data_model.get_job_checksums_async(job_id)
+        if not checksums:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Job has no frames")
+        return checksums
+
+    async def _write_member(self, name: str, blob: Blob) -> None:
+        self.write(member_header(name, blob.size))
+        async with aclosing(
+            blob.iter_chunks(settings.web_api.stream_chunk_size)
+        ) as chunks:
+            async for chunk in chunks:
+                await self._throttle(len(chunk))
+                self.write(chunk)
+                await self.flush()
+        self.write(member_padding(blob.size))
+
 
 class LensCalHandler(AuthenticatedHandler):
     """Lens Calibration Data Handler"""
 
     SUPPORTED_METHODS = ("GET", "OPTIONS")
-    PATH_OVERRIDE = "/api/v1/data/lens_cal"
 
     def initialize(self, key_store, data_model: DataModel):
         self._data_model = data_model
@@ -345,26 +721,36 @@ class LensCalHandler(AuthenticatedHandler):
         Args:
             checksum (str): Raw File checksum
         """
-        self.authenticate(Permission.GET_RAW_FILE)
-        blob = self._data_model.get_lens_cal_bytes(camera_id)
-        self._logger.debug("Retrieved %d bytes", len(blob))
-        self.set_header("Content-Type", "application/octet-stream")
-        self.write(blob)
-        self.flush()
-        self.finish()
+        await self.authenticate(Permission.GET_RAW_FILE)
+        blob = await self._data_model.get_lens_cal_blob_async(camera_id)
+        self._logger.debug("Sending %d bytes", blob.size)
+        await self.write_blob(blob, "application/octet-stream")
 
 
-class PreprocessJpegHandler(AuthenticatedHandler):
+@stream_request_body
+class PreprocessJpegHandler(SpooledUploadMixin, AuthenticatedHandler):
     """Preprocess Jpeg handler"""
 
     SUPPORTED_METHODS = ("PUT", "OPTIONS", "GET")
-    PATH_OVERRIDE = "/api/v1/data/preprocess_jpeg"
 
     def initialize(self, key_store, data_model: DataModel):
         self._data_model = data_model
         self._logger = logging.getLogger("PreprocessJpegHandler")
         return super().initialize(key_store)
 
+    def _get_upload_limit(self) -> int:
+        return settings.web_api.max_jpeg_upload_size
+
+    async def _open_spool(self, checksum: str) -> UploadSpool:
+        await self.authenticate(Permission.PUT_PREPROCESS_JPEG)
+        try:
+            await self._data_model.verify_raw_checksum_async(checksum)
+        except KeyError as exc:
+            raise HTTPError(HTTPStatus.NOT_FOUND) from exc
+        return await self._data_model.open_artifact_upload_async(
+            checksum, CacheArtifact.PREPROCESS_JPEG, self._get_upload_limit()
+        )
+
     async def put(self, checksum: str) -> None:
         """Put Method Handler
 
@@ -372,15 +758,13 @@ class PreprocessJpegHandler(AuthenticatedHandler):
             checksum (str): Raw File Checksum
 
         Raises:
-            HTTPError: Not Found
+            HTTPError: Upload too large or corrupt
         """
-        self.authenticate(Permission.PUT_PREPROCESS_JPEG)
-        try:
-            self._data_model.verify_raw_checksum(checksum)
-        except KeyError as exc:
-            raise HTTPError(HTTPStatus.NOT_FOUND) from exc
-
-        self._data_model.put_preprocess_jpeg(checksum=checksum, data=self.request.body)
+        spool = self._get_upload()
+        await self._data_model.commit_artifact_upload_async(
+            checksum, CacheArtifact.PREPROCESS_JPEG, spool
+        )
+        self._logger.debug("Stored %d bytes for %s", spool.size, checksum)
         self.set_status(HTTPStatus.OK)
         self.finish()
 
@@ -390,22 +774,18 @@ class PreprocessJpegHandler(AuthenticatedHandler):
         Args:
             checksum (str): Raw File checksum
         """
-        blob = self._data_model.get_preprocess_jpeg(checksum)
-        self._logger.debug("Retrieved %d bytes", len(blob))
-        self.set_header("Content-Type", "image/jpeg")
-        self.set_header(
-            "Cache-Control", "max-age=3600, must-revalidate, no-transform, immutable"
-        )
-        self.write(blob)
-        self.flush()
-        self.finish()
+        blob, digest = await self._data_model.get_preprocess_jpeg_blob_async(checksum)
+        self._logger.debug("Sending %d bytes", blob.size)
+        # The image may be uploaded again, so clients revalidate against the content digest,
+        # which is also the ETag returned by PUT
+        self.set_header("Cache-Control", "no-cache, no-transform")
+        await self.write_blob(blob, "image/jpeg", etag=digest)
 
 
 class LaserLabelHandler(AuthenticatedHandler):
     """Laser Label Handler"""
 
     SUPPORTED_METHODS = ("GET", "OPTIONS")
-    PATH_OVERRIDE = "/api/v1/data/laser_label"
 
     def initialize(self, key_store, data_model: DataModel):
         self._data_model = data_model
@@ -418,9 +798,9 @@ class LaserLabelHandler(AuthenticatedHandler):
         Args:
             checksum (str): Raw File Checksum
         """
-        self.authenticate(Permission.GET_RAW_FILE)
+        await self.authenticate(Permission.GET_RAW_FILE)
         try:
-            document = self._data_model.get_laser_label(checksum)
+            document = await self._data_model.get_laser_label_async(checksum)
         except KeyError as exc:
             self._logger.warning("Invalid raw file checksum %s", checksum)
             raise HTTPError(HTTPStatus.NOT_FOUND) from exc
@@ -435,7 +815,6 @@ class HeadTailLabelHandler(AuthenticatedHandler):
     """Head Tail label handler"""
 
     SUPPORTED_METHODS = ("DELETE", "OPTIONS")
-    PATH_OVERRIDE = "/api/v1/data/head_tail"
 
     def initialize(self, key_store, data_model: DataModel):
         self._data_model = data_model
@@ -448,24 +827,37 @@ class HeadTailLabelHandler(AuthenticatedHandler):
         Args:
             checksum (str): Raw file checksum
         """
-        self.authenticate(Permission.ADMIN)
-        self._data_model.delete_headtail_label(checksum)
+        await self.authenticate(Permission.ADMIN)
+        await self._data_model.delete_headtail_label_async(checksum)
         self.set_status(HTTPStatus.OK)
         self.finish()
         self._logger.debug("Deleted %s", checksum)
 
 
-class PreprocessLaserJpegHandler(AuthenticatedHandler):
+@stream_request_body
+class PreprocessLaserJpegHandler(SpooledUploadMixin, AuthenticatedHandler):
     """Preprocess Laser Jpeg handler"""
 
     SUPPORTED_METHODS = ("PUT", "OPTIONS", "GET", "DELETE")
-    PATH_OVERRIDE = "/api/v1/data/laser_jpeg"
 
     def initialize(self, key_store, data_model: DataModel):
         self._data_model = data_model
         self._logger = logging.getLogger("PreprocessLaserJpegHandler")
         return super().initialize(key_store)
 
+    def _get_upload_limit(self) -> int:
+        return settings.web_api.max_jpeg_upload_size
+
+    async def _open_spool(self, checksum: str) -> UploadSpool:
+        await self.authenticate(Permission.PUT_LASER_FRAME)
+        try:
+            await self._data_model.verify_raw_checksum_async(checksum)
+        except KeyError as exc:
+            raise HTTPError(HTTPStatus.NOT_FOUND) from exc
+        return await self._data_model.open_artifact_upload_async(
+            checksum, CacheArtifact.PREPROCESS_LASER_JPEG, self._get_upload_limit()
+        )
+
     async def put(self, checksum: str) -> None:
         """Put Method Handler
 
@@ -473,17 +865,13 @@ class PreprocessLaserJpegHandler(AuthenticatedHandler):
             checksum (str): Raw File Checksum
 
         Raises:
-            HTTPError: Not Found
+            HTTPError: Upload too large or corrupt
         """
-        self.authenticate(Permission.PUT_LASER_FRAME)
-        try:
-            self._data_model.verify_raw_checksum(checksum)
-        except KeyError as exc:
-            raise HTTPError(HTTPStatus.NOT_FOUND) from exc
-
-        self._data_model.put_preprocess_laser_jpeg(
-            checksum=checksum, data=self.request.body
+        spool = self._get_upload()
+        await self._data_model.commit_artifact_upload_async(
+            checksum, CacheArtifact.PREPROCESS_LASER_JPEG, spool
         )
+        self._logger.debug("Stored %d bytes for %s", spool.size, checksum)
         self.set_status(HTTPStatus.OK)
         self.finish()
 
@@ -493,52 +881,118 @@ class PreprocessLaserJpegHandler(AuthenticatedHandler):
         Args:
             checksum (str): Raw File checksum
         """
-        blob = self._data_model.get_preprocess_laser_jpeg(checksum)
-        self._logger.debug("Retrieved %d bytes", len(blob))
-        self.set_header("Content-Type", "image/jpeg")
-        self.set_header(
-            "Cache-Control", "max-age=3600, must-revalidate, no-transform, immutable"
-        )
-        self.write(blob)
-        self.flush()
-        self.finish()
+        blob, digest = await self._data_model.get_preprocess_laser_jpeg_blob_async(checksum)
+        self._logger.debug("Sending %d bytes", blob.size)
+        # The image may be uploaded again, so clients revalidate against the content digest,
+        # which is also the ETag returned by PUT
+        self.set_header("Cache-Control", "no-cache, no-transform")
+        await self.write_blob(blob, "image/jpeg", etag=digest)
 
     async def delete(self, checksum: str) -> None:
-        self.authenticate(Permission.ADMIN)
+        await self.authenticate(Permission.ADMIN)
         try:
-            self._data_model.verify_raw_checksum(checksum)
+            await self._data_model.verify_raw_checksum_async(checksum)
         except KeyError as exc:
             raise HTTPError(HTTPStatus.NOT_FOUND) from exc
 
-        self._data_model.delete_preprocess_laser_jpeg(checksum)
+        await self._data_model.delete_preprocess_laser_jpeg_async(checksum)
         self.set_status(HTTPStatus.OK)
         self.finish()
         self._logger.debug("Deleted %s", checksum)
 
 
-class DebugDataHandler(AuthenticatedJobHandler):
+class DerivativeHandler(BaseHandler):
+    """Resized preprocessed JPEG handler
+
+    Serves downscaled copies of preprocessed JPEGs for labeling.  Like the full size JPEGs,
+    these are loaded directly by the labeling front end, so are not authenticated.
+    """
+
+    SUPPORTED_METHODS = ("GET", "OPTIONS")
+
+    ARTIFACTS = {
+        "preprocess_jpeg": CacheArtifact.PREPROCESS_JPEG,
+        "laser_jpeg": CacheArtifact.PREPROCESS_LASER_JPEG,
+    }
+
+    def initialize(self, key_store, data_model: DataModel):
+        # pylint: disable=unused-argument
+        self._data_model = data_model
+        self._logger = logging.getLogger("DerivativeHandler")
+
+    def _get_int_argument(self, name: str, default: Optional[int] = None) -> int:
+        value = self.get_query_argument(name, default=None)
+        if value is None:
+            if default is None:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} not provided")
+            return default
+        try:
+            return int(value)
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid {name}") from exc
+
+    async def get(self, source: str, checksum: str) -> None:
+        """Get method implementation
+
+        Args:
+            source (str): Source image, `preprocess_jpeg` or `laser_jpeg`
+            checksum (str): Raw File checksum
+        """
+        artifact = self.ARTIFACTS[source]
+        width = self._get_int_argument("width")
+        quality = self._get_int_argument(
+            "quality", settings.data_model.derivative_default_quality
+        )
+        try:
+            blob, source_digest = await self._data_model.get_derivative_blob_async(
+                checksum, artifact, width, quality
+            )
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc)) from exc
+        except KeyError as exc:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Invalid checksum") from exc
+        except FileNotFoundError as exc:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Image not found") from exc
+        self._logger.debug("Sending %d bytes", blob.size)
+        # The source may be uploaded again, so derivatives are tagged with its version
+        self.set_header("Cache-Control", "no-cache, no-transform")
+        await self.write_blob(
+            blob, "image/jpeg", etag=f"{source_digest}_w{width}_q{quality}"
+        )
+
+
+@stream_request_body
+class DebugDataHandler(SpooledUploadMixin, AuthenticatedJobHandler):
     """Debug Data Handler"""
 
     SUPPORTED_METHODS = ("PUT", "OPTIONS")
-    PATH_OVERRIDE = "/api/v1/debug"
 
     def initialize(self, key_store, orchestrator: Orchestrator, data_model: DataModel):
         self._data_model = data_model
         self._logger = logging.getLogger("DebugDataHandler")
         return super().initialize(key_store, orchestrator)
 
-    async def put(self, job_id: str) -> None:
-        self.authenticate(Permission.PUT_DEBUG_BLOB)
+    def _get_upload_limit(self) -> int:
+        return settings.web_api.max_debug_upload_size
+
+    async def _open_spool(self, job_id: str) -> UploadSpool:
+        await self.authenticate(Permission.PUT_DEBUG_BLOB)
         try:
             job_id = uuid.UUID(job_id)
         except ValueError as exc:
             raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid job id") from exc
-        if not self._orchestrator.is_valid_job(job_id):
-            raise HTTPError(HTTPStatus.NOT_FOUND, "Job not found") from exc
-        self._data_model.put_debug_data(job_id=job_id, data=self.request.body)
+        if not await self._orchestrator.is_valid_job_async(job_id):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Job not found")
+        return await self._data_model.open_debug_upload_async(
+            job_id, self._get_upload_limit()
+        )
+
+    async def put(self, job_id: str) -> None:
+        spool = self._get_upload()
+        await self._data_model.commit_upload_async(spool)
         self.set_status(HTTPStatus.OK)
         self.finish()
-        self._logger.debug("Stored %d bytes", len(self.request.body))
+        self._logger.debug("Stored %d bytes for %s", spool.size, job_id)
 
 
 class ApiKeyAdminHandler(AuthenticatedHandler):
@@ -551,12 +1005,12 @@ class ApiKeyAdminHandler(AuthenticatedHandler):
         return super().initialize(key_store)
 
     async def put(self, *_, **__) -> None:
-        self._modify_perms(True)
+        await self._modify_perms(True)
 
-    def _modify_perms(self, value: bool) -> None:
-        self.authenticate(Permission.ADMIN)
+    async def _modify_perms(self, value: bool) -> None:
+        await self.authenticate(Permission.ADMIN)
         key = self.get_query_argument("key")
-        body = json.loads(self.request.body.decode("utf-8"))
+        body = json_utils.loads(self.request.body)
         if "scopes" not in body:
             raise HTTPError(HTTPStatus.BAD_REQUEST, "Scopes not provided")
         if not isinstance(body["scopes"], list):
@@ -566,21 +1020,20 @@ class ApiKeyAdminHandler(AuthenticatedHandler):
         if not all(x in Permission for x in body["scopes"]):
             raise HTTPError(HTTPStatus.BAD_REQUEST, "Scopes not valid permissions")
         for scope in body["scopes"]:
-            self._key_store.set_perm(key, Permission(scope), value)
+            await self._key_store.set_perm_async(key, Permission(scope), value)
         self.set_status(HTTPStatus.OK)
         self.finish()
 
     async def delete(self, *_, **__) -> None:
-        self._modify_perms(False)
+        await self._modify_perms(False)
 
     async def get(self, *_, **__) -> None:
-        self.authenticate()
+        await self.authenticate()
         key = self.get_query_argument(
             "key", default=self.request.headers.get("api_key")
         )
-        perms = self._key_store.get_perm(key)
+        perms = await self._key_store.get_perm_async(key)
         self.set_status(HTTPStatus.OK)
-        self.set_header("Content-Type", "application/json")
         self.write({"scopes": [perm.value for perm in perms]})
         self.finish()
 
@@ -596,17 +1049,18 @@ class NewKeyHandler(AuthenticatedHandler):
 
     async def post(self, *_, **__) -> None:
         """post method handler"""
-        self.authenticate(Permission.ADMIN)
+        await self.authenticate(Permission.ADMIN)
         comment = self.get_query_argument("comment")
         expiration = dt.datetime.fromisoformat(
             self.get_query_argument("expiration", default=None)
         )
         scopes = self.get_query_arguments("scopes")
-        key, expires = self._key_store.get_new_key(comment=comment, expires=expiration)
+        key, expires = await self._key_store.get_new_key_async(
+            comment=comment, expires=expiration
+        )
         for scope in scopes:
-            self._key_store.set_perm(key, Permission(scope), True)
+            await self._key_store.set_perm_async(key, Permission(scope), True)
         self.set_status(HTTPStatus.OK)
-        self.set_header("Content-Type", "application/json")
         self.write(
             {
                 "key": key,
@@ -616,11 +1070,97 @@ class NewKeyHandler(AuthenticatedHandler):
         self.finish()
 
 
+class CacheAdminHandler(AuthenticatedDataHandler):
+    """Cache administration base handler"""
+
+    def _parse_checksums(self) -> Tuple[List[str], CacheArtifact]:
+        """Parses the checksum list and artifact type from the request body
+
+        Raises:
+            HTTPError: Bad request
+
+        Returns:
+            Tuple[List[str], CacheArtifact]: Checksums and artifact type
+        """
+        body = self._parse_body()
+        return self._parse_checksum_list(body), self._parse_artifact(body)
+
+    def _parse_artifact(self, body: dict) -> CacheArtifact:
+        artifact = body.get("artifact", CacheArtifact.RAW.value)
+        if artifact not in CacheArtifact:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid artifact")
+        return CacheArtifact(artifact)
+
+
+class CacheStatsHandler(CacheAdminHandler):
+    """Cache statistics handler"""
+
+    SUPPORTED_METHODS = ("GET", "OPTIONS")
+
+    async def get(self, *_, **__) -> None:
+        """Dumps cache statistics"""
+        await self.authenticate(Permission.ADMIN)
+        self.finish(await self._data_model.get_cache_stats_async())
+
+
+class CacheWarmHandler(CacheAdminHandler):
+    """Cache warming handler"""
+
+    SUPPORTED_METHODS = ("POST", "OPTIONS")
+
+    async def post(self, *_, **__) -> None:
+        """Queues checksums or a dive for caching"""
+        await self.authenticate(Permission.ADMIN)
+        body = self._parse_body()
+        if "dive" in body:
+            result = await self._data_model.warm_dive_cache_async(
+                str(body["dive"]), self._parse_artifact(body)
+            )
+        else:
+            checksums, artifact = self._parse_checksums()
+            result = await self._data_model.warm_cache_async(checksums, artifact)
+        self.set_status(HTTPStatus.ACCEPTED)
+        self.finish(result)
+
+
+class CachePinHandler(CacheAdminHandler):
+    """Cache pinning handler"""
+
+    SUPPORTED_METHODS = ("PUT", "DELETE", "OPTIONS")
+
+    async def put(self, *_, **__) -> None:
+        """Pins checksums in the cache"""
+        await self.authenticate(Permission.ADMIN)
+        checksums, artifact = self._parse_checksums()
+        self.finish(
+            await self._data_model.pin_cache_async(checksums, artifact, pin=True)
+        )
+
+    async def delete(self, *_, **__) -> None:
+        """Unpins checksums in the cache"""
+        await self.authenticate(Permission.ADMIN)
+        checksums, artifact = self._parse_checksums()
+        self.finish(
+            await self._data_model.pin_cache_async(checksums, artifact, pin=False)
+        )
+
+
+class CacheEvictHandler(CacheAdminHandler):
+    """Cache eviction handler"""
+
+    SUPPORTED_METHODS = ("POST", "OPTIONS")
+
+    async def post(self, *_, **__) -> None:
+        """Evicts checksums from the cache"""
+        await self.authenticate(Permission.ADMIN)
+        checksums, artifact = self._parse_checksums()
+        self.finish(await self._data_model.evict_cache_async(checksums, artifact))
+
+
 class FrameMetadataHandler(AuthenticatedDataHandler):
     """Frame metadata handler"""
 
     SUPPORTED_METHODS = ("GET", "OPTIONS")
-    PATH_OVERRIDE = "/api/v1/metadata/frame"
 
     def initialize(self, key_store, data_model):
         self._logger = logging.getLogger("FrameMetadataHandler")
@@ -632,9 +1172,9 @@ class FrameMetadataHandler(AuthenticatedDataHandler):
         Args:
             checksum (str): Raw File Checksum
         """
-        self.authenticate(Permission.GET_METADATA)
+        await self.authenticate(Permission.GET_METADATA)
         try:
-            document = self._data_model.get_frame_metadata(checksum)
+            document = await self._data_model.get_frame_metadata_async(checksum)
         except KeyError as exc:
             self._logger.warning("Invalid raw file checksum %s", checksum)
             raise HTTPError(HTTPStatus.NOT_FOUND) from exc
@@ -642,14 +1182,42 @@ class FrameMetadataHandler(AuthenticatedDataHandler):
             self._logger.info("No frame metadata for %s", checksum)
             raise HTTPError(HTTPStatus.NOT_FOUND)
 
-        self.finish(json.dumps(document, default=str))
+        self.finish(document)
+
+
+class FramesMetadataHandler(AuthenticatedDataHandler):
+    """Batch frame metadata handler"""
+
+    SUPPORTED_METHODS = ("POST", "OPTIONS")
+
+    def initialize(self, key_store, data_model):
+        self._logger = logging.getLogger("FramesMetadataHandler")
+        return super().initialize(key_store, data_model)
+
+    async def post(self) -> None:
+        """Post method implementation"""
+        await self.authenticate(Permission.GET_METADATA)
+        checksums = self._parse_checksum_list(self._parse_body())
+        if len(checksums) > settings.web_api.max_batch_checksums:
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST,
+                f"At most {settings.web_api.max_batch_checksums} checksums per request",
+            )
+        document = await self._data_model.get_frames_metadata_async(checksums)
+        if document["unknown"]:
+            self._logger.info(
+                "%d of %d checksums not recognized",
+                len(document["unknown"]),
+                len(checksums),
+            )
+
+        self.finish(document)
 
 
 class DiveMetadataHandler(AuthenticatedDataHandler):
     """Dive metadata handler"""
 
     SUPPORTED_METHODS = ("GET", "OPTIONS")
-    PATH_OVERRIDE = "/api/v1/metadata/dive"
 
     def initialize(self, key_store, data_model):
         self._logger = logging.getLogger("DiveMetadataHandler")
@@ -661,8 +1229,8 @@ class DiveMetadataHandler(AuthenticatedDataHandler):
         Args:
             checksum (str): Dive checksum
         """
-        self.authenticate(Permission.GET_METADATA)
-        document = self._data_model.get_dive_metadata(checksum)
+        await self.authenticate(Permission.GET_METADATA)
+        document = await self._data_model.get_dive_metadata_async(checksum)
         self.finish(document)
 
 
@@ -677,6 +1245,6 @@ class DiveListHandler(AuthenticatedDataHandler):
 
     async def get(self) -> None:
         """Dive list handler GET"""
-        self.authenticate(Permission.GET_METADATA)
-        dive_list = self._data_model.list_dives()
+        await self.authenticate(Permission.GET_METADATA)
+        dive_list = await self._data_model.list_dives_async()
         self.finish({"dives": dive_list})
@@ -0,0 +1,163 @@
+'''Events shared between the forked web processes
+'''
+import asyncio
+import inspect
+import json
+import logging
+import queue
+import uuid
+from threading import Thread
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import psycopg
+from psycopg_pool import ConnectionPool
+
+from fishsense_data_processing_spider.metrics import (add_thread_to_monitor,
+                                                      get_counter)
+
+EventHandler = Callable[[Dict[str, Any]], Any]
+
+
+class EventBus:
+    """Relays cache invalidations and job notifications between the web processes
+
+    Events are sent with Postgres NOTIFY and received with LISTEN.  A process applies its own
+    changes directly, so the events it publishes are ignored when they come back, and only the
+    other processes run their handlers.  `publish` never blocks: events are sent in order from a
+    background thread.
+
+    Events sent while the listening connection is down are lost.  After reconnecting, the
+    `RESYNC` handlers run so that subscribers can drop anything they may have missed.
+    """
+    CHANNEL = 'e4efs_spider_events'
+    RESYNC = 'resync'
+    # NOTIFY payloads must be shorter than 8000 bytes
+    MAX_PAYLOAD = 7900
+
+    def __init__(self,
+                 conninfo: str,
+                 pg_pool: ConnectionPool,
+                 *,
+                 reconnect_delay: float = 5.0):
+        self.__log = logging.getLogger('EventBus')
+        self.__conninfo = conninfo
+        self.__pg_pool = pg_pool
+        self.__reconnect_delay = reconnect_delay
+        self.__sender = uuid.uuid4().hex
+        self.__handlers: Dict[str, List[EventHandler]] = {}
+        self.__tasks: Set[asyncio.Task] = set()
+        self.__outbox: queue.SimpleQueue[Optional[str]] = queue.SimpleQueue()
+        self.__publisher = Thread(
+            target=self.__publish_loop,
+            name='event_publisher',
+            daemon=True
+        )
+        self.__events = get_counter(
+            'events',
+            'Events relayed between web processes',
+            labelnames=['event', 'direction'],
+            namespace='e4efs',
+            subsystem='spider'
+        )
+
+    def subscribe(self, event: str, handler: EventHandler) -> None:
+        """Runs `handler` on the event loop for every `event` published by another process
+
+        Handlers receive the event payload, and may be coroutine functions.  Handlers must not
+        block the event loop.
+
+        Args:
+            event (str): Event name
+            handler (EventHandler): Handler
+        """
+        self.__handlers.setdefault(event, []).append(handler)
+
+    def publish(self, event: str, **payload: Any) -> None:
+        """Sends an event to the other web processes.  Safe to call from any thread.
+
+        Args:
+            event (str): Event name
+            **payload: JSON serializable event payload
+
+        Raises:
+            ValueError: Payload is too large for NOTIFY
+        """
+        message = json.dumps({'sender': self.__sender, 'event': event, 'payload': payload})
+        if len(message.encode()) > self.MAX_PAYLOAD:
+            raise ValueError(f'{event} payload is too large')
+        self.__outbox.put(message)
+
+    def start(self) -> None:
+        """Starts the publisher thread
+        """
+        add_thread_to_monitor(self.__publisher)
+        self.__publisher.start()
+
+    def stop(self) -> None:
+        """Sends the events already published, then stops the publisher thread
+        """
+        self.__outbox.put(None)
+        self.__publisher.join()
+
+    async def listen(self) -> None:
+        """Receives events until cancelled, reconnecting whenever the connection drops
+        """
+        connected = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                        self.__conninfo, autocommit=True) as con:
+                    await con.execute(f'LISTEN {self.CHANNEL};')
+                    if connected:
+                        self.__log.warning('Reconnected, events may have been missed')
+                        self.__dispatch(self.RESYNC, {})
+                    connected = True
+                    async for notify in con.notifies():
+                        self.__receive(notify.payload)
+            except psycopg.OperationalError as exc:
+                self.__log.warning('Event connection failed due to %s, retrying', exc)
+                await asyncio.sleep(self.__reconnect_delay)
+
+    def __receive(self, message: str) -> None:
+        try:
+            event = json.loads(message)
+        except json.JSONDecodeError:
+            self.__log.error('Malformed event %s', message)
+            return
+        if event['sender'] == self.__sender:
+            return
+        self.__events.labels(event=event['event'], direction='received').inc()
+        self.__dispatch(event['event'], event['payload'])
+
+    def __dispatch(self, event: str, payload: Dict[str, Any]) -> None:
+        for handler in self.__handlers.get(event, ()):
+            try:
+                result = handler(payload)
+            except Exception as exc:  # pylint: disable=broad-except
+                self.__log.exception('%s handler failed due to %s', event, exc)
+                continue
+            if inspect.isawaitable(result):
+                task = asyncio.ensure_future(result)
+                self.__tasks.add(task)
+                task.add_done_callback(self.__handler_done)
+
+    def __handler_done(self, task: asyncio.Task) -> None:
+        self.__tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.__log.error('Event handler failed', exc_info=task.exception())
+
+    def __publish_loop(self) -> None:
+        while True:
+            message = self.__outbox.get()
+            if message is None:
+                return
+            try:
+                with self.__pg_pool.connection() as con:
+                    con.execute(
+                        'SELECT pg_notify(%(channel)s, %(message)s);',
+                        {'channel': self.CHANNEL, 'message': message}
+                    )
+            except psycopg.Error as exc:
+                self.__log.exception('Could not publish %s due to %s', message, exc)
+                continue
+            self.__events.labels(event=json.loads(message)['event'], direction='sent').inc()
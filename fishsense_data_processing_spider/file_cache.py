@@ -1,21 +1,66 @@
 """Represents a file system cache."""
 
+import enum
+import hashlib
 import logging
 import pickle
+import re
 import subprocess
 import threading
+import time
 import uuid
 from pathlib import Path
-from typing import Dict, Self
+from typing import Any, Dict, NamedTuple, Optional, Self, Set, Union
 
 from fishsense_data_processing_spider.config import settings
+from fishsense_data_processing_spider.metrics import (get_counter, get_gauge,
+                                                      get_histogram,
+                                                      set_gauge_function)
+from fishsense_data_processing_spider.timing import phase
+
+
+class CacheArtifact(enum.StrEnum):
+    """Content-addressed cache artifact types"""
+
+    RAW = "raw"
+    PREPROCESS_JPEG = "preprocess_jpeg"
+    PREPROCESS_LASER_JPEG = "preprocess_laser_jpeg"
+
+
+class BlobKey(NamedTuple):
+    """Content-addressed cache key"""
+
+    checksum: str
+    artifact: str
+
+    @property
+    def file_name(self) -> str:
+        """File name of this blob inside its shard directory"""
+        return f"{self.checksum}.{self.artifact}"
+
+
+CacheKey = Union[Path, BlobKey]
+
+BLOB_CHECKSUM_PATTERN = re.compile(r"^[a-z0-9]{4,}$")
+BLOB_ARTIFACT_PATTERN = re.compile(r"^[a-z0-9_]+$")
 
 
 class FileCache:
     # pylint: disable=too-many-instance-attributes
 
-    """Represents a file system cache."""
-    instance: Self = None
+    """Represents a file system cache.
+
+    Use `FileCache.get_instance()` to retrieve the shared cache; it is created on first use.  The
+    index is loaded from `cache_map.pickle`, while entry sizes, orphaned files and the blob index
+    are reconciled against the cache directory in the background.
+
+    Entries are keyed either by the local `Path` of the source file, or by content through a
+    `BlobKey` (checksum and artifact type).  Content-addressed blobs are stored in a sharded
+    directory layout (`blobs/ab/cd/abcd....raw`) so that the blob index can be rebuilt from the
+    directory alone.
+    """
+    instance: Optional[Self] = None
+    _instance_lock = threading.Lock()
 
     def __init__(self, max_storage_mb: int = None):
         self.__log = logging.getLogger("FileCache")
@@ -26,48 +71,249 @@ class FileCache:
 
         self.__cache_path: Path = settings.cache.path
         self.__cache_path.mkdir(parents=True, exist_ok=True)
+        self.__blob_path = self.__cache_path / "blobs"
+        self.__blob_path.mkdir(parents=True, exist_ok=True)
 
         self.__log.debug("Cache path: %s", self.__cache_path)
 
         self.__cache_map_pickle_path = self.__cache_path / "cache_map.pickle"
+        # Files created after this point may belong to in-flight fills
+        self.__start_time = time.time()
         self.__cache_map_lock = threading.Lock()
-        if self.__cache_map_pickle_path.exists():
-            with self.__cache_map_pickle_path.open("rb") as file:
-                self.__cache_map = pickle.load(file)
-        else:
-            self.__cache_map: Dict[Path, Path] = {}
+        self.__cache_map: Dict[CacheKey, Path] = self.__load_cache_map()
 
         self.__max_storage_mb = max_storage_mb
-        self.__occupied_storage = self.__get_occupied_storage()
+        # Sizes of entries loaded from the pickle are unknown until reconciled in the background
+        self.__occupied_storage = 0
+        self.__unsized_keys: Set[CacheKey] = set(self.__cache_map.keys())
+        self.__reconciled = threading.Event()
+
+        self.__pinned_keys: Set[CacheKey] = set()
+        self.__in_flight_keys: Set[CacheKey] = set()
+        # Keys removed while a fill was copying them, the copy holds the old content
+        self.__superseded_keys: Set[CacheKey] = set()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evicted_bytes = 0
+
+        self.__requests_counter = get_counter(
+            "file_cache_requests",
+            "File cache lookups",
+            labelnames=["mode", "result"],
+            namespace="e4efs",
+            subsystem="spider",
+        )
+        self.__fill_duration = get_histogram(
+            "file_cache_fill_duration",
+            "File cache fill duration",
+            labelnames=["mode"],
+            namespace="e4efs",
+            subsystem="spider",
+            unit="seconds",
+            buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf")),
+        )
+        self.__evicted_bytes_counter = get_counter(
+            "file_cache_evicted_bytes",
+            "Bytes removed from the file cache",
+            labelnames=["reason"],
+            namespace="e4efs",
+            subsystem="spider",
+        )
+        self.__fills_in_flight = get_gauge(
+            "file_cache_fills_in_flight",
+            "File cache fills in progress",
+            namespace="e4efs",
+            subsystem="spider",
+        )
+        set_gauge_function(
+            get_gauge(
+                "file_cache_occupied_bytes",
+                "File cache occupied bytes",
+                namespace="e4efs",
+                subsystem="spider",
+                multiprocess_mode="livesum",
+            ),
+            lambda: self.__occupied_storage,
+        )
+        set_gauge_function(
+            get_gauge(
+                "file_cache_entries",
+                "File cache entries",
+                namespace="e4efs",
+                subsystem="spider",
+                multiprocess_mode="livesum",
+            ),
+            lambda: len(self.__cache_map),
+        )
 
         self.__garbage_collector_lock = threading.Lock()
         self._garbage_collector_thread = threading.Thread(
             target=self.__do_collect_garbage, name="collect_garbage", daemon=True
         )
+        self._reconcile_thread = threading.Thread(
+            target=self.__reconcile, name="reconcile_file_cache", daemon=True
+        )
+        self._reconcile_thread.start()
+
+    @classmethod
+    def get_instance(cls) -> Self:
+        """Retrieves the process-wide file cache, creating it on first use
+
+        Returns:
+            Self: File cache
+        """
+        if cls.instance is None:
+            with cls._instance_lock:
+                if cls.instance is None:
+                    cls.instance = cls()
+        return cls.instance
+
+    def __load_cache_map(self) -> Dict[CacheKey, Path]:
+        if not self.__cache_map_pickle_path.exists():
+            self.__log.info("No cache index, rebuilding from %s", self.__cache_path)
+            return {}
+        try:
+            with self.__cache_map_pickle_path.open("rb") as file:
+                cache_map = pickle.load(file)
+            if not isinstance(cache_map, dict):
+                raise TypeError(f"Unexpected cache index type {type(cache_map)}")
+            return cache_map
+        except Exception as exc:  # pylint: disable=broad-except
+            self.__log.warning(
+                "Cache index %s is corrupt, rebuilding: %s", self.__cache_map_pickle_path, exc
+            )
+            return {}
+
+    def wait_for_reconcile(self, timeout: Optional[float] = None) -> bool:
+        """Waits for the background index reconciliation to finish
+
+        Args:
+            timeout (Optional[float], optional): Timeout in seconds. Defaults to None.
+
+        Returns:
+            bool: True if reconciled, otherwise False
+        """
+        return self.__reconciled.wait(timeout)
+
+    def __reconcile(self):
+        try:
+            self.__reconcile_sizes()
+            self.__rebuild_blob_index()
+            self.__remove_orphans()
+            with self.__cache_map_lock:
+                self.__pickle_cache_map()
+        except Exception as exc:  # pylint: disable=broad-except
+            self.__log.exception("Cache reconciliation failed: %s", exc)
+        finally:
+            self.__reconciled.set()
+        self.__log.info(
+            "Cache reconciled, %d entries occupying %d bytes",
+            len(self.__cache_map),
+            self.__occupied_storage,
+        )
+        self._collect_garbage()
 
-    def __get_occupied_storage(self) -> int:
-        return sum(f.lstat().st_size for f in self.__cache_map.values())
+    def __reconcile_sizes(self):
+        for key in list(self.__unsized_keys):
+            path = self.__cache_map.get(key)
+            try:
+                size = path.lstat().st_size if path is not None else None
+            except FileNotFoundError:
+                size = None
+            with self.__cache_map_lock:
+                if key not in self.__unsized_keys:
+                    continue
+                self.__unsized_keys.discard(key)
+                if size is None:
+                    self.__cache_map.pop(key, None)
+                else:
+                    self.__occupied_storage += size
+
+    def __remove_orphans(self):
+        referenced = set(self.__cache_map.values())
+        for file in self.__cache_path.iterdir():
+            if file in (self.__cache_map_pickle_path, self.__blob_path):
+                continue
+            if file.is_file() and file not in referenced and self.__predates_start(file):
+                self.__log.debug("Removing orphaned cache file %s", file)
+                file.unlink(missing_ok=True)
+
+    def __predates_start(self, file: Path) -> bool:
+        try:
+            return file.lstat().st_mtime < self.__start_time
+        except FileNotFoundError:
+            return False
+
+    def __get_blob_path(self, key: BlobKey) -> Path:
+        return self.__blob_path / key.checksum[:2] / key.checksum[2:4] / key.file_name
+
+    def __rebuild_blob_index(self):
+        blob_map: Dict[BlobKey, Path] = {}
+        for blob in self.__blob_path.glob("*/*/*"):
+            if blob.name.startswith("."):
+                if self.__predates_start(blob):
+                    # Partial copy left behind by an interrupted fill
+                    blob.unlink(missing_ok=True)
+                continue
+            checksum, _, artifact = blob.name.partition(".")
+            if not BLOB_CHECKSUM_PATTERN.match(checksum) or not artifact:
+                self.__log.warning("Unrecognized blob %s", blob)
+                continue
+            blob_map[BlobKey(checksum, artifact)] = blob
+        with self.__cache_map_lock:
+            for key in [k for k in self.__cache_map if isinstance(k, BlobKey)]:
+                if key not in blob_map and not self.__cache_map[key].exists():
+                    self.__cache_map.pop(key)
+            new_keys = [key for key in blob_map if key not in self.__cache_map]
+        for key in new_keys:
+            try:
+                size = blob_map[key].lstat().st_size
+            except FileNotFoundError:
+                continue
+            with self.__cache_map_lock:
+                if key in self.__cache_map:
+                    continue
+                self.__cache_map[key] = blob_map[key]
+                self.__occupied_storage += size
+        self.__log.info("Indexed %d cached blobs", len(blob_map))
 
     def __do_collect_garbage(self):
+        # Occupancy is only meaningful once every entry has been sized
+        self.__reconciled.wait()
         with self.__garbage_collector_lock:
             if self.__occupied_storage < self.__max_storage_mb:
                 return  # Exit early
 
-            file_keys = list(self.__cache_map.keys())
+            # Snapshot under the lock, as fills and pins change both collections concurrently
+            with self.__cache_map_lock:
+                file_keys = list(self.__cache_map.keys())
+                pinned_keys = set(self.__pinned_keys)
+            file_keys = [key for key in file_keys if key not in pinned_keys]
             # Sort so that earliest time is first.
-            file_keys.sort(key=lambda k: self.__cache_map[k].lstat().st_atime)
+            file_keys.sort(key=self.__get_access_time)
 
             while file_keys:
                 key_to_delete = file_keys.pop(0)
-                self.remove_from_cache(key_to_delete)
+                if key_to_delete in self.__pinned_keys:
+                    # Pinned since the snapshot
+                    continue
+                self.__remove(key_to_delete, reason="capacity")
 
                 if self.__occupied_storage < self.__max_storage_mb:
                     # We have deleted enough files that we are now fine.
                     break
 
+    def __get_access_time(self, key: CacheKey) -> float:
+        try:
+            return self.__cache_map[key].lstat().st_atime
+        except (KeyError, FileNotFoundError):
+            return 0
+
     def __pickle_cache_map(self):
-        with self.__cache_map_pickle_path.open("wb") as file:
+        partial_path = self.__cache_map_pickle_path.with_suffix(".pickle.tmp")
+        with partial_path.open("wb") as file:
             pickle.dump(self.__cache_map, file)
+        partial_path.replace(self.__cache_map_pickle_path)
 
     def _collect_garbage(self):
         # Don't collect garbage if the lock is already held
@@ -75,15 +321,15 @@ class FileCache:
             return
 
         if self.__occupied_storage >= self.__max_storage_mb:
+            if self._garbage_collector_thread.is_alive():
+                return
+            if self._garbage_collector_thread.ident is not None:
+                self._garbage_collector_thread = threading.Thread(
+                    target=self.__do_collect_garbage, name="collect_garbage", daemon=True
+                )
             self._garbage_collector_thread.start()
 
-    def __do_add_to_cache(self, key: Path = None):
-        if self.test_cached_file(key):
-            return
-
-        target_file_name = str(uuid.uuid1())
-        target_path = self.__cache_path / target_file_name
-
+    def __copy_file(self, source: Path, target: Path) -> bool:
         process = subprocess.run(
             [
                 "ionice",
@@ -93,8 +339,8 @@ class FileCache:
                 "-n",
                 "19",
                 "cp",
-                key.absolute().resolve().as_posix(),
-                target_path.absolute().resolve().as_posix(),
+                source.absolute().resolve().as_posix(),
+                target.absolute().resolve().as_posix(),
             ],
             check=False,
         )
@@ -102,29 +348,124 @@ class FileCache:
             process.check_returncode()
         except subprocess.CalledProcessError:
             # We failed, don't save
+            return False
+        return True
+
+    def __fill(self, key: CacheKey, source: Path):
+        with self.__cache_map_lock:
+            if key in self.__cache_map or key in self.__in_flight_keys:
+                return
+            self.__in_flight_keys.add(key)
+        self.__fills_in_flight.inc()
+        try:
+            with self.__fill_duration.labels(mode=self.__get_mode(key)).time():
+                if isinstance(key, BlobKey):
+                    self.__do_add_blob_to_cache(key, source)
+                else:
+                    self.__do_add_to_cache(source)
+        finally:
+            with self.__cache_map_lock:
+                self.__in_flight_keys.discard(key)
+                self.__superseded_keys.discard(key)
+            self.__fills_in_flight.dec()
+
+    def __do_add_to_cache(self, key: Path):
+        target_file_name = str(uuid.uuid1())
+        target_path = self.__cache_path / target_file_name
+
+        if not self.__copy_file(key, target_path):
+            return
+
+        self.__insert(key, target_path)
+
+    def __do_add_blob_to_cache(self, key: BlobKey, source: Path):
+        target_path = self.__get_blob_path(key)
+        if target_path.is_file():
+            # Present on disk but not yet indexed
+            self.__insert(key, target_path)
             return
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        # Copy next to the final location, then rename so that a partially copied file is never
+        # visible under a blob name.
+        partial_path = target_path.parent / f".{uuid.uuid1()}.tmp"
 
+        if not self.__copy_file(source, partial_path):
+            partial_path.unlink(missing_ok=True)
+            return
+        partial_path.replace(target_path)
+
+        self.__insert(key, target_path)
+
+    @staticmethod
+    def __get_mode(key: CacheKey) -> str:
+        return "blob" if isinstance(key, BlobKey) else "path"
+
+    def __record_lookup(self, key: CacheKey, hit: bool):
+        if hit:
+            self.__hits += 1
+        else:
+            self.__misses += 1
+        self.__requests_counter.labels(
+            mode=self.__get_mode(key), result="hit" if hit else "miss"
+        ).inc()
+
+    def __insert(self, key: CacheKey, target_path: Path):
         with self.__cache_map_lock:
+            if key in self.__superseded_keys:
+                target_path.unlink(missing_ok=True)
+                return
+            if key in self.__cache_map and key not in self.__unsized_keys:
+                return
+            self.__unsized_keys.discard(key)
             self.__cache_map[key] = target_path
+            self.__occupied_storage += target_path.lstat().st_size
             self.__pickle_cache_map()
 
         # We only need to worry about collecting garbage when adding.
         self._collect_garbage()
 
-    def add_to_cache(self, key: Path):
+    def add_to_cache(self, key: Path) -> threading.Thread:
         """Adds the given path to the file system cache.
 
         Args:
             key (Path): The path to cache.
+
+        Returns:
+            threading.Thread: Thread performing the copy
         """
         thread = threading.Thread(
-            target=self.__do_add_to_cache,
+            target=self.__fill,
             name="add_to_cache",
             daemon=True,
-            kwargs={"key": key},
+            kwargs={"key": key, "source": key},
+        )
+        thread.start()
+        return thread
+
+    def add_blob_to_cache(
+        self, checksum: str, source: Path, artifact: str = CacheArtifact.RAW
+    ) -> threading.Thread:
+        """Adds the given file to the content-addressed cache.
+
+        Args:
+            checksum (str): Checksum identifying the content
+            source (Path): Path to copy the content from
+            artifact (str, optional): Artifact type. Defaults to CacheArtifact.RAW.
+
+        Returns:
+            threading.Thread: Thread performing the copy
+        """
+        key = self.get_blob_key(checksum, artifact)
+        thread = threading.Thread(
+            target=self.__fill,
+            name="add_blob_to_cache",
+            daemon=True,
+            kwargs={"key": key, "source": source},
         )
         thread.start()
+        return thread
 
+    @phase("cache")
     def get_cached_file(self, key: Path) -> Path:
         """Gets the cached file from the cache
 
@@ -135,18 +476,89 @@ class FileCache:
             Path: The cached path
         """
 
-        if not self.test_cached_file(key):
-            self.add_to_cache(key)
+        cached_path = self.__cache_map.get(key)
+        self.__record_lookup(key, cached_path is not None)
+        if cached_path is None:
+            if key not in self.__in_flight_keys:
+                self.add_to_cache(key)
 
             return key
 
-        return self.__cache_map[key]
+        return cached_path
+
+    @phase("cache")
+    def get_cached_blob(
+        self, checksum: str, source: Path, artifact: str = CacheArtifact.RAW
+    ) -> Path:
+        """Gets the cached blob from the content-addressed cache
+
+        If the blob is not cached, it is copied from `source` in the background and `source` is
+        returned.
+
+        Args:
+            checksum (str): Checksum identifying the content
+            source (Path): Path to fill the cache from
+            artifact (str, optional): Artifact type. Defaults to CacheArtifact.RAW.
+
+        Returns:
+            Path: The cached path, otherwise `source`
+        """
+        key = self.get_blob_key(checksum, artifact)
+        cached_path = self.__cache_map.get(key)
+        self.__record_lookup(key, cached_path is not None)
+        if cached_path is None:
+            if key not in self.__in_flight_keys:
+                self.add_blob_to_cache(checksum, source, artifact)
+            return source
+        return cached_path
+
+    @phase("cache")
+    def lookup_blob(self, checksum: str, artifact: str) -> Optional[Path]:
+        """Gets the cached blob without filling the cache on a miss
+
+        Used for blobs that are generated rather than copied, see `put_blob`.
+
+        Args:
+            checksum (str): Checksum identifying the content
+            artifact (str): Artifact type
+
+        Returns:
+            Optional[Path]: The cached path, otherwise None
+        """
+        key = self.get_blob_key(checksum, artifact)
+        cached_path = self.__cache_map.get(key)
+        self.__record_lookup(key, cached_path is not None)
+        return cached_path
+
+    def put_blob(self, checksum: str, artifact: str, data: bytes) -> Path:
+        """Stores generated content in the content-addressed cache
+
+        Args:
+            checksum (str): Checksum identifying the source content
+            artifact (str): Artifact type
+            data (bytes): Content
 
-    def test_cached_file(self, key: Path) -> bool:
+        Returns:
+            Path: The cached path
+        """
+        key = self.get_blob_key(checksum, artifact)
+        target_path = self.__get_blob_path(key)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = target_path.parent / f".{uuid.uuid1()}.tmp"
+        try:
+            partial_path.write_bytes(data)
+            partial_path.replace(target_path)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
+        self.__insert(key, target_path)
+        return target_path
+
+    def test_cached_file(self, key: CacheKey) -> bool:
         """Tests if the file is cached
 
         Args:
-            key (Path): The path to check the cache.
+            key (CacheKey): The path or blob key to check the cache.
 
         Returns:
             bool: True if in the cache false otherwise
@@ -154,21 +566,175 @@ class FileCache:
 
         return key in self.__cache_map
 
-    def remove_from_cache(self, key: Path):
+    def test_cached_blob(self, checksum: str, artifact: str = CacheArtifact.RAW) -> bool:
+        """Tests if the blob is cached
+
+        Args:
+            checksum (str): Checksum identifying the content
+            artifact (str, optional): Artifact type. Defaults to CacheArtifact.RAW.
+
+        Returns:
+            bool: True if in the cache false otherwise
+        """
+        return self.test_cached_file(self.get_blob_key(checksum, artifact))
+
+    def verify_cached_blob(self, checksum: str) -> bool:
+        """Verifies a cached raw blob against its checksum
+
+        Only raw artifacts are named by the MD5 of their own content, so only those can be
+        verified.  A blob that fails verification is removed from the cache.
+
+        Args:
+            checksum (str): Raw file checksum
+
+        Returns:
+            bool: True if the blob is cached and intact, otherwise False
+        """
+        key = self.get_blob_key(checksum, CacheArtifact.RAW)
+        cached_path = self.__cache_map.get(key)
+        if cached_path is None:
+            return False
+        cksum = hashlib.md5()
+        try:
+            with open(cached_path, "rb") as handle:
+                for blob in iter(lambda: handle.read(1024 * 1024), b""):
+                    cksum.update(blob)
+        except FileNotFoundError:
+            self.__drop(key)
+            return False
+        if cksum.hexdigest() != checksum:
+            self.__log.warning("Cached blob %s is corrupt", cached_path)
+            self.__remove(key, reason="corrupt")
+            return False
+        return True
+
+    def remove_from_cache(self, key: CacheKey):
         """Remove the given path from the cache.
 
         Args:
-            key (Path): The path to remove from the cache.
+            key (CacheKey): The path or blob key to remove from the cache.
         """
+        self.__remove(key, reason="removed")
+
+    def __remove(self, key: CacheKey, reason: str):
+        with self.__cache_map_lock:
+            if key in self.__in_flight_keys:
+                self.__superseded_keys.add(key)
         if not self.test_cached_file(key):
             return
 
         with self.__cache_map_lock:
-            file_to_remove = self.__cache_map.pop(key)
-            self.__occupied_storage -= file_to_remove.lstat().st_size
+            file_to_remove = self.__cache_map.pop(key, None)
+            if file_to_remove is None:
+                return
+            try:
+                size = file_to_remove.lstat().st_size
+                if key in self.__unsized_keys:
+                    self.__unsized_keys.discard(key)
+                else:
+                    self.__occupied_storage -= size
+                file_to_remove.unlink()
+                self.__evicted_bytes += size
+                self.__evicted_bytes_counter.labels(reason=reason).inc(size)
+            except FileNotFoundError:
+                pass
+            self.__pickle_cache_map()
+
+    def remove_blob_from_cache(self, checksum: str, artifact: str = CacheArtifact.RAW):
+        """Removes the given blob from the cache.
+
+        Args:
+            checksum (str): Checksum identifying the content
+            artifact (str, optional): Artifact type. Defaults to CacheArtifact.RAW.
+        """
+        self.remove_from_cache(self.get_blob_key(checksum, artifact))
+
+    def warm(self, entries: Dict[CacheKey, Path]) -> threading.Thread:
+        """Fills the cache with the given entries, one at a time in the background
+
+        Args:
+            entries (Dict[CacheKey, Path]): Mapping of cache keys to the files to fill them from
+
+        Returns:
+            threading.Thread: Thread performing the fills
+        """
+        def warm_body():
+            for key, source in entries.items():
+                try:
+                    self.__fill(key, source)
+                except Exception as exc:  # pylint: disable=broad-except
+                    self.__log.exception("Warming %s failed: %s", key, exc)
+
+        thread = threading.Thread(target=warm_body, name="warm_file_cache", daemon=True)
+        thread.start()
+        return thread
+
+    def pin(self, key: CacheKey) -> None:
+        """Excludes the given entry from garbage collection
+
+        Pins are held in memory and do not survive a restart.
+
+        Args:
+            key (CacheKey): The path or blob key to pin
+        """
+        with self.__cache_map_lock:
+            self.__pinned_keys.add(key)
+
+    def unpin(self, key: CacheKey) -> None:
+        """Allows the given entry to be garbage collected again
+
+        Args:
+            key (CacheKey): The path or blob key to unpin
+        """
+        with self.__cache_map_lock:
+            self.__pinned_keys.discard(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retrieves cache statistics
+
+        Returns:
+            Dict[str, Any]: Statistics document
+        """
+        with self.__cache_map_lock:
+            n_blobs = sum(1 for key in self.__cache_map if isinstance(key, BlobKey))
+            return {
+                "entries": len(self.__cache_map),
+                "blobs": n_blobs,
+                "paths": len(self.__cache_map) - n_blobs,
+                "pinned": len(self.__pinned_keys),
+                "fillsInFlight": len(self.__in_flight_keys),
+                "occupiedBytes": self.__occupied_storage,
+                "maxBytes": self.__max_storage_mb,
+                "reconciled": self.__reconciled.is_set(),
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "evictedBytes": self.__evicted_bytes,
+            }
+
+    def __drop(self, key: CacheKey):
+        with self.__cache_map_lock:
+            self.__cache_map.pop(key, None)
+            self.__unsized_keys.discard(key)
             self.__pickle_cache_map()
 
-            file_to_remove.unlink()
+    @staticmethod
+    def get_blob_key(checksum: str, artifact: Optional[str] = CacheArtifact.RAW) -> BlobKey:
+        """Builds and validates a content-addressed key
 
+        Args:
+            checksum (str): Checksum identifying the content
+            artifact (Optional[str], optional): Artifact type. Defaults to CacheArtifact.RAW.
+
+        Raises:
+            ValueError: Checksum or artifact is not a valid file name component
+
+        Returns:
+            BlobKey: Blob key
+        """
+        checksum = checksum.lower()
+        if not BLOB_CHECKSUM_PATTERN.match(checksum):
+            raise ValueError(f"{checksum} is not a valid checksum")
+        if not BLOB_ARTIFACT_PATTERN.match(artifact):
+            raise ValueError(f"{artifact} is not a valid artifact type")
+        return BlobKey(checksum, str(artifact))
 
-FileCache.instance = FileCache()
@@ -0,0 +1,65 @@
+"""JSON encoding for API responses"""
+
+import datetime as dt
+import enum
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (dt.datetime, dt.date, dt.time)):
+        return obj.isoformat()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # UUIDs, paths and decimals, as well as anything else, are sent as their string form
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encodes a document as compact UTF-8 JSON
+
+    Datetimes are encoded as ISO 8601 strings, and UUIDs, paths and any other objects as their
+    string form.  orjson is used when it is installed, otherwise the standard library encoder.
+
+    Args:
+        obj (Any): Document
+
+    Returns:
+        bytes: JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        obj, default=_default, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decodes a JSON document
+
+    Args:
+        data (Union[bytes, str]): UTF-8 JSON
+
+    Raises:
+        JSONDecodeError: Data is not valid JSON or not UTF-8
+
+    Returns:
+        Any: Document
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, bytes):
+        try:
+            data = data.decode("utf-8")
+        except UnicodeDecodeError as exc:
+            raise JSONDecodeError(str(exc), "", 0) from exc
+    return json.loads(data)
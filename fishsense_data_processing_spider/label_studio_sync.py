@@ -2,12 +2,13 @@
 
 import datetime as dt
 import logging
+import multiprocessing.synchronize
 from pathlib import Path
 from threading import Event, Thread
+from typing import Optional
 
-import psycopg
 from label_studio_sdk.client import LabelStudio
-from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 
 from fishsense_data_processing_spider.config import get_log_path
 from fishsense_data_processing_spider.metrics import add_thread_to_monitor
@@ -24,31 +25,42 @@ class LabelStudioSync:
         label_studio_host: str,
         label_studio_key: str,
         *,
-        pg_conn_str: str,
+        pg_pool: ConnectionPool,
         interval: dt.timedelta = dt.timedelta(hours=1),
         bad_task_links_path: Path = get_log_path() / "bad_task_links.txt",
+        sleep_interrupt: Optional[multiprocessing.synchronize.Event] = None,
+        image_width: int = 1920,
+        image_quality: int = 85,
     ):
         self.__log = logging.getLogger("LabelStudioSync")
         self.stop_event = Event()
         self.__bad_task_links_path = bad_task_links_path
         self.__run_thread = Thread(target=self.__sync_body, name="label_studio_sync")
         add_thread_to_monitor(self.__run_thread)
-        self.sleep_interrupt = Event()
+        self.sleep_interrupt = Event() if sleep_interrupt is None else sleep_interrupt
 
         self._root_url = root_url
         self._label_studio_host = label_studio_host
         self._label_studio_key = label_studio_key
         self._sync_interval = interval
-        self._pg_conn = pg_conn_str
+        self._pg_pool = pg_pool
+        # Label Studio stores keypoints relative to the image size, so labels made on the
+        # derivative apply to the full resolution image.
+        self._image_width = image_width
+        self._image_quality = image_quality
+
+    def _get_image_url(self, source: str, cksum: str) -> str:
+        return (
+            f"{self._root_url}/api/v1/data/derivative/{source}/{cksum}"
+            f"?width={self._image_width}&quality={self._image_quality}"
+        )
 
     def _import_headtail_tasks(self, priority: str, project_id: int):
         client = LabelStudio(
             base_url=f"https://{self._label_studio_host}",
             api_key=self._label_studio_key,
         )
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path="sql/select_preprocessed_laser_images_for_labeling.sql",
                 cur=cur,
@@ -56,7 +68,7 @@ class LabelStudioSync:
             )
             image_checksums = [row["cksum"] for row in cur.fetchall()]
             urls = {
-                cksum: f"{self._root_url}/api/v1/data/laser_jpeg/{cksum}"
+                cksum: self._get_image_url("laser_jpeg", cksum)
                 for cksum in image_checksums
             }
 
@@ -74,9 +86,7 @@ class LabelStudioSync:
             base_url=f"https://{self._label_studio_host}",
             api_key=self._label_studio_key,
         )
-        with psycopg.connect(
-            self._pg_conn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        with self._pg_pool.connection() as con, con.cursor() as cur:
             do_query(
                 path="sql/select_preprocessed_images_for_labeling.sql",
                 cur=cur,
@@ -84,7 +94,7 @@ class LabelStudioSync:
             )
             image_checksums = [row["cksum"] for row in cur.fetchall()]
             urls = {
-                cksum: f"{self._root_url}/api/v1/data/preprocess_jpeg/{cksum}"
+                cksum: self._get_image_url("preprocess_jpeg", cksum)
                 for cksum in image_checksums
             }
 
@@ -0,0 +1,398 @@
+"""Request admission limits"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import (Any, Callable, Deque, Dict, Hashable, Mapping, Optional,
+                    Self)
+
+from humanfriendly import parse_size, parse_timespan
+
+from fishsense_data_processing_spider.config import settings
+from fishsense_data_processing_spider.metrics import (get_counter, get_gauge,
+                                                      get_histogram)
+
+
+_COUNT_LIMITS = ("concurrency", "queue", "key_concurrency", "key_queue")
+_SIZE_LIMITS = ("byte_rate", "burst", "key_byte_rate", "key_burst")
+
+
+def divide_limits(
+    config: Mapping[str, Mapping[str, Any]], processes: int
+) -> Dict[str, Dict[str, Any]]:
+    """Splits the configured limits evenly between the web processes
+
+    Each process enforces its own limits, and the kernel spreads connections evenly across the
+    processes, so each process gets its share of every limit, rounded up.
+
+    Args:
+        config (Mapping[str, Mapping[str, Any]]): Limits per permission, as in `RequestLimits`
+        processes (int): Number of web processes
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Limits per permission for one process
+    """
+    divided: Dict[str, Dict[str, Any]] = {}
+    for permission, limits in config.items():
+        divided[permission] = dict(limits)
+        for name in _COUNT_LIMITS:
+            if limits.get(name) is not None:
+                divided[permission][name] = math.ceil(int(limits[name]) / processes)
+        for name in _SIZE_LIMITS:
+            if limits.get(name) is not None:
+                divided[permission][name] = math.ceil(
+                    parse_size(str(limits[name])) / processes
+                )
+    return divided
+
+
+class LimitExceeded(Exception):
+    """Request was shed because too many requests are already queued"""
+
+    def __init__(self, limiter: str, retry_after: float):
+        super().__init__(f"{limiter} is overloaded")
+        self.limiter = limiter
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Bounds the number of concurrent holders, queueing up to `max_queue` more
+
+    Slots are handed to waiters in arrival order.  Once the queue is full, further callers are
+    shed immediately rather than waiting behind it.
+    """
+
+    def __init__(self, limit: int, max_queue: int, *, name: str, retry_after: float = 5):
+        self.__limit = limit
+        self.__max_queue = max_queue
+        self.__name = name
+        self.__retry_after = retry_after
+        self.__active = 0
+        self.__waiters: Deque[asyncio.Future] = deque()
+
+        self.__active_gauge = get_gauge(
+            "limiter_active",
+            "Requests holding a limiter slot",
+            labelnames=["limiter"],
+            namespace="e4efs",
+            subsystem="spider",
+            multiprocess_mode="livesum",
+        ).labels(limiter=name)
+        self.__queued_gauge = get_gauge(
+            "limiter_queued",
+            "Requests waiting for a limiter slot",
+            labelnames=["limiter"],
+            namespace="e4efs",
+            subsystem="spider",
+            multiprocess_mode="livesum",
+        ).labels(limiter=name)
+        self.__shed = get_counter(
+            "limiter_shed",
+            "Requests shed by a limiter",
+            labelnames=["limiter"],
+            namespace="e4efs",
+            subsystem="spider",
+        ).labels(limiter=name)
+        self.__wait_time = get_histogram(
+            "limiter_wait",
+            "Time spent waiting for a limiter slot",
+            labelnames=["limiter"],
+            namespace="e4efs",
+            subsystem="spider",
+            unit="seconds",
+            buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+        ).labels(limiter=name)
+
+    @property
+    def active(self) -> int:
+        """Slots held"""
+        return self.__active
+
+    @property
+    def queued(self) -> int:
+        """Callers waiting for a slot"""
+        return len(self.__waiters)
+
+    async def acquire(self) -> None:
+        """Waits for a slot
+
+        Raises:
+            LimitExceeded: Queue is full
+        """
+        if self.__active < self.__limit and not self.__waiters:
+            self.__active += 1
+            self.__active_gauge.inc()
+            self.__wait_time.observe(0)
+            return
+        if len(self.__waiters) >= self.__max_queue:
+            self.__shed.inc()
+            raise LimitExceeded(self.__name, self.__retry_after)
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self.__waiters.append(future)
+        self.__queued_gauge.inc()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over as this caller was cancelled
+                self.release()
+            elif future in self.__waiters:
+                # Otherwise `release` already dropped it from the queue
+                self.__waiters.remove(future)
+                self.__queued_gauge.dec()
+            raise
+        self.__wait_time.observe(time.monotonic() - start)
+
+    def release(self) -> None:
+        """Releases a slot, handing it to the next waiter if there is one"""
+        while self.__waiters:
+            waiter = self.__waiters.popleft()
+            self.__queued_gauge.dec()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.__active -= 1
+        self.__active_gauge.dec()
+
+
+class TokenBucket:
+    """Byte rate limit
+
+    Consumers may overdraw the bucket, and then wait until the debt is repaid, so that chunks
+    larger than the burst size are still admitted.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.__rate = rate
+        self.__burst = rate if burst is None else burst
+        self.__clock = clock
+        self.__tokens = self.__burst
+        self.__last = clock()
+
+    def reserve(self, amount: float) -> float:
+        """Takes tokens from the bucket
+
+        Args:
+            amount (float): Tokens to take
+
+        Returns:
+            float: Seconds to wait before using them
+        """
+        now = self.__clock()
+        self.__tokens = min(self.__burst, self.__tokens + (now - self.__last) * self.__rate)
+        self.__last = now
+        self.__tokens -= amount
+        return max(0.0, -self.__tokens / self.__rate)
+
+    async def consume(self, amount: float) -> None:
+        """Takes tokens from the bucket, waiting until they are available
+
+        Args:
+            amount (float): Tokens to take
+        """
+        delay = self.reserve(amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Admission:
+    """Slots and byte rate limits held by an admitted request"""
+
+    def __init__(self, limiters: Deque[ConcurrencyLimiter], buckets: Deque[TokenBucket]):
+        self.__limiters = limiters
+        self.__buckets = buckets
+
+    async def throttle(self, size: int) -> None:
+        """Waits until `size` bytes may be sent
+
+        Args:
+            size (int): Bytes about to be sent
+        """
+        for bucket in self.__buckets:
+            await bucket.consume(size)
+
+    def release(self) -> None:
+        """Releases the request's slots.  Safe to call more than once."""
+        while self.__limiters:
+            self.__limiters.pop().release()
+
+
+class _KeyLimits:
+    # Limits for the requests of one API key
+    def __init__(
+        self, limiter: Optional[ConcurrencyLimiter], bucket: Optional[TokenBucket]
+    ):
+        self.limiter = limiter
+        self.bucket = bucket
+        self.last_used = time.monotonic()
+
+    @property
+    def idle(self) -> bool:
+        return self.limiter is None or (self.limiter.active == 0 and self.limiter.queued == 0)
+
+
+class _ClassLimits:
+    # Limits for the requests of one permission, both in total and per API key
+    MAX_KEYS = 10000
+
+    def __init__(self, name: str, config: Mapping[str, Any]):
+        self.__name = name
+        self.__retry_after = parse_timespan(str(config.get("retry_after", "5s")))
+        self.__limiter = self.__make_limiter(
+            name, config.get("concurrency"), config.get("queue")
+        )
+        self.__bucket = self.__make_bucket(config.get("byte_rate"), config.get("burst"))
+        self.__key_config = config
+        self.__key_idle = parse_timespan(str(config.get("key_idle", "10m")))
+        # Least recently admitted first
+        self.__keys: OrderedDict[Hashable, _KeyLimits] = OrderedDict()
+
+    def __make_limiter(
+        self, name: str, concurrency: Optional[int], queue: Optional[int]
+    ) -> Optional[ConcurrencyLimiter]:
+        if concurrency is None:
+            return None
+        return ConcurrencyLimiter(
+            int(concurrency),
+            int(concurrency if queue is None else queue),
+            name=name,
+            retry_after=self.__retry_after,
+        )
+
+    @staticmethod
+    def __make_bucket(rate: Any, burst: Any) -> Optional[TokenBucket]:
+        if rate is None:
+            return None
+        return TokenBucket(
+            parse_size(str(rate)), None if burst is None else parse_size(str(burst))
+        )
+
+    def __get_key_limits(self, key_id: Hashable) -> _KeyLimits:
+        key_limits = self.__keys.get(key_id)
+        if key_limits is None:
+            key_limits = _KeyLimits(
+                self.__make_limiter(
+                    f"{self.__name}_key",
+                    self.__key_config.get("key_concurrency"),
+                    self.__key_config.get("key_queue"),
+                ),
+                self.__make_bucket(
+                    self.__key_config.get("key_byte_rate"), self.__key_config.get("key_burst")
+                ),
+            )
+            self.__keys[key_id] = key_limits
+        else:
+            self.__keys.move_to_end(key_id)
+            key_limits.last_used = time.monotonic()
+        self.__expire_keys()
+        return key_limits
+
+    def __expire_keys(self) -> None:
+        # Drops keys that have not been admitted for a while, or the least recently admitted
+        # keys past MAX_KEYS.  Keys with requests in flight or queued are kept, since a new
+        # limiter for them would let the key exceed its concurrency.
+        now = time.monotonic()
+        for _ in range(len(self.__keys)):
+            key_id, key_limits = next(iter(self.__keys.items()))
+            if len(self.__keys) <= self.MAX_KEYS and now - key_limits.last_used < self.__key_idle:
+                return
+            if key_limits.idle:
+                del self.__keys[key_id]
+            else:
+                self.__keys.move_to_end(key_id)
+
+    async def admit(self, key_id: Hashable) -> Admission:
+        key_limits = self.__get_key_limits(key_id)
+        limiters: Deque[ConcurrencyLimiter] = deque()
+        admission = Admission(
+            limiters,
+            deque(
+                bucket
+                for bucket in (key_limits.bucket, self.__bucket)
+                if bucket is not None
+            ),
+        )
+        try:
+            # Queue behind the key's own requests first, so that one key cannot fill the
+            # shared queue
+            for limiter in (key_limits.limiter, self.__limiter):
+                if limiter is not None:
+                    await limiter.acquire()
+                    limiters.append(limiter)
+        except BaseException:
+            admission.release()
+            raise
+        return admission
+
+
+class RequestLimits:
+    """Concurrency and byte rate limits per permission and API key
+
+    Limits are configured per permission under `limits`, for example::
+
+        [limits.getRawFile]
+        concurrency = 64        # Requests served at once, across all keys
+        queue = 256             # Requests queued before shedding
+        key_concurrency = 16    # Requests served at once per key
+        key_queue = 64          # Requests queued per key before shedding
+        byte_rate = '400M'      # Bytes per second, across all keys
+        key_byte_rate = '100M'  # Bytes per second per key
+        key_idle = '10m'        # Per key state is dropped after this long without requests
+        retry_after = '5s'      # Retry-After sent with shed requests
+
+    Every setting is optional, and permissions without a table are not limited.  When serving
+    from several processes, each process enforces an equal share of every limit.
+
+    Keys are identified by `KeyStore.get_key_id`, so that the limits never hold API keys.
+
+    Use `RequestLimits.get_instance()` to retrieve the process-wide limits.
+    """
+
+    instance: Optional[Self] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, config: Optional[Mapping[str, Mapping[str, Any]]] = None):
+        if config is None:
+            config = settings.limits
+        self.__classes = {name: _ClassLimits(name, limits) for name, limits in config.items()}
+
+    @classmethod
+    def get_instance(cls) -> Self:
+        """Retrieves the process-wide limits, creating them on first use
+
+        Returns:
+            Self: Request limits
+        """
+        if cls.instance is None:
+            with cls._instance_lock:
+                if cls.instance is None:
+                    cls.instance = cls()
+        return cls.instance
+
+    async def admit(self, permission: str, key_id: Hashable) -> Optional[Admission]:
+        """Waits until a request may proceed
+
+        Args:
+            permission (str): Permission the request is authorized under
+            key_id (Hashable): API key identifier, see `KeyStore.get_key_id`
+
+        Raises:
+            LimitExceeded: Request was shed
+
+        Returns:
+            Optional[Admission]: Admission to release once the request finishes, or None if
+            the permission is not limited
+        """
+        limits = self.__classes.get(permission)
+        if limits is None:
+            return None
+        return await limits.admit(key_id)
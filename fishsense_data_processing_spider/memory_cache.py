@@ -0,0 +1,310 @@
+"""In-memory caches"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+from fishsense_data_processing_spider.metrics import (
+    get_counter,
+    get_gauge,
+    set_gauge_function,
+)
+
+
+class FrequencySketch:
+    """Count-min sketch of access frequencies with periodic aging
+
+    Counters saturate at 15 and are halved once `sample_size` increments have been recorded, so
+    the sketch tracks recent popularity rather than all-time popularity.
+    """
+
+    MAX_COUNT = 15
+    SEEDS = (
+        0x97CB3127,
+        0xB492B66F,
+        0x9AE16A3B,
+        0xCBF29CE4,
+    )
+
+    def __init__(self, width: int, *, sample_size: Optional[int] = None):
+        self.__width = 1 << max(4, (width - 1).bit_length())
+        self.__mask = self.__width - 1
+        self.__table: List[bytearray] = [bytearray(self.__width) for _ in self.SEEDS]
+        self.__sample_size = sample_size or 10 * self.__width
+        self.__additions = 0
+
+    def __indexes(self, key: Hashable):
+        key_hash = hash(key) & 0xFFFFFFFFFFFFFFFF
+        for seed in self.SEEDS:
+            mixed = ((key_hash ^ seed) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+            yield (mixed >> 32) & self.__mask
+
+    def increment(self, key: Hashable) -> None:
+        """Records an access
+
+        Args:
+            key (Hashable): Accessed key
+        """
+        for row, idx in zip(self.__table, self.__indexes(key)):
+            if row[idx] < self.MAX_COUNT:
+                row[idx] += 1
+        self.__additions += 1
+        if self.__additions >= self.__sample_size:
+            self.__age()
+
+    def frequency(self, key: Hashable) -> int:
+        """Estimates the access frequency
+
+        Args:
+            key (Hashable): Key to estimate
+
+        Returns:
+            int: Estimated recent access count
+        """
+        return min(row[idx] for row, idx in zip(self.__table, self.__indexes(key)))
+
+    def __age(self) -> None:
+        for row in self.__table:
+            for idx, count in enumerate(row):
+                if count:
+                    row[idx] = count >> 1
+        self.__additions //= 2
+
+
+class MemoryCache:
+    """Byte-bounded LRU blob cache with TinyLFU admission
+
+    Blobs larger than `max_blob_size` are never stored.  When storing a new blob requires
+    evicting others, the blob is only admitted if it has been requested more often than every
+    blob it would displace.
+    """
+
+    def __init__(self, max_size: int, max_blob_size: int, *, name: str = "hot_tier"):
+        self.__max_size = max_size
+        self.__max_blob_size = max_blob_size
+        self.__name = name
+        self.__entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self.__size = 0
+        self.__lock = threading.Lock()
+        self.__sketch = FrequencySketch(max(1024, max_size // 16384))
+
+        self.__requests = get_counter(
+            "memory_cache_requests",
+            "Memory cache lookups",
+            labelnames=["cache", "result"],
+            namespace="e4efs",
+            subsystem="spider",
+        )
+        self.__admissions = get_counter(
+            "memory_cache_admissions",
+            "Memory cache admission decisions",
+            labelnames=["cache", "result"],
+            namespace="e4efs",
+            subsystem="spider",
+        )
+        self.__occupancy = get_gauge(
+            "memory_cache_bytes",
+            "Memory cache occupied bytes",
+            labelnames=["cache"],
+            namespace="e4efs",
+            subsystem="spider",
+        )
+
+    @property
+    def max_size(self) -> int:
+        """Byte budget"""
+        return self.__max_size
+
+    @property
+    def max_blob_size(self) -> int:
+        """Largest blob that will be stored"""
+        return self.__max_blob_size
+
+    @property
+    def size(self) -> int:
+        """Currently occupied bytes"""
+        return self.__size
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__entries
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Retrieves a blob
+
+        Args:
+            key (Hashable): Blob key
+
+        Returns:
+            Optional[bytes]: Blob if cached, otherwise None
+        """
+        with self.__lock:
+            self.__sketch.increment(key)
+            data = self.__entries.get(key)
+            if data is not None:
+                self.__entries.move_to_end(key)
+        self.__requests.labels(
+            cache=self.__name, result="miss" if data is None else "hit"
+        ).inc()
+        return data
+
+    def put(self, key: Hashable, data: bytes) -> bool:
+        """Offers a blob to the cache
+
+        Args:
+            key (Hashable): Blob key
+            data (bytes): Blob contents
+
+        Returns:
+            bool: True if the blob was admitted, otherwise False
+        """
+        if len(data) > self.__max_blob_size or len(data) > self.__max_size:
+            return False
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.__size -= len(old)
+            victims: List[Hashable] = []
+            freed = 0
+            candidate_freq = self.__sketch.frequency(key)
+            for victim, victim_data in self.__entries.items():
+                if self.__size - freed + len(data) <= self.__max_size:
+                    break
+                if self.__sketch.frequency(victim) >= candidate_freq:
+                    self.__occupancy.labels(cache=self.__name).set(self.__size)
+                    self.__admissions.labels(cache=self.__name, result="rejected").inc()
+                    return False
+                victims.append(victim)
+                freed += len(victim_data)
+            for victim in victims:
+                self.__entries.pop(victim)
+            self.__size -= freed
+            self.__entries[key] = data
+            self.__size += len(data)
+            self.__occupancy.labels(cache=self.__name).set(self.__size)
+        self.__admissions.labels(cache=self.__name, result="admitted").inc()
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        """Removes a blob
+
+        Args:
+            key (Hashable): Blob key
+        """
+        with self.__lock:
+            data = self.__entries.pop(key, None)
+            if data is not None:
+                self.__size -= len(data)
+                self.__occupancy.labels(cache=self.__name).set(self.__size)
+
+    def clear(self) -> None:
+        """Removes all blobs"""
+        with self.__lock:
+            self.__entries.clear()
+            self.__size = 0
+            self.__occupancy.labels(cache=self.__name).set(0)
+
+
+class TTLCache:
+    """Entry-bounded LRU mapping whose entries expire after a time to live
+
+    Values may be anything, including None, so lookups take an explicit default to distinguish
+    a cached None from a missing entry.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        *,
+        name: str,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.__max_entries = max_entries
+        self.__ttl = ttl
+        self.__name = name
+        self.__clock = clock
+        self.__entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+        self.__requests = get_counter(
+            "memory_cache_requests",
+            "Memory cache lookups",
+            labelnames=["cache", "result"],
+            namespace="e4efs",
+            subsystem="spider",
+        )
+        set_gauge_function(
+            get_gauge(
+                "memory_cache_entries",
+                "Memory cache entry count",
+                labelnames=["cache"],
+                namespace="e4efs",
+                subsystem="spider",
+                multiprocess_mode="livesum",
+            ).labels(cache=name),
+            self.__len__,
+        )
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            return entry is not None and entry[0] > self.__clock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retrieves an unexpired value
+
+        Args:
+            key (Hashable): Key
+            default (Any, optional): Value to return if absent or expired. Defaults to None.
+
+        Returns:
+            Any: Cached value, otherwise `default`
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] <= self.__clock():
+                del self.__entries[key]
+                entry = None
+            if entry is not None:
+                self.__entries.move_to_end(key)
+        self.__requests.labels(
+            cache=self.__name, result="miss" if entry is None else "hit"
+        ).inc()
+        return default if entry is None else entry[1]
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a value, evicting the least recently used entry if full
+
+        Args:
+            key (Hashable): Key
+            value (Any): Value
+            ttl (Optional[float], optional): Seconds to keep this entry. Defaults to the cache
+            TTL.
+        """
+        expires = self.__clock() + (self.__ttl if ttl is None else ttl)
+        with self.__lock:
+            self.__entries[key] = (expires, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_entries:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Removes an entry
+
+        Args:
+            key (Hashable): Key
+        """
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes all entries"""
+        with self.__lock:
+            self.__entries.clear()
@@ -1,12 +1,19 @@
 '''Prometheus Metrics
 '''
+import os
 from importlib.metadata import version
+from pathlib import Path
 from threading import Lock, Thread
 from time import sleep
-from typing import Dict, Iterable, List, Literal, Optional, Sequence, Union
+from typing import (Callable, Dict, Iterable, List, Literal, Optional, Sequence,
+                    Tuple, Union)
 
 from prometheus_client import (REGISTRY, CollectorRegistry, Counter, Gauge,
-                               Histogram, Info, Summary)
+                               Histogram, Info, Summary, multiprocess,
+                               start_http_server)
+
+# Set by the environment before start up to aggregate the metrics of pre-forked web processes
+MULTIPROCESS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
 
 __all_gauges: Dict[str, Gauge] = {
     'last_label_studio_sync': Gauge(
@@ -20,31 +27,56 @@ __all_gauges: Dict[str, Gauge] = {
 __gauges_lock = Lock()
 __all_infos: Dict[str, Info] = {}
 __infos_lock = Lock()
-__all_summaries: Dict[str, Summary] = {
-    'query_duration': Summary(
+__all_summaries: Dict[str, Summary] = {}
+__summariess_lock = Lock()
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+                   10, 30, 60, 120)
+SIZE_BUCKETS = (0, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216,
+                67108864, 268435456, 1073741824)
+__all_histograms: Dict[str, Histogram] = {
+    'query_duration': Histogram(
         name='query_duration',
         documentation='SQL Query Duration',
         labelnames=['query'],
         namespace='e4efs',
-        subsystem='spider'
+        subsystem='spider',
+        buckets=LATENCY_BUCKETS
     ),
-    'query_result_length': Summary(
+    'query_result_length': Histogram(
         name='query_result_length',
         documentation='SQL Query Result Length',
         labelnames=['query'],
         namespace='e4efs',
-        subsystem='spider'
+        subsystem='spider',
+        buckets=(0, 1, 10, 100, 1000, 10000, 100000, 1000000)
     ),
-    'request_timing': Summary(
+    'request_timing': Histogram(
         name='request_timing',
         documentation='Request timing',
         labelnames=['endpoint'],
         namespace='e4efs',
         subsystem='worker',
+        buckets=LATENCY_BUCKETS
+    ),
+    'request_size': Histogram(
+        name='request_size',
+        documentation='Request body size',
+        labelnames=['endpoint'],
+        namespace='e4efs',
+        subsystem='spider',
+        unit='bytes',
+        buckets=SIZE_BUCKETS
+    ),
+    'response_size': Histogram(
+        name='response_size',
+        documentation='Response body size, before compression',
+        labelnames=['endpoint'],
+        namespace='e4efs',
+        subsystem='spider',
+        unit='bytes',
+        buckets=SIZE_BUCKETS
     ),
 }
-__summariess_lock = Lock()
-__all_histograms: Dict[str, Histogram] = {}
 __histograms_lock = Lock()
 __all_counters: Dict[str, Counter] = {
     'images_added': Counter(
@@ -79,7 +111,7 @@ __counters_lock = Lock()
 
 
 def get_histogram(name: str,
-                  documentation: str,
+                  documentation: str = '',
                   labelnames: Iterable[str] = (),
                   namespace: str = '',
                   subsystem: str = '',
@@ -247,3 +279,69 @@ def __system_monitor_loop():
 
 system_monitor_thread = Thread(
     target=__system_monitor_loop, name='system_metrics_monitor', daemon=True)
+
+
+__gauge_functions: List[Tuple[Gauge, Callable[[], float]]] = []
+__gauge_functions_lock = Lock()
+__gauge_function_thread: Optional[Thread] = None
+
+
+def set_gauge_function(gauge: Gauge, function: Callable[[], float]) -> None:
+    """Backs a gauge with a callback
+
+    Multiprocess metrics are read from files rather than by calling into each process, so in
+    multiprocess mode the callback is instead sampled into the gauge every second.
+
+    Args:
+        gauge (Gauge): Gauge, or labelled gauge child
+        function (Callable[[], float]): Gauge value callback
+    """
+    # pylint: disable=global-statement
+    global __gauge_function_thread
+    if MULTIPROCESS_DIR is None:
+        gauge.set_function(function)
+        return
+    with __gauge_functions_lock:
+        __gauge_functions.append((gauge, function))
+        if __gauge_function_thread is None:
+            __gauge_function_thread = Thread(
+                target=__gauge_function_loop, name='gauge_function_sampler', daemon=True)
+            __gauge_function_thread.start()
+
+
+def __gauge_function_loop():
+    while True:
+        with __gauge_functions_lock:
+            gauge_functions = list(__gauge_functions)
+        for gauge, function in gauge_functions:
+            gauge.set(function())
+        sleep(1)
+
+
+def clear_multiprocess_dir() -> None:
+    """Removes the metric files of previous runs
+    """
+    if MULTIPROCESS_DIR is None:
+        return
+    for path in Path(MULTIPROCESS_DIR).glob('*.db'):
+        path.unlink(missing_ok=True)
+
+
+def start_metrics_server(port: int) -> None:
+    """Starts the Prometheus exporter
+
+    In multiprocess mode the exporter aggregates the metric files of every process, plus the
+    info metrics, which are not stored in files.
+
+    Args:
+        port (int): Port to listen on
+    """
+    if MULTIPROCESS_DIR is None:
+        start_http_server(port)
+        return
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    with __infos_lock:
+        for info in __all_infos.values():
+            registry.register(info)
+    start_http_server(port, registry=registry)
@@ -1,17 +1,30 @@
 """Job Orchestrator"""
 
+import asyncio
 import datetime as dt
 import enum
 import logging
+import threading
+import time
 import uuid
 from threading import Event, Thread
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import psycopg
-from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
 
-from fishsense_data_processing_spider.metrics import add_thread_to_monitor, get_counter
-from fishsense_data_processing_spider.sql_utils import do_many_query, do_query
+from fishsense_data_processing_spider.events import EventBus
+from fishsense_data_processing_spider.metrics import (
+    add_thread_to_monitor,
+    get_counter,
+    get_gauge,
+)
+from fishsense_data_processing_spider.sql_utils import (
+    do_many_query,
+    do_query,
+    do_query_async,
+)
+from fishsense_data_processing_spider.timing import phase
 
 
 class JobStatus(enum.StrEnum):
@@ -34,15 +47,139 @@ JOB_STATUS_MAPPING = {
     JobStatus.COMPLETED: 5,
 }
 
+# Each query selects the next frames, creates one job per camera and assigns the frames to
+# them in a single statement, returning the new jobs
+PREPROCESS_JOB_QUERIES = {
+    "preprocess_with_laser": "sql/insert_headtail_preprocess_jobs.sql",
+    "preprocess": "sql/insert_preprocess_jobs.sql",
+}
+
+JOB_CLAIM_ORDER = (
+    ("preprocess_with_laser", "HIGH"),
+    ("preprocess", "HIGH"),
+    ("preprocess_with_laser", "LOW"),
+    ("preprocess", "LOW"),
+)
+
+CANCEL_JOB_QUERIES = {
+    "preprocess": "sql/cancel_preprocess_job.sql",
+    "preprocess_with_laser": "sql/cancel_preprocess_laser_job.sql",
+}
+
+
+class JobNotifier:
+    """Wakes long-polling job requests when jobs may have become available
+
+    `notify` may be called from any thread.  Each notification advances a generation counter,
+    so that a waiter that read the generation before querying for jobs is not left waiting for
+    a notification that arrived during its query.
+
+    A notification wakes only the longest waiting request, so that new jobs do not send every
+    waiting request to the database at once.  A woken request that claims jobs notifies again
+    to wake the next request, which stops once a request finds no jobs left.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__generation = 0
+        self.__waiters: Dict[asyncio.Future, asyncio.AbstractEventLoop] = {}
+
+    @property
+    def generation(self) -> int:
+        """Number of notifications so far"""
+        return self.__generation
+
+    def notify(self) -> None:
+        """Wakes the longest waiting waiter"""
+        with self.__lock:
+            self.__generation += 1
+        self.__wake_next()
+
+    def notify_all(self) -> None:
+        """Wakes all waiters"""
+        with self.__lock:
+            self.__generation += 1
+            waiters = list(self.__waiters.items())
+            self.__waiters.clear()
+        for future, loop in waiters:
+            self.__wake(future, loop, pass_on=False)
+
+    def __wake_next(self) -> None:
+        with self.__lock:
+            if not self.__waiters:
+                return
+            future = next(iter(self.__waiters))
+            loop = self.__waiters.pop(future)
+        self.__wake(future, loop, pass_on=True)
+
+    def __wake(self, future: asyncio.Future, loop: asyncio.AbstractEventLoop, pass_on: bool):
+        def wake():
+            if not future.done():
+                future.set_result(None)
+            elif pass_on:
+                # The waiter timed out or was cancelled, so the notification goes to the next
+                self.__wake_next()
+        try:
+            loop.call_soon_threadsafe(wake)
+        except RuntimeError:
+            # Loop already closed
+            if pass_on:
+                self.__wake_next()
+
+    async def wait(self, generation: int, timeout: float) -> bool:
+        """Waits for a notification after `generation`
+
+        Args:
+            generation (int): Generation read before checking for jobs
+            timeout (float): Seconds to wait
+
+        Returns:
+            bool: True if notified, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.__lock:
+            if self.__generation != generation:
+                return True
+            self.__waiters[future] = loop
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            with self.__lock:
+                self.__waiters.pop(future, None)
+
 
 class Orchestrator:
     """Job orchestrator"""
 
     def __init__(
-        self, pg_conn: str, *, reaper_interval: dt.timedelta = dt.timedelta(minutes=5)
+        self,
+        pg_pool: ConnectionPool,
+        *,
+        async_pg_pool: AsyncConnectionPool,
+        reaper_interval: dt.timedelta = dt.timedelta(minutes=5),
+        long_poll_recheck: float = 15.0,
+        event_bus: Optional[EventBus] = None,
     ):
         self.__log = logging.getLogger("Job Orchestrator")
-        self.__pgconn = pg_conn
+        self.__pg_pool = pg_pool
+        self.__async_pg_pool = async_pg_pool
+        self.__notifier = JobNotifier()
+        self.__event_bus = event_bus
+        if event_bus is not None:
+            event_bus.subscribe("jobs_available", lambda _: self.__notifier.notify())
+            event_bus.subscribe(EventBus.RESYNC, lambda _: self.__notifier.notify())
+        self.__long_poll_recheck = long_poll_recheck
+        self.__long_polls = get_gauge(
+            "job_long_polls",
+            "Job requests waiting for jobs",
+            namespace="e4efs",
+            subsystem="spider",
+            multiprocess_mode="livesum",
+        )
         self.__reaper_thread = Thread(
             target=self.__reaper_loop,
             name="Job Reaper",
@@ -65,16 +202,25 @@ class Orchestrator:
     def stop(self):
         """Stops the orchestrator threads"""
         self.stop_event.set()
+        self.__notifier.notify_all()
         self.__reaper_thread.join()
 
+    def notify_jobs_available(self) -> None:
+        """Wakes long-polling job requests to check for jobs again
+
+        Requests waiting in other processes are woken through the event bus.  Safe to call from
+        any thread.
+        """
+        self.__notifier.notify()
+        if self.__event_bus is not None:
+            self.__event_bus.publish("jobs_available")
+
     def __reaper_loop(self, interval: dt.timedelta):
         reaped_job_counter = get_counter("reaped_jobs")
         while not self.stop_event.is_set():
             last_run = dt.datetime.now()
             next_run = last_run + interval
-            with psycopg.connect(
-                self.__pgconn, row_factory=dict_row
-            ) as con, con.cursor() as cur:
+            with self.__pg_pool.connection() as con, con.cursor() as cur:
                 reaped_ids = []
                 try:
                     do_query(
@@ -100,10 +246,41 @@ class Orchestrator:
                     )
                 except psycopg.errors.Error as exc:
                     self.__log.exception("Updating jobs table failed! %s", exc)
+            if reaped_ids:
+                self.notify_jobs_available()
             time_to_sleep = (next_run - dt.datetime.now()).total_seconds()
             self.stop_event.wait(time_to_sleep)
 
-    def _get_headtail_preprocess_frames(
+    @staticmethod
+    def _job_definition(row: Dict[str, Any], job_type: str) -> Dict[str, Any]:
+        return {
+            "jobId": row["job_id"].hex,
+            "frameIds": row["checksums"],
+            "cameraId": row["camera_idx"],
+            "operation": job_type,
+            "diveId": None,
+        }
+
+    @staticmethod
+    def _get_job_params(
+        image_limit: int,
+        worker: str,
+        expiration: dt.timedelta,
+        origin: str,
+        priority: str,
+        job_type: str,
+    ) -> Dict[str, Any]:
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        return {
+            "limit": image_limit,
+            "priority": priority,
+            "worker": worker,
+            "job_type": job_type,
+            "expiration": dt.datetime.now() + expiration,
+            "origin": origin,
+        }
+
+    def _get_preprocess_frames(
         self,
         job_document: Dict,
         image_limit: int,
@@ -112,93 +289,45 @@ class Orchestrator:
         expiration: dt.timedelta,
         origin: str,
         priority: str,
+        job_type: str,
     ) -> int:
         # pylint: disable=too-many-arguments, too-many-positional-arguments
         do_query(
-            path="sql/select_next_images_for_headtail_preprocessing.sql",
+            path=PREPROCESS_JOB_QUERIES[job_type],
             cur=cur,
-            params={"limit": image_limit, "priority": priority},
+            params=self._get_job_params(
+                image_limit, worker, expiration, origin, priority, job_type
+            ),
         )
-        results: List[Dict[str, Any]] = cur.fetchall()
         n_images = 0
-        for row in results:
-            job_id = uuid.uuid4()
-            job_definitions = {
-                "jobId": job_id.hex,
-                "frameIds": row["checksums"],
-                "cameraId": row["camera_idx"],
-                "operation": "preprocess_with_laser",
-                "diveId": None,
-            }
+        for row in cur.fetchall():
+            job_document["jobs"].append(self._job_definition(row, job_type))
             n_images += len(row["checksums"])
-            job_document["jobs"].append(job_definitions)
-            do_query(
-                path="sql/insert_job.sql",
-                cur=cur,
-                params={
-                    "job_id": job_id,
-                    "worker": worker,
-                    "job_type": "preprocess_with_laser",
-                    "expiration": dt.datetime.now() + expiration,
-                    "origin": origin,
-                },
-            )
-            do_many_query(
-                path="sql/update_headtail_preprocess_job.sql",
-                cur=cur,
-                param_seq=[
-                    {"job_id": job_id, "checksum": cksum} for cksum in row["checksums"]
-                ],
-            )
         return n_images
 
-    def _get_laser_preprocess_frames(
+    async def _get_preprocess_frames_async(
         self,
         job_document: Dict,
         image_limit: int,
-        cur: psycopg.Cursor,
+        cur: psycopg.AsyncCursor,
         worker: str,
         expiration: dt.timedelta,
         origin: str,
         priority: str,
+        job_type: str,
     ) -> int:
         # pylint: disable=too-many-arguments, too-many-positional-arguments
-        do_query(
-            path="sql/select_next_images_for_laser_preprocessing.sql",
+        await do_query_async(
+            path=PREPROCESS_JOB_QUERIES[job_type],
             cur=cur,
-            params={"limit": image_limit, "priority": priority},
+            params=self._get_job_params(
+                image_limit, worker, expiration, origin, priority, job_type
+            ),
         )
-        results: List[Dict[str, Any]] = cur.fetchall()
         n_images = 0
-        for row in results:
-            job_id = uuid.uuid4()
-            job_definitions = {
-                "jobId": job_id.hex,
-                "frameIds": row["checksums"],
-                "cameraId": row["camera_idx"],
-                "operation": "preprocess",
-                "diveId": None,
-            }
+        for row in await cur.fetchall():
+            job_document["jobs"].append(self._job_definition(row, job_type))
             n_images += len(row["checksums"])
-            job_document["jobs"].append(job_definitions)
-            do_query(
-                path="sql/insert_job.sql",
-                cur=cur,
-                params={
-                    "job_id": job_id,
-                    "worker": worker,
-                    "job_type": "preprocess",
-                    "expiration": dt.datetime.now() + expiration,
-                    "origin": origin,
-                },
-            )
-            do_many_query(
-                path="sql/update_preprocess_job.sql",
-                cur=cur,
-                param_seq=[
-                    {"job_id": job_id, "checksum": cksum} for cksum in row["checksums"]
-                ],
-            )
         return n_images
 
     def get_next_job_dict(
@@ -217,48 +346,84 @@ class Orchestrator:
         """
         job_document = {"jobs": []}
         frame_count = 0
-        with psycopg.connect(
-            self.__pgconn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
-            if frame_count < n_images:
-                frame_count += self._get_headtail_preprocess_frames(
-                    job_document=job_document,
-                    image_limit=n_images - frame_count,
-                    cur=cur,
-                    worker=worker,
-                    expiration=dt.timedelta(seconds=expiration),
-                    origin=origin,
-                    priority="HIGH",
-                )
-            if frame_count < n_images:
-                frame_count += self._get_laser_preprocess_frames(
+        with self.__pg_pool.connection() as con, con.cursor() as cur:
+            for job_type, priority in JOB_CLAIM_ORDER:
+                if frame_count >= n_images:
+                    break
+                frame_count += self._get_preprocess_frames(
                     job_document=job_document,
                     image_limit=n_images - frame_count,
                     cur=cur,
                     worker=worker,
                     expiration=dt.timedelta(seconds=expiration),
                     origin=origin,
-                    priority="HIGH",
+                    priority=priority,
+                    job_type=job_type,
                 )
-            if frame_count < n_images:
-                frame_count += self._get_headtail_preprocess_frames(
-                    job_document=job_document,
-                    image_limit=n_images - frame_count,
-                    cur=cur,
-                    worker=worker,
-                    expiration=dt.timedelta(seconds=expiration),
-                    origin=origin,
-                    priority="LOW",
+        return job_document
+
+    async def get_next_job_dict_async(
+        self,
+        worker: str,
+        origin: str,
+        n_images: int = 1000,
+        expiration: int = 3600,
+        wait: float = 0,
+    ) -> Dict[str, Any]:
+        """Retrieves the next batch of preprocessing jobs
+
+        If no jobs are available and `wait` is given, waits up to `wait` seconds for jobs.  The
+        wait is woken by `notify_jobs_available`, and also checks again every
+        `long_poll_recheck` seconds to pick up changes the notifications do not cover.  No database
+        connection is held while waiting.
+
+        Args:
+            worker (str): Worker name
+            origin (str): Originating API Key
+            n_images (int, optional): Max number of images to process. Defaults to 1000.
+            expiration (int, optional): Number of seconds in the future to expire.  Defaults to
+            3600.
+            wait (float, optional): Seconds to wait for jobs if none are available.  Defaults to
+            0.
+        Returns:
+            Dict[str, Any]: Dictionary of job parameters
+        """
+        deadline = time.monotonic() + wait
+        notified = False
+        while True:
+            generation = self.__notifier.generation
+            job_document = await self._claim_jobs_async(
+                worker=worker, origin=origin, n_images=n_images, expiration=expiration
+            )
+            if job_document["jobs"] and notified:
+                # More jobs may be left for the next waiting request
+                self.__notifier.notify()
+            remaining = deadline - time.monotonic()
+            if job_document["jobs"] or remaining <= 0 or self.stop_event.is_set():
+                return job_document
+            with self.__long_polls.track_inprogress(), phase("wait"):
+                notified = await self.__notifier.wait(
+                    generation, min(remaining, self.__long_poll_recheck)
                 )
-            if frame_count < n_images:
-                frame_count += self._get_laser_preprocess_frames(
+
+    async def _claim_jobs_async(
+        self, worker: str, origin: str, n_images: int, expiration: int
+    ) -> Dict[str, Any]:
+        job_document = {"jobs": []}
+        frame_count = 0
+        async with self.__async_pg_pool.connection() as con, con.cursor() as cur:
+            for job_type, priority in JOB_CLAIM_ORDER:
+                if frame_count >= n_images:
+                    break
+                frame_count += await self._get_preprocess_frames_async(
                     job_document=job_document,
                     image_limit=n_images - frame_count,
                     cur=cur,
                     worker=worker,
                     expiration=dt.timedelta(seconds=expiration),
                     origin=origin,
-                    priority="LOW",
+                    priority=priority,
+                    job_type=job_type,
                 )
         return job_document
 
@@ -279,13 +444,27 @@ class Orchestrator:
         Returns:
             bool: True if matches, otherwise False
         """
-        with psycopg.connect(
-            self.__pgconn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
+        with self.__pg_pool.connection() as con, con.cursor() as cur:
             do_query(path="sql/select_job_type.sql", cur=cur, params={"job_id": job_id})
             result = cur.fetchone()
             return result is not None
 
+    async def is_valid_job_async(self, job_id: uuid.UUID) -> bool:
+        """Checks whether the provided job id exists
+
+        Args:
+            job_id (uuid.UUID): Job ID
+
+        Returns:
+            bool: True if matches, otherwise False
+        """
+        async with self.__async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(
+                path="sql/select_job_type.sql", cur=cur, params={"job_id": job_id}
+            )
+            result = await cur.fetchone()
+            return result is not None
+
     def set_job_status(
         self, job_id: uuid.UUID, status: JobStatus, progress: Optional[int] = None
     ):
@@ -296,33 +475,60 @@ class Orchestrator:
             status (JobStatus): Status string
             progress (Optional[int], optional): Progress from 0 to 100. Defaults to None.
         """
-        with psycopg.connect(
-            self.__pgconn, row_factory=dict_row
-        ) as con, con.cursor() as cur:
-            if progress is None:
+        query, params = self._get_job_status_query(job_id, status, progress)
+        with self.__pg_pool.connection() as con, con.cursor() as cur:
+            do_query(path=query, cur=cur, params=params)
+
+            if status == JobStatus.CANCELLED:
                 do_query(
-                    path="sql/update_job_status.sql",
-                    cur=cur,
-                    params={"job_id": job_id, "job_status": JOB_STATUS_MAPPING[status]},
+                    path="sql/select_job_type.sql", cur=cur, params={"job_id": job_id}
                 )
-            else:
+                job_type = cur.fetchone()["job_type"]
                 do_query(
-                    path="sql/update_job_progress.sql",
+                    path=CANCEL_JOB_QUERIES[job_type],
                     cur=cur,
-                    params={
-                        "job_id": job_id,
-                        "job_status": JOB_STATUS_MAPPING[status],
-                        "progress": progress,
-                    },
+                    params={"job_id": job_id},
                 )
+        if status == JobStatus.CANCELLED:
+            self.notify_jobs_available()
+
+    async def set_job_status_async(
+        self, job_id: uuid.UUID, status: JobStatus, progress: Optional[int] = None
+    ):
+        """Updates job status
+
+        Args:
+            job_id (uuid.UUID): Job UUID
+            status (JobStatus): Status string
+            progress (Optional[int], optional): Progress from 0 to 100. Defaults to None.
+        """
+        query, params = self._get_job_status_query(job_id, status, progress)
+        async with self.__async_pg_pool.connection() as con, con.cursor() as cur:
+            await do_query_async(path=query, cur=cur, params=params)
 
             if status == JobStatus.CANCELLED:
-                do_query(
+                await do_query_async(
                     path="sql/select_job_type.sql", cur=cur, params={"job_id": job_id}
                 )
-                job_type = cur.fetchone()["job_type"]
-                query_map = {
-                    "preprocess": "sql/cancel_preprocess_job.sql",
-                    "preprocess_with_laser": "sql/cancel_preprocess_laser_job.sql",
-                }
-                do_query(path=query_map[job_type], cur=cur, params={"job_id": job_id})
+                job_type = (await cur.fetchone())["job_type"]
+                await do_query_async(
+                    path=CANCEL_JOB_QUERIES[job_type],
+                    cur=cur,
+                    params={"job_id": job_id},
+                )
+        if status == JobStatus.CANCELLED:
+            self.notify_jobs_available()
+
+    def _get_job_status_query(
+        self, job_id: uuid.UUID, status: JobStatus, progress: Optional[int]
+    ) -> Tuple[str, Dict[str, Any]]:
+        if progress is None:
+            return "sql/update_job_status.sql", {
+                "job_id": job_id,
+                "job_status": JOB_STATUS_MAPPING[status],
+            }
+        return "sql/update_job_progress.sql", {
+            "job_id": job_id,
+            "job_status": JOB_STATUS_MAPPING[status],
+            "progress": progress,
+        }
@@ -0,0 +1,86 @@
+"""UNC to local mount path index"""
+
+import posixpath
+from pathlib import Path, PurePath
+from typing import Dict, Tuple, Union
+
+
+class MountPrefixIndex:
+    """Longest-prefix index from UNC volume paths to local mounts
+
+    Volumes are stored as normalized posix strings, so a lookup probes a dict once per path
+    separator, deepest first.  The deepest mounted volume always wins, regardless of the order
+    of the mapping.
+    """
+
+    def __init__(self, mapping: Dict[Union[Path, str], Union[Path, str]]):
+        self.__mounts: Dict[str, str] = {
+            self.normalize(volume): self.normalize(mount)
+            for volume, mount in mapping.items()
+        }
+        self.__shortest = min((len(volume) for volume in self.__mounts), default=0)
+
+    def __len__(self) -> int:
+        return len(self.__mounts)
+
+    @staticmethod
+    def normalize(path: Union[PurePath, str]) -> str:
+        """Normalizes a path to a posix string without a trailing separator
+
+        Args:
+            path (Union[PurePath, str]): Path
+
+        Returns:
+            str: Normalized path
+        """
+        if isinstance(path, PurePath):
+            text = path.as_posix()
+        else:
+            text = posixpath.normpath(path.replace("\\", "/"))
+        if len(text) > 1:
+            text = text.rstrip("/") or "/"
+        return text
+
+    def split(self, unc_path: Union[PurePath, str]) -> Tuple[str, str]:
+        """Splits a UNC path into its local mount and the path relative to that mount
+
+        Args:
+            unc_path (Union[PurePath, str]): UNC path
+
+        Raises:
+            FileNotFoundError: Volume not mounted
+
+        Returns:
+            Tuple[str, str]: Local mount and relative path
+        """
+        text = self.normalize(unc_path)
+        end = len(text)
+        while end >= self.__shortest:
+            mount = self.__mounts.get(text[:end])
+            if mount is not None:
+                return mount, text[end:].lstrip("/")
+            if end <= 1:
+                break
+            end = text.rfind("/", 0, end)
+            if end < 0:
+                break
+            # A volume mounted at the root is stored as "/"
+            end = max(end, 1)
+        raise FileNotFoundError(f"{posixpath.dirname(text)} not mounted!")
+
+    def map(self, unc_path: Union[PurePath, str]) -> Path:
+        """Maps a UNC path to its local path
+
+        Args:
+            unc_path (Union[PurePath, str]): UNC path
+
+        Raises:
+            FileNotFoundError: Volume not mounted
+
+        Returns:
+            Path: Local path
+        """
+        mount, relative = self.split(unc_path)
+        if not relative:
+            return Path(mount)
+        return Path(f"{mount}/{relative}")
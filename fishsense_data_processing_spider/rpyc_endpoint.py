@@ -1,7 +1,7 @@
 '''RPyC endpoints
 '''
 import datetime as dt
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 import rpyc
 
@@ -46,3 +46,15 @@ class CliService(rpyc.Service):
             op=Permission[permission],
             value=value
         )
+
+    def exposed_list_api_keys(self) -> Dict[str, Tuple[str, List[str]]]:
+        """Exposed - lists every unexpired API key
+
+        Returns:
+            Dict[str, Tuple[str, List[str]]]: Mapping of key hash to comment and permission
+            names
+        """
+        return {
+            key_hash.hex(): (comment, [perm.name for perm in perms])
+            for key_hash, (comment, perms) in self.__key_store.list_perms().items()
+        }
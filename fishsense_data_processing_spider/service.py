@@ -2,23 +2,33 @@
 '''
 import asyncio
 import datetime as dt
+import functools
 import json
 import logging
 import logging.handlers
+import multiprocessing
+import multiprocessing.synchronize
+import os
+import re
 import signal
+import socket
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from threading import Thread
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import psycopg
 import psycopg.rows
 import pytz
 import tornado
-from prometheus_client import start_http_server
+import tornado.httpserver
+import tornado.netutil
+import tornado.process
 from rpyc.utils.server import ThreadedServer
 from tornado.routing import URLSpec
 
+from fishsense_data_processing_spider.compression import CompressedJsonEncoding
 from fishsense_data_processing_spider.config import (
     PG_CONN_STR,
     configure_log_handler,
@@ -28,14 +38,21 @@ from fishsense_data_processing_spider.config import (
 )
 from fishsense_data_processing_spider.data_model import DataModel
 from fishsense_data_processing_spider.discovery import Crawler
+from fishsense_data_processing_spider.events import EventBus
 from fishsense_data_processing_spider.endpoints import (
     ApiKeyAdminHandler,
+    CacheEvictHandler,
+    CachePinHandler,
+    CacheStatsHandler,
+    CacheWarmHandler,
     DebugDataHandler,
+    DerivativeHandler,
     DiveListHandler,
     DiveMetadataHandler,
     DoDiscoveryHandler,
     DoLabelStudioSyncHandler,
     FrameMetadataHandler,
+    FramesMetadataHandler,
     HeadTailLabelHandler,
     HomePageHandler,
     JobStatusHandler,
@@ -45,19 +62,27 @@ from fishsense_data_processing_spider.endpoints import (
     NotImplementedHandler,
     PreprocessJpegHandler,
     PreprocessLaserJpegHandler,
+    RawArchiveHandler,
     RawDataHandler,
     RetrieveBatch,
     VersionHandler,
 )
+from fishsense_data_processing_spider.file_cache import FileCache
 from fishsense_data_processing_spider.label_studio_sync import LabelStudioSync
+from fishsense_data_processing_spider.limits import divide_limits
+from fishsense_data_processing_spider.memory_cache import MemoryCache, TTLCache
 from fishsense_data_processing_spider.metrics import (
+    MULTIPROCESS_DIR,
     add_thread_to_monitor,
+    clear_multiprocess_dir,
     get_gauge,
-    get_summary,
+    get_histogram,
+    start_metrics_server,
     system_monitor_thread,
 )
 from fishsense_data_processing_spider.orchestrator import Orchestrator
 from fishsense_data_processing_spider.rpyc_endpoint import CliService
+from fishsense_data_processing_spider.sql_utils import create_async_pool, create_pool
 from fishsense_data_processing_spider.web_auth import KeyStore
 
 
@@ -70,19 +95,77 @@ def quick_con() -> psycopg.Connection:
     return psycopg.connect(PG_CONN_STR, row_factory=psycopg.rows.dict_row)
 
 
+def route_template(pattern: str) -> str:
+    """Formats a route pattern as a metric label, e.g. `/api/v1/data/raw/{checksum}`
+
+    Args:
+        pattern (str): Route regular expression
+
+    Returns:
+        str: Route template
+    """
+    template = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'{\1}', pattern)
+    template = re.sub(r'\([^)]*\)', '{}', template)
+    return template.rstrip('$')
+
+
 class Service:
     """Service class
     """
     # pylint: disable=too-few-public-methods,too-many-instance-attributes
     # Main entry point
 
-    def __init__(self):
+    def __init__(self,
+                 *,
+                 task_id: Optional[int] = None,
+                 sockets: Optional[List[socket.socket]] = None,
+                 discovery_trigger: Optional[multiprocessing.synchronize.Event] = None,
+                 label_studio_trigger: Optional[multiprocessing.synchronize.Event] = None):
+        """Creates the service
+
+        Args:
+            task_id (Optional[int], optional): Forked web process index, or None when serving
+                from a single process. Only task 0 runs the background workers. Defaults to
+                None.
+            sockets (Optional[List[socket.socket]], optional): Listening sockets shared by the
+                forked web processes. Defaults to listening on port 80.
+            discovery_trigger (Optional[multiprocessing.synchronize.Event], optional): Discovery
+                trigger shared by the forked web processes. Defaults to None.
+            label_studio_trigger (Optional[multiprocessing.synchronize.Event], optional): Label
+                Studio sync trigger shared by the forked web processes. Defaults to None.
+        """
+        self.__supervisor = task_id is None or task_id == 0
+        self.__sockets = sockets
         data_paths = self.__validate_data_paths()
+        self.__pg_pool = create_pool(
+            PG_CONN_STR,
+            min_size=settings.postgres.pool_min_size,
+            max_size=settings.postgres.pool_max_size,
+            timeout=settings.postgres.pool_timeout,
+            max_idle=settings.postgres.pool_max_idle,
+            max_lifetime=settings.postgres.pool_max_lifetime,
+            check=settings.postgres.pool_check
+        )
+        self.__async_pg_pool = create_async_pool(
+            PG_CONN_STR,
+            min_size=settings.postgres.pool_min_size,
+            max_size=settings.postgres.pool_max_size,
+            timeout=settings.postgres.pool_timeout,
+            max_idle=settings.postgres.pool_max_idle,
+            max_lifetime=settings.postgres.pool_max_lifetime,
+            check=settings.postgres.pool_check
+        )
+        # Forked web processes relay cache invalidations and job notifications to each other
+        self.__event_bus = None if task_id is None else EventBus(PG_CONN_STR, self.__pg_pool)
+        self.__event_listener: Optional[asyncio.Task] = None
         self.__label_studio = LabelStudioSync(
             root_url=settings.web_api.root_url,
             label_studio_host=settings.label_studio.host,
             label_studio_key=settings.label_studio.api_key,
-            pg_conn_str=PG_CONN_STR
+            pg_pool=self.__pg_pool,
+            sleep_interrupt=label_studio_trigger,
+            image_width=settings.label_studio.image_width,
+            image_quality=settings.label_studio.image_quality
         )
         bad_query_handler = logging.handlers.TimedRotatingFileHandler(
             filename=get_log_path() / 'bad_query.log',
@@ -90,21 +173,56 @@ class Service:
             backupCount=5
         )
         configure_log_handler(bad_query_handler)
+        self.__io_executor = ThreadPoolExecutor(
+            max_workers=settings.data_model.io_workers,
+            thread_name_prefix='artifact_io'
+        )
+        # Forkserver, as forking this process once its threads are running is unsafe
+        self.__derivative_executor = ProcessPoolExecutor(
+            max_workers=settings.data_model.derivative_workers,
+            mp_context=multiprocessing.get_context('forkserver')
+        )
         self._data_model = DataModel(
             data_path_mapping=data_paths,
-            pg_conn_str=PG_CONN_STR,
+            pg_pool=self.__pg_pool,
+            async_pg_pool=self.__async_pg_pool,
             max_raw_data_file_size=settings.data_model.max_load_size,
             preprocess_jpeg_path=settings.data_model.preprocess_jpg_store,
             preprocess_laser_jpeg_path=settings.data_model.preprocess_laser_jpg_store,
             debug_data_path=settings.data_model.debug_data_store,
             bad_query_handler=[
                 bad_query_handler
-            ]
+            ],
+            content_addressed_cache=settings.cache.content_addressed,
+            memory_cache=MemoryCache(
+                max_size=settings.cache.memory_max_storage,
+                max_blob_size=settings.cache.memory_max_blob_size
+            ),
+            path_cache=TTLCache(
+                max_entries=settings.data_model.path_cache_size,
+                ttl=settings.data_model.path_cache_ttl,
+                name='checksum_paths'
+            ),
+            digest_cache=TTLCache(
+                max_entries=settings.data_model.path_cache_size,
+                ttl=settings.data_model.path_cache_ttl,
+                name='artifact_digests'
+            ),
+            unknown_checksum_ttl=settings.data_model.unknown_checksum_ttl,
+            io_executor=self.__io_executor,
+            path_update_delay=settings.data_model.path_update_delay,
+            path_update_batch_size=settings.data_model.path_update_batch_size,
+            derivative_executor=self.__derivative_executor,
+            derivative_widths=settings.data_model.derivative_widths,
+            derivative_qualities=settings.data_model.derivative_qualities,
+            event_bus=self.__event_bus
         )
 
         self.__crawler = Crawler(
             data_paths=list(data_paths.values()),
-            conn_str=PG_CONN_STR,
+            pg_pool=self.__pg_pool,
+            on_paths_changed=self.__on_paths_changed,
+            sleep_interrupt=discovery_trigger
         )
 
         self.stop_event = asyncio.Event()
@@ -125,7 +243,13 @@ class Service:
         )
         add_thread_to_monitor(self.__data_paths_heartbeat_thread)
 
-        self.__keystore = KeyStore(settings.web_api.key_store)
+        self.__keystore = KeyStore(
+            settings.web_api.key_store,
+            cache_ttl=settings.web_api.key_cache_ttl,
+            cache_size=settings.web_api.key_cache_size,
+            hash_workers=settings.web_api.key_hash_workers,
+            event_bus=self.__event_bus
+        )
 
         self.rpyc_endpoint = ThreadedServer(
             CliService(
@@ -141,8 +265,11 @@ class Service:
         add_thread_to_monitor(self.rpyc_thread)
 
         self.__job_orchestrator = Orchestrator(
-            pg_conn=PG_CONN_STR,
-            reaper_interval=settings.orchestrator.reaper_interval
+            pg_pool=self.__pg_pool,
+            async_pg_pool=self.__async_pg_pool,
+            reaper_interval=settings.orchestrator.reaper_interval,
+            long_poll_recheck=settings.orchestrator.long_poll_recheck,
+            event_bus=self.__event_bus
         )
 
         web_routes = [
@@ -179,12 +306,20 @@ class Service:
                     'data_model': self._data_model
                 }
             ),
+            URLSpec(
+                pattern=r'/api/v1/data/raw_archive$',
+                handler=RawArchiveHandler,
+                kwargs={
+                    'key_store': self.__keystore,
+                    'data_model': self._data_model
+                }
+            ),
             URLSpec(
                 pattern=r'/api/v1/data/raw$',
                 handler=NotImplementedHandler
             ),
             URLSpec(
-                pattern=r'/api/v1/data/preprocess_jpeg/([a-z0-9]+)$',
+                pattern=r'/api/v1/data/preprocess_jpeg/(?P<checksum>[a-z0-9]+)$',
                 handler=PreprocessJpegHandler,
                 kwargs={
                     'key_store': self.__keystore,
@@ -192,7 +327,7 @@ class Service:
                 }
             ),
             URLSpec(
-                pattern=r'/api/v1/data/laser_jpeg/([a-z0-9]+)$',
+                pattern=r'/api/v1/data/laser_jpeg/(?P<checksum>[a-z0-9]+)$',
                 handler=PreprocessLaserJpegHandler,
                 kwargs={
                     'key_store': self.__keystore,
@@ -200,7 +335,16 @@ class Service:
                 }
             ),
             URLSpec(
-                pattern=r'/api/v1/data/laser/([a-z0-9]+)$',
+                pattern=r'/api/v1/data/derivative/(?P<source>preprocess_jpeg|laser_jpeg)'
+                r'/(?P<checksum>[a-z0-9]+)$',
+                handler=DerivativeHandler,
+                kwargs={
+                    'key_store': self.__keystore,
+                    'data_model': self._data_model
+                }
+            ),
+            URLSpec(
+                pattern=r'/api/v1/data/laser/(?P<checksum>[a-z0-9]+)$',
                 handler=LaserLabelHandler,
                 kwargs={
                     'key_store': self.__keystore,
@@ -208,7 +352,7 @@ class Service:
                 }
             ),
             URLSpec(
-                pattern=r'/api/v1/data/head_tail/([a-z0-9]+)$',
+                pattern=r'/api/v1/data/head_tail/(?P<checksum>[a-z0-9]+)$',
                 handler=HeadTailLabelHandler,
                 kwargs={
                     'key_store': self.__keystore,
@@ -216,7 +360,7 @@ class Service:
                 }
             ),
             URLSpec(
-                pattern=r'/api/v1/data/depth_cal/([a-z0-9]+)$',
+                pattern=r'/api/v1/data/depth_cal/(?P<checksum>[a-z0-9]+)$',
                 handler=NotImplementedHandler
             ),
             URLSpec(
@@ -266,6 +410,38 @@ class Service:
                     'key_store': self.__keystore
                 }
             ),
+            URLSpec(
+                pattern=r'/api/v1/admin/cache$',
+                handler=CacheStatsHandler,
+                kwargs={
+                    'key_store': self.__keystore,
+                    'data_model': self._data_model
+                }
+            ),
+            URLSpec(
+                pattern=r'/api/v1/admin/cache/warm$',
+                handler=CacheWarmHandler,
+                kwargs={
+                    'key_store': self.__keystore,
+                    'data_model': self._data_model
+                }
+            ),
+            URLSpec(
+                pattern=r'/api/v1/admin/cache/pin$',
+                handler=CachePinHandler,
+                kwargs={
+                    'key_store': self.__keystore,
+                    'data_model': self._data_model
+                }
+            ),
+            URLSpec(
+                pattern=r'/api/v1/admin/cache/evict$',
+                handler=CacheEvictHandler,
+                kwargs={
+                    'key_store': self.__keystore,
+                    'data_model': self._data_model
+                }
+            ),
             URLSpec(
                 pattern=r'/api/v1/metadata/frame/(?P<checksum>[a-z0-9]+)$',
                 handler=FrameMetadataHandler,
@@ -274,6 +450,14 @@ class Service:
                     'data_model': self._data_model
                 }
             ),
+            URLSpec(
+                pattern=r'/api/v1/metadata/frames$',
+                handler=FramesMetadataHandler,
+                kwargs={
+                    'key_store': self.__keystore,
+                    'data_model': self._data_model
+                }
+            ),
             URLSpec(
                 pattern=r'/api/v1/metadata/dive/(?P<checksum>[a-z0-9]+)$',
                 handler=DiveMetadataHandler,
@@ -292,7 +476,24 @@ class Service:
             )
         ]
 
-        self.__webapp = tornado.web.Application(web_routes)
+        for route in web_routes:
+            route.target_kwargs['route'] = route_template(route.regex.pattern)
+
+        self.__webapp = tornado.web.Application(
+            web_routes,
+            transforms=[
+                functools.partial(
+                    CompressedJsonEncoding,
+                    level=settings.web_api.compress_level,
+                    min_length=settings.web_api.compress_min_size
+                )
+            ]
+        )
+
+    def __on_paths_changed(self):
+        self._data_model.invalidate_path_cache()
+        # Newly discovered frames may be eligible for jobs
+        self.__job_orchestrator.notify_jobs_available()
 
     def __validate_data_paths(self) -> Dict[Path, Path]:
         # This isn't working!  not sure why
@@ -339,13 +540,7 @@ class Service:
             namespace='e4efs',
             subsystem='spider'
         )
-        query_timer = get_summary(
-            'query_duration',
-            'SQL Query Duration',
-            labelnames=['query'],
-            namespace='e4efs',
-            subsystem='spider'
-        )
+        query_timer = get_histogram('query_duration')
         while True:
             last_run = dt.datetime.now()
             next_run = last_run + settings.summary.interval
@@ -357,8 +552,7 @@ class Service:
                 'headtail_labels',
                 'jobs'
             ]
-            with psycopg.connect(PG_CONN_STR, row_factory=psycopg.rows.dict_row) as con, \
-                    con.cursor() as cur:
+            with self.__pg_pool.connection() as con, con.cursor() as cur:
                 try:
                     for table in tables:
                         with query_timer.labels(query=f'count_{table}').time():
@@ -384,29 +578,83 @@ class Service:
     async def run(self):
         """Main entry point
         """
-        start_http_server(9090)
-        self.__webapp.listen(80)
-
-        system_monitor_thread.start()
-        self.__summary_thread.start()
-        self.rpyc_thread.start()
-
-        self.__label_studio.run()
-        self.__crawler.run()
-        self.__job_orchestrator.start()
+        if self.__supervisor:
+            start_metrics_server(9090)
+        self.__pg_pool.open()
+        await self.__async_pg_pool.open()
+        if self.__event_bus is not None:
+            self.__event_bus.start()
+            self.__event_listener = asyncio.create_task(self.__event_bus.listen())
+        if self.__sockets is None:
+            self.__webapp.listen(80)
+        else:
+            tornado.httpserver.HTTPServer(self.__webapp).add_sockets(self.__sockets)
+        # Load the file cache index without delaying the web API
+        Thread(target=FileCache.get_instance, name='file_cache_init', daemon=True).start()
+
+        if self.__supervisor:
+            system_monitor_thread.start()
+            self.__summary_thread.start()
+            self.rpyc_thread.start()
+
+            self.__label_studio.run()
+            self.__crawler.run()
+            self.__job_orchestrator.start()
 
         await self.stop_event.wait()
 
-        self.__job_orchestrator.stop()
-        self.__crawler.stop()
-        self.__label_studio.stop()
+        if self.__supervisor:
+            self.__job_orchestrator.stop()
+            self.__crawler.stop()
+            self.__label_studio.stop()
+        await self._data_model.flush_path_updates_async()
+        if self.__event_bus is not None:
+            self.__event_listener.cancel()
+            self.__event_bus.stop()
+        self.__io_executor.shutdown()
+        self.__derivative_executor.shutdown()
+        self.__keystore.close()
+        self.__pg_pool.close()
+        await self.__async_pg_pool.close()
 
 
 def main():
     """Main entry point
     """
     configure_logging()
-    asyncio.run(Service().run())
+    processes = settings.web_api.processes
+    if processes == 1:
+        asyncio.run(Service().run())
+        return
+    if MULTIPROCESS_DIR is None:
+        raise RuntimeError('PROMETHEUS_MULTIPROC_DIR must be set to serve from multiple processes')
+    clear_multiprocess_dir()
+    # Bind before forking so that the kernel balances connections across the web processes
+    sockets = tornado.netutil.bind_sockets(80)
+    discovery_trigger = multiprocessing.Event()
+    label_studio_trigger = multiprocessing.Event()
+    signal.signal(signal.SIGTERM, _forward_sigterm)
+    task_id = tornado.process.fork_processes(processes)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    processes = tornado.process.cpu_count() if processes <= 0 else processes
+    # Each process gets its own slice of the cache, as the cache index lives in memory.  The
+    # slices are kept coherent by the invalidations relayed over the event bus.
+    settings.set('cache.path', settings.cache.path / f'process_{task_id}')
+    settings.set('cache.max_storage_mb', settings.cache.max_storage_mb // processes)
+    settings.set('cache.memory_max_storage', settings.cache.memory_max_storage // processes)
+    settings.set('limits', divide_limits(settings.limits, processes))
+    asyncio.run(Service(
+        task_id=task_id,
+        sockets=sockets,
+        discovery_trigger=discovery_trigger,
+        label_studio_trigger=label_studio_trigger
+    ).run())
+
+
+def _forward_sigterm(signum, _):
+    # Web processes inherit the parent's process group, so stop them along with the parent
+    signal.signal(signum, signal.SIG_IGN)
+    os.killpg(os.getpgrp(), signum)
 
 
 if __name__ == '__main__':
@@ -1,23 +1,219 @@
 '''SQL Utilities
 '''
+import functools
+import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 import logging
 import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, ConnectionPool, PoolTimeout
 
-from fishsense_data_processing_spider.metrics import get_summary
+from fishsense_data_processing_spider.metrics import (get_counter, get_gauge,
+                                                      get_histogram, set_gauge_function)
+from fishsense_data_processing_spider.timing import phase
 
 __log = logging.getLogger('sql_utils')
 
-def load_query(path: Path) -> str:
+
+def _get_pool_metrics(pool: Union[ConnectionPool, AsyncConnectionPool]):
+    wait_timer = get_histogram(
+        'pg_pool_wait_duration',
+        'Time spent waiting for a pooled Postgres connection',
+        labelnames=['pool'],
+        namespace='e4efs',
+        subsystem='spider',
+        unit='seconds',
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5,
+                 5, 10, 30)
+    )
+    timeouts = get_counter(
+        'pg_pool_timeouts',
+        'Number of pooled Postgres connection requests that timed out',
+        labelnames=['pool'],
+        namespace='e4efs',
+        subsystem='spider'
+    )
+    pool_stats = get_gauge(
+        'pg_pool_connections',
+        'Pooled Postgres connections',
+        labelnames=['pool', 'state'],
+        namespace='e4efs',
+        subsystem='spider',
+        multiprocess_mode='livesum'
+    )
+    set_gauge_function(pool_stats.labels(pool=pool.name, state='open'),
+                       lambda: pool.get_stats()['pool_size'])
+    set_gauge_function(pool_stats.labels(pool=pool.name, state='idle'),
+                       lambda: pool.get_stats()['pool_available'])
+    set_gauge_function(pool_stats.labels(pool=pool.name, state='waiting'),
+                       lambda: pool.get_stats().get('requests_waiting', 0))
+    return wait_timer.labels(pool=pool.name), timeouts.labels(pool=pool.name)
+
+
+class InstrumentedConnectionPool(ConnectionPool):
+    """Connection pool that reports connection wait time and pool occupancy
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__wait_timer, self.__timeouts = _get_pool_metrics(self)
+
+    def getconn(self, timeout: Optional[float] = None) -> psycopg.Connection:
+        """Obtains a connection from the pool, recording how long the caller waited
+
+        Args:
+            timeout (Optional[float], optional): Seconds to wait. Defaults to the pool timeout.
+
+        Raises:
+            PoolTimeout: No connection became available in time
+
+        Returns:
+            psycopg.Connection: Connection
+        """
+        try:
+            with self.__wait_timer.time():
+                return super().getconn(timeout=timeout)
+        except PoolTimeout:
+            self.__timeouts.inc()
+            raise
+
+
+class InstrumentedAsyncConnectionPool(AsyncConnectionPool):
+    """Async connection pool that reports connection wait time and pool occupancy
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__wait_timer, self.__timeouts = _get_pool_metrics(self)
+
+    async def getconn(self, timeout: Optional[float] = None) -> psycopg.AsyncConnection:
+        """Obtains a connection from the pool, recording how long the caller waited
+
+        Args:
+            timeout (Optional[float], optional): Seconds to wait. Defaults to the pool timeout.
+
+        Raises:
+            PoolTimeout: No connection became available in time
+
+        Returns:
+            psycopg.AsyncConnection: Connection
+        """
+        try:
+            with self.__wait_timer.time(), phase('db_pool'):
+                return await super().getconn(timeout=timeout)
+        except PoolTimeout:
+            self.__timeouts.inc()
+            raise
+
+
+def create_pool(conninfo: str,
+                *,
+                name: str = 'spider',
+                min_size: int = 2,
+                max_size: int = 16,
+                timeout: float = 30.0,
+                max_idle: float = 600.0,
+                max_lifetime: float = 3600.0,
+                check: bool = True) -> ConnectionPool:
+    """Creates the shared Postgres connection pool
+
+    The pool is created closed so that it can be built before any database is reachable.  Call
+    `open()` before use.  Connections use `dict_row` so that callers can use them exactly like
+    `psycopg.connect(..., row_factory=dict_row)`.
+
+    Args:
+        conninfo (str): PG Connection String
+        name (str, optional): Pool name used in metrics. Defaults to 'spider'.
+        min_size (int, optional): Connections kept open. Defaults to 2.
+        max_size (int, optional): Maximum connections. Defaults to 16.
+        timeout (float, optional): Seconds to wait for a connection. Defaults to 30.0.
+        max_idle (float, optional): Seconds before an idle connection is closed. Defaults to
+        600.0.
+        max_lifetime (float, optional): Seconds before a connection is recycled. Defaults to
+        3600.0.
+        check (bool, optional): Check connection health before handing it out. Defaults to
+        True.
+
+    Returns:
+        ConnectionPool: Connection pool
+    """
+    # pylint: disable=too-many-arguments
+    return InstrumentedConnectionPool(
+        conninfo=conninfo,
+        name=name,
+        kwargs={'row_factory': dict_row},
+        min_size=min_size,
+        max_size=max_size,
+        timeout=timeout,
+        max_idle=max_idle,
+        max_lifetime=max_lifetime,
+        check=ConnectionPool.check_connection if check else None,
+        open=False
+    )
+
+
+def create_async_pool(conninfo: str,
+                      *,
+                      name: str = 'spider_async',
+                      min_size: int = 2,
+                      max_size: int = 16,
+                      timeout: float = 30.0,
+                      max_idle: float = 600.0,
+                      max_lifetime: float = 3600.0,
+                      check: bool = True) -> AsyncConnectionPool:
+    """Creates the shared async Postgres connection pool for the web handlers
+
+    The pool is created closed and must be opened with `await pool.open()` from the event loop
+    that will use it.
+
+    Args:
+        conninfo (str): PG Connection String
+        name (str, optional): Pool name used in metrics. Defaults to 'spider_async'.
+        min_size (int, optional): Connections kept open. Defaults to 2.
+        max_size (int, optional): Maximum connections. Defaults to 16.
+        timeout (float, optional): Seconds to wait for a connection. Defaults to 30.0.
+        max_idle (float, optional): Seconds before an idle connection is closed. Defaults to
+        600.0.
+        max_lifetime (float, optional): Seconds before a connection is recycled. Defaults to
+        3600.0.
+        check (bool, optional): Check connection health before handing it out. Defaults to
+        True.
+
+    Returns:
+        AsyncConnectionPool: Async connection pool
+    """
+    # pylint: disable=too-many-arguments
+    return InstrumentedAsyncConnectionPool(
+        conninfo=conninfo,
+        name=name,
+        kwargs={'row_factory': dict_row},
+        min_size=min_size,
+        max_size=max_size,
+        timeout=timeout,
+        max_idle=max_idle,
+        max_lifetime=max_lifetime,
+        check=AsyncConnectionPool.check_connection if check else None,
+        open=False
+    )
+
+
+def load_query(path: Union[Path, str]) -> str:
     """Loads query from path
 
+    Query files are read once per process and then served from memory.
+
     Args:
-        path (Path): Path to query file
+        path (Union[Path, str]): Path to query file
 
     Returns:
         str: Query contents
     """
+    return _read_query(os.path.abspath(path))
+
+
+@functools.lru_cache(maxsize=None)
+def _read_query(path: str) -> str:
     with open(path, 'r', encoding='utf-8') as handle:
         return handle.read(int(1e9))
 
@@ -31,10 +227,8 @@ def do_query(path: Union[Path, str], cur: psycopg.Cursor, params: Optional[Dict[
         params (Optional[Dict[str, Any]]): Query parameters.  Defaults to None
     """
     path = Path(path)
-    query_timer = get_summary(
-        'query_duration'
-    )
-    with query_timer.labels(query=path.stem).time():
+    query_timer = get_histogram('query_duration')
+    with query_timer.labels(query=path.stem).time(), phase('db'):
         try:
             cur.execute(
                 query=load_query(path),
@@ -62,10 +256,8 @@ def do_many_query(path: Union[Path, str],
         to False.
     """
     path = Path(path)
-    query_timer = get_summary(
-        'query_duration'
-    )
-    with query_timer.labels(query=path.stem).time():
+    query_timer = get_histogram('query_duration')
+    with query_timer.labels(query=path.stem).time(), phase('db'):
         try:
             cur.executemany(
                 query=load_query(path),
@@ -80,3 +272,61 @@ def do_many_query(path: Union[Path, str],
                 exc
             )
             raise exc
+
+
+async def do_query_async(path: Union[Path, str],
+                         cur: psycopg.AsyncCursor,
+                         params: Optional[Dict[str, Any]] = None):
+    """Convenience function to time and execute a query on an async cursor
+
+    Args:
+        path (Union[Path, str]): Path to query file
+        cur (psycopg.AsyncCursor): Async cursor
+        params (Optional[Dict[str, Any]]): Query parameters.  Defaults to None
+    """
+    path = Path(path)
+    query_timer = get_histogram('query_duration')
+    with query_timer.labels(query=path.stem).time(), phase('db'):
+        try:
+            await cur.execute(
+                query=load_query(path),
+                params=params
+            )
+        except psycopg.errors.Error as exc:
+            __log.exception('Query %s with params %s failed due to %s',
+                            path,
+                            params,
+                            exc)
+            raise exc
+
+
+async def do_many_query_async(path: Union[Path, str],
+                              cur: psycopg.AsyncCursor,
+                              param_seq: List[Dict[str, Any]],
+                              returning: bool = False) -> None:
+    """Convenience function to time and executemany on an async cursor
+
+    Args:
+        path (Union[Path, str]): Path to query file
+        cur (psycopg.AsyncCursor): Async cursor
+        param_seq (List[Dict[str, Any]]): Query parameters
+        returning (bool, optional): Flag indicating whether or not this query returns data. Defaults
+        to False.
+    """
+    path = Path(path)
+    query_timer = get_histogram('query_duration')
+    with query_timer.labels(query=path.stem).time(), phase('db'):
+        try:
+            await cur.executemany(
+                query=load_query(path),
+                params_seq=param_seq,
+                returning=returning
+            )
+        except psycopg.errors.Error as exc:
+            __log.exception(
+                'Query %s with param seq %s failed due to %s',
+                path,
+                param_seq,
+                exc
+            )
+            raise exc
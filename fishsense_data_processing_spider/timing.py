@@ -0,0 +1,100 @@
+'''Request phase timing
+'''
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+class RequestTimings:
+    """Time spent in each phase of a request
+
+    Phases may be entered more than once, e.g. one `db` phase per query, in which case their
+    durations are summed.
+    """
+
+    def __init__(self):
+        self.__start = time.perf_counter()
+        self.__phases: Dict[str, float] = {}
+
+    @property
+    def phases(self) -> Dict[str, float]:
+        """Seconds spent in each phase, in the order the phases were first entered"""
+        return dict(self.__phases)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the request started"""
+        return time.perf_counter() - self.__start
+
+    def record(self, phase: str, duration: float) -> None:
+        """Adds time to a phase
+
+        Args:
+            phase (str): Phase name
+            duration (float): Seconds
+        """
+        self.__phases[phase] = self.__phases.get(phase, 0) + duration
+
+    def server_timing(self) -> str:
+        """Formats the phases as a `Server-Timing` header value
+
+        Returns:
+            str: Header value, with durations in milliseconds
+        """
+        metrics = [f'{phase};dur={duration * 1e3:.1f}'
+                   for phase, duration in self.__phases.items()]
+        metrics.append(f'total;dur={self.elapsed * 1e3:.1f}')
+        return ', '.join(metrics)
+
+
+__current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    'request_timings', default=None)
+
+
+def start_request() -> contextvars.Token:
+    """Starts collecting phase timings for the current context
+
+    Tasks created afterwards inherit the context, so phases they enter are recorded against
+    this request.
+
+    Returns:
+        contextvars.Token: Token to pass to `end_request`
+    """
+    return __current.set(RequestTimings())
+
+
+def end_request(token: contextvars.Token) -> None:
+    """Stops collecting phase timings for the current context
+
+    Args:
+        token (contextvars.Token): Token from `start_request`
+    """
+    __current.reset(token)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Retrieves the phase timings of the current request
+
+    Returns:
+        Optional[RequestTimings]: Timings, or None outside of a request
+    """
+    return __current.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Records the time spent in the block against the current request, if there is one
+
+    Args:
+        name (str): Phase name
+    """
+    timings = __current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.record(name, time.perf_counter() - start)
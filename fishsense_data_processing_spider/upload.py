@@ -0,0 +1,95 @@
+"""Streamed uploads"""
+
+import asyncio
+import hashlib
+import os
+import uuid
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+
+class UploadTooLarge(ValueError):
+    """Upload exceeds its size limit"""
+
+
+class UploadSpool:
+    """Upload written to a temporary file as it arrives
+
+    The temporary file sits beside its destination, so committing the upload is an atomic
+    rename.  The MD5 digest is computed as chunks arrive, and file writes run on an executor so
+    that the event loop never blocks on disk or network storage.
+    """
+
+    def __init__(self, target: Path, max_size: int, executor: Optional[Executor] = None):
+        self.__target = target
+        self.__temp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        self.__max_size = max_size
+        self.__executor = executor
+        self.__handle: Optional[BinaryIO] = None
+        self.__md5 = hashlib.md5()
+        self.__size = 0
+
+    @property
+    def target(self) -> Path:
+        """Destination path"""
+        return self.__target
+
+    @property
+    def size(self) -> int:
+        """Bytes received"""
+        return self.__size
+
+    @property
+    def md5(self) -> str:
+        """Hex MD5 digest of the bytes received"""
+        return self.__md5.hexdigest()
+
+    async def open(self) -> None:
+        """Creates the temporary file"""
+        await asyncio.get_running_loop().run_in_executor(self.__executor, self.__open)
+
+    def __open(self) -> None:
+        self.__target.parent.mkdir(parents=True, exist_ok=True)
+        self.__handle = open(self.__temp_path, "xb")
+
+    async def write(self, chunk: bytes) -> None:
+        """Appends a chunk
+
+        Args:
+            chunk (bytes): Request body chunk
+
+        Raises:
+            UploadTooLarge: Upload exceeds the size limit
+        """
+        if self.__size + len(chunk) > self.__max_size:
+            raise UploadTooLarge(f"Upload exceeds {self.__max_size} bytes")
+        self.__size += len(chunk)
+        self.__md5.update(chunk)
+        await asyncio.get_running_loop().run_in_executor(
+            self.__executor, self.__handle.write, chunk
+        )
+
+    def commit(self) -> Path:
+        """Syncs the temporary file and renames it over the destination
+
+        This blocks, so run it on an executor from the event loop.
+
+        Returns:
+            Path: Destination path
+        """
+        try:
+            self.__handle.flush()
+            os.fsync(self.__handle.fileno())
+            self.__handle.close()
+            os.replace(self.__temp_path, self.__target)
+        except BaseException:
+            self.discard()
+            raise
+        return self.__target
+
+    def discard(self) -> None:
+        """Closes and removes the temporary file, if it is still present"""
+        if self.__handle is not None:
+            self.__handle.close()
+        self.__temp_path.unlink(missing_ok=True)
@@ -1,14 +1,23 @@
 '''Web Auth
 '''
+import asyncio
 import contextlib
 import datetime as dt
 import enum
 import hashlib
+import hmac
 import logging
 import secrets
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import (Dict, FrozenSet, Iterable, Iterator, List, Optional,
+                    Sequence, Tuple)
+
+from fishsense_data_processing_spider.events import EventBus
+from fishsense_data_processing_spider.memory_cache import TTLCache
+from fishsense_data_processing_spider.timing import phase
 
 
 class Permission(enum.Enum):
@@ -24,25 +33,81 @@ class Permission(enum.Enum):
     PUT_DEBUG_BLOB = 'putDebugBlob'
     ADMIN = 'admin'
     GET_METADATA = 'getMetadata'
+
+
+Grant = Tuple[dt.datetime, FrozenSet[Permission]]
+_MISSING = object()
+
+
 class KeyStore:
     """API Key Store
+
+    Authorization results are cached per key for `cache_ttl` seconds, so the key derivation
+    function runs once per key per TTL rather than on every request.  Cache entries are keyed
+    by an HMAC of the key under a per-process secret, so plaintext keys are never retained.
+
+    Each thread keeps one long-lived connection to the store, which is in WAL mode so that
+    readers do not block on writers.
+
+    With an event bus, key and permission changes also drop the cached authorizations of the
+    other web processes.
     """
     ITERATIONS = 200000
 
     def __init__(self,
-                 path: Path):
+                 path: Path,
+                 *,
+                 cache_ttl: float = 60.0,
+                 cache_size: int = 10000,
+                 hash_workers: int = 2,
+                 event_bus: Optional[EventBus] = None):
         self.__log = logging.getLogger('keystore')
         self.__log.setLevel(logging.INFO)
         self.__path = path
         self.__salt: str = None
         self.__iterations: int = self.ITERATIONS
+        self.__cache_secret = secrets.token_bytes(32)
+        self.__grants = TTLCache(
+            max_entries=cache_size,
+            ttl=cache_ttl,
+            name='api_keys'
+        )
+        self.__lookups: Dict[bytes, asyncio.Future] = {}
+        self.__local = threading.local()
+        # pbkdf2_hmac releases the GIL, so hashing on these threads leaves the event loop free
+        self.__executor = ThreadPoolExecutor(
+            max_workers=hash_workers,
+            thread_name_prefix='keystore'
+        )
+        self.__event_bus = event_bus
+        if event_bus is not None:
+            event_bus.subscribe('keys_changed', lambda _: self.invalidate_cache())
+            event_bus.subscribe(EventBus.RESYNC, lambda _: self.invalidate_cache())
         self.initialize_db()
 
+    @contextlib.contextmanager
+    def __connection(self) -> Iterator[sqlite3.Connection]:
+        con: Optional[sqlite3.Connection] = getattr(self.__local, 'con', None)
+        if con is None:
+            con = sqlite3.connect(self.__path)
+            self.__local.con = con
+        try:
+            yield con
+        except BaseException:
+            con.rollback()
+            raise
+
+    def close(self) -> None:
+        """Stops the hashing threads
+        """
+        self.__executor.shutdown()
+
     def initialize_db(self):
         """Initializes the database
         """
-        with contextlib.closing(sqlite3.connect(self.__path)) as con, \
+        with self.__connection() as con, \
                 contextlib.closing(con.cursor()) as cur:
+            cur.execute('PRAGMA journal_mode=WAL;')
             try:
                 cur.execute('SELECT version FROM version;')
                 version, = cur.fetchone()
@@ -145,7 +210,7 @@ class KeyStore:
         new_hash = self.__hash_key(new_key)
         if not expires:
             expires = dt.datetime.now() + dt.timedelta(days=400)
-        with contextlib.closing(sqlite3.connect(self.__path)) as con, \
+        with self.__connection() as con, \
                 contextlib.closing(con.cursor()) as cur:
             cur.execute(
                 'INSERT INTO keys (hash, expires, comment) VALUES (:hash, :expires, :comment);',
@@ -156,15 +221,34 @@ class KeyStore:
                 }
             )
             con.commit()
+        self.__grants.invalidate(self.__cache_key(new_key))
+        self.__publish_change()
         return new_key, expires
 
+    async def get_new_key_async(self,
+                                comment: str,
+                                expires: Optional[dt.datetime] = None
+                                ) -> Tuple[str, dt.datetime]:
+        """Generates and stores a new API key on the key store's threads
+
+        Args:
+            comment (str): Comment describing this key
+            expires (Optional[dt.datetime]): Expiration.  Defaults to 400 days
+
+        Returns:
+            Tuple[str, dt.datetime]: New API Key, expiration timestamp
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.__executor, self.get_new_key, comment, expires
+        )
+
     def list_hashes(self) -> Dict[str, str]:
         """List hashes
 
         Returns:
             Dict[str, str]: Mapping of hash to comment
         """
-        with contextlib.closing(sqlite3.connect(self.__path)) as con, \
+        with self.__connection() as con, \
                 contextlib.closing(con.cursor()) as cur:
             cur.execute(
                 'SELECT hash, comment FROM keys WHERE expires > :now;',
@@ -186,7 +270,7 @@ class KeyStore:
             value (bool): Allow
         """
         key_hash = self.__hash_key(key)
-        with contextlib.closing(sqlite3.connect(self.__path)) as con, \
+        with self.__connection() as con, \
                 contextlib.closing(con.cursor()) as cur:
             cur.execute(
                 f'UPDATE keys SET {op.value} = :value WHERE hash = :hash;',
@@ -196,6 +280,25 @@ class KeyStore:
                 }
             )
             con.commit()
+        self.__grants.invalidate(self.__cache_key(key))
+        self.__publish_change()
+
+    def __publish_change(self) -> None:
+        # Cache keys are per process secrets, so the other processes drop all their grants
+        if self.__event_bus is not None:
+            self.__event_bus.publish('keys_changed')
+
+    async def set_perm_async(self, key: str, op: Permission, value: bool) -> None:
+        """Sets the permissions for the given key on the key store's threads
+
+        Args:
+            key (str): Key to set perms for
+            op (Permission): Operation ID to set
+            value (bool): Allow
+        """
+        await asyncio.get_running_loop().run_in_executor(
+            self.__executor, self.set_perm, key, op, value
+        )
 
     def get_perm(self, key: str) -> List[Permission]:
         """Gets the list of permissions associated with this key
@@ -206,61 +309,195 @@ class KeyStore:
         Returns:
             List[Permission]: List of allowed Permissions
         """
-        key_hash = self.__hash_key(key)
-        allowed_perms: List[Permission] = []
-        with contextlib.closing(sqlite3.connect(self.__path)) as con, \
-                contextlib.closing(con.cursor()) as cur:
-            for perm in Permission:
-                cur.execute(
-                    f'SELECT {perm.value} FROM keys WHERE hash = :hash;',
-                    {
-                        'hash': key_hash
-                    }
-                )
-                result = cur.fetchone()
-                if result[0] == 1:
-                    allowed_perms.append(perm)
-        return allowed_perms
-
-    def __hash_key(self, key: str) -> str:
-        return hashlib.pbkdf2_hmac('sha256',
-                                   key.encode(),
-                                   self.__salt.encode(),
-                                   self.__iterations)
+        return self.__to_perm_list(self.__get_grant(key))
 
-    def authorize_key(self, key: str, perm: Optional[Permission] = None) -> bool:
-        """Checks if the key is authorized
+    async def get_perm_async(self, key: str) -> List[Permission]:
+        """Gets the list of permissions associated with this key without blocking the event loop
 
         Args:
             key (str): Key to check
-            perm (Permission): ACL to check
 
         Returns:
-            bool: True if authorized, otherwise False
+            List[Permission]: List of allowed Permissions
         """
-        hash_to_verify = self.__hash_key(key)
-        self.__log.debug('Computed hash %s', hash_to_verify)
-        with contextlib.closing(sqlite3.connect(self.__path)) as con, \
-                contextlib.closing(con.cursor()) as cur:
-            if perm:
-                query = f'SELECT expires, {perm.value} FROM keys WHERE hash = :hash LIMIT 1;'
+        return self.__to_perm_list(await self.__get_grant_async(key))
+
+    def get_perms(self, keys: Iterable[str]) -> Dict[str, List[Permission]]:
+        """Gets the permissions of many keys
+
+        Keys missing from the authorization cache are hashed, then read with one query.
+
+        Args:
+            keys (Iterable[str]): Keys to check
+
+        Returns:
+            Dict[str, List[Permission]]: Allowed Permissions by key
+        """
+        grants: Dict[str, Optional[Grant]] = {}
+        misses: Dict[bytes, Tuple[str, bytes]] = {}
+        for key in keys:
+            cache_key = self.__cache_key(key)
+            grant = self.__grants.get(cache_key, _MISSING)
+            if grant is _MISSING:
+                misses[self.__hash_key(key)] = (key, cache_key)
             else:
-                query = 'SELECT expires FROM keys WHERE hash = :hash LIMIT 1;'
+                grants[key] = grant
+        loaded = self.__load_grants(list(misses))
+        for key_hash, (key, cache_key) in misses.items():
+            grants[key] = loaded.get(key_hash)
+            self.__grants.put(cache_key, grants[key])
+        return {
+            key: self.__to_perm_list(grant)
+            for key, grant in grants.items()
+        }
+
+    def list_perms(self) -> Dict[str, Tuple[str, List[Permission]]]:
+        """Lists every unexpired key's comment and permissions with one query
+
+        Returns:
+            Dict[str, Tuple[str, List[Permission]]]: Mapping of hash to comment and allowed
+            Permissions
+        """
+        columns = ', '.join(perm.value for perm in Permission)
+        with self.__connection() as con, \
+                contextlib.closing(con.cursor()) as cur:
             cur.execute(
-                query,
+                f'SELECT hash, comment, {columns} FROM keys WHERE expires > :now;',
                 {
-                    'hash': hash_to_verify
+                    'now': int(dt.datetime.now().timestamp())
                 }
             )
-            result: Optional[Tuple[int]] = cur.fetchone()
-        if not result:
+            return {
+                row[0]: (
+                    row[1],
+                    [perm for perm, allowed in zip(Permission, row[2:]) if allowed]
+                )
+                for row in cur.fetchall()
+            }
+
+    @staticmethod
+    def __to_perm_list(grant: Optional[Grant]) -> List[Permission]:
+        if not grant:
+            return []
+        return [perm for perm in Permission if perm in grant[1]]
+
+    def __hash_key(self, key: str) -> str:
+        return hashlib.pbkdf2_hmac('sha256',
+                                   key.encode(),
+                                   self.__salt.encode(),
+                                   self.__iterations)
+
+    def __cache_key(self, key: str) -> bytes:
+        return hmac.digest(self.__cache_secret, key.encode(), 'sha256')
+
+    def __load_grant(self, key_hash: bytes) -> Optional[Grant]:
+        return self.__load_grants([key_hash]).get(key_hash)
+
+    def __load_grants(self, key_hashes: Sequence[bytes]) -> Dict[bytes, Grant]:
+        columns = ', '.join(perm.value for perm in Permission)
+        grants: Dict[bytes, Grant] = {}
+        with self.__connection() as con, \
+                contextlib.closing(con.cursor()) as cur:
+            # Stay below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+            for idx in range(0, len(key_hashes), 500):
+                batch = key_hashes[idx:idx + 500]
+                placeholders = ', '.join('?' for _ in batch)
+                cur.execute(
+                    f'SELECT hash, expires, {columns} FROM keys WHERE hash IN ({placeholders});',
+                    batch
+                )
+                for row in cur.fetchall():
+                    grants[row[0]] = (
+                        dt.datetime.fromtimestamp(row[1]),
+                        frozenset(
+                            perm for perm, allowed in zip(Permission, row[2:]) if allowed
+                        )
+                    )
+        return grants
+
+    def __get_grant(self, key: str) -> Optional[Grant]:
+        cache_key = self.__cache_key(key)
+        grant = self.__grants.get(cache_key, _MISSING)
+        if grant is _MISSING:
+            grant = self.__lookup_grant(key, cache_key)
+        return grant
+
+    def __lookup_grant(self, key: str, cache_key: bytes) -> Optional[Grant]:
+        key_hash = self.__hash_key(key)
+        self.__log.debug('Computed hash %s', key_hash)
+        grant = self.__load_grant(key_hash)
+        self.__grants.put(cache_key, grant)
+        return grant
+
+    def __check_grant(self, grant: Optional[Grant], perm: Optional[Permission]) -> bool:
+        if not grant:
             self.__log.info('Key failed - not present')
             return False
-        expires = dt.datetime.fromtimestamp(result[0])
+        expires, perms = grant
         if expires < dt.datetime.now():
             self.__log.info('Key failed - expired')
             return False
-        if perm and not bool(result[1]):
+        if perm and perm not in perms:
             self.__log.info('Key failed - not authorized for %s', perm)
             return False
         return True
+
+    def get_key_id(self, key: str) -> bytes:
+        """Identifies a key without revealing it
+
+        The identifier is a keyed digest that is only valid in this process.
+
+        Args:
+            key (str): API key
+
+        Returns:
+            bytes: Key identifier
+        """
+        return self.__cache_key(key)
+
+    def invalidate_cache(self) -> None:
+        """Drops all cached authorizations
+        """
+        self.__grants.clear()
+
+    def authorize_key(self, key: str, perm: Optional[Permission] = None) -> bool:
+        """Checks if the key is authorized
+
+        Args:
+            key (str): Key to check
+            perm (Permission): ACL to check
+
+        Returns:
+            bool: True if authorized, otherwise False
+        """
+        return self.__check_grant(self.__get_grant(key), perm)
+
+    async def authorize_key_async(self, key: str, perm: Optional[Permission] = None) -> bool:
+        """Checks if the key is authorized without blocking the event loop
+
+        On a cache miss the key is hashed and looked up on the key store's threads.  Concurrent
+        misses for the same key share one lookup.
+
+        Args:
+            key (str): Key to check
+            perm (Permission): ACL to check
+
+        Returns:
+            bool: True if authorized, otherwise False
+        """
+        with phase('auth'):
+            return self.__check_grant(await self.__get_grant_async(key), perm)
+
+    async def __get_grant_async(self, key: str) -> Optional[Grant]:
+        cache_key = self.__cache_key(key)
+        grant = self.__grants.get(cache_key, _MISSING)
+        if grant is not _MISSING:
+            return grant
+        lookup = self.__lookups.get(cache_key)
+        if lookup is None:
+            lookup = asyncio.get_running_loop().run_in_executor(
+                self.__executor, self.__lookup_grant, key, cache_key
+            )
+            self.__lookups[cache_key] = lookup
+            lookup.add_done_callback(lambda _: self.__lookups.pop(cache_key, None))
+        return await asyncio.shield(lookup)
@@ -1,9 +0,0 @@
-INSERT INTO jobs (job_id, worker, job_type, expiration, origin)
-VALUES (
-    %(job_id)s,
-    %(worker)s,
-    %(job_type)s,
-    %(expiration)s,
-    %(origin)s
-)
-;
\ No newline at end of file
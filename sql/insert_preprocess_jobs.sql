@@ -0,0 +1,38 @@
+WITH selected AS (
+  SELECT camera_idx, array_agg(image_md5) as checksums
+  FROM (
+    SELECT images.image_md5, cameras.idx as camera_idx
+    FROM images
+    INNER JOIN canonical_dives ON images.dive = canonical_dives.path
+    LEFT JOIN priorities ON canonical_dives.priority = priorities.name
+    LEFT JOIN laser_labels ON images.image_md5 = laser_labels.cksum
+    LEFT JOIN cameras ON images.camera_sn = cameras.serial_number
+    WHERE images.preprocess_jpeg_path IS NULL AND
+      images.ignore = FALSE AND
+      images.preprocess_job_id IS NULL AND
+      canonical_dives.priority = %(priority)s
+    ORDER BY priorities.idx, camera_idx
+    LIMIT %(limit)s
+    FOR UPDATE OF images SKIP LOCKED
+  )
+  GROUP BY camera_idx
+),
+new_jobs AS (
+  SELECT gen_random_uuid() AS job_id, camera_idx, checksums
+  FROM selected
+),
+inserted_jobs AS (
+  INSERT INTO jobs (job_id, worker, job_type, expiration, origin)
+  SELECT job_id, %(worker)s, %(job_type)s, %(expiration)s, %(origin)s
+  FROM new_jobs
+),
+claimed_images AS (
+  UPDATE images
+  SET preprocess_job_id = new_jobs.job_id
+  FROM new_jobs
+  WHERE images.image_md5 = ANY(new_jobs.checksums)
+)
+SELECT job_id, camera_idx, checksums
+FROM new_jobs
+ORDER BY camera_idx
+;
\ No newline at end of file
@@ -0,0 +1,7 @@
+SELECT image_md5 as cksum
+FROM images
+WHERE
+  preprocess_job_id = %(job_id)s OR
+  preprocess_laser_job_id = %(job_id)s
+ORDER BY image_md5
+;
\ No newline at end of file
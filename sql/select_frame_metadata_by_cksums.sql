@@ -0,0 +1,16 @@
+SELECT DISTINCT ON (images.image_md5)
+  images.image_md5 as cksum,
+  data_paths.unc_path || images.path as path,
+  images.path as image_path,
+  images.dive,
+  cameras.idx as camera_idx,
+  images.date
+FROM images
+INNER JOIN canonical_dives ON images.dive = canonical_dives.path
+LEFT JOIN data_paths ON data_paths.idx = images.data_path
+LEFT JOIN cameras ON images.camera_sn = cameras.serial_number
+WHERE
+  images.image_md5 = ANY(%(cksums)s) AND
+  images.ignore = false
+ORDER BY images.image_md5, images.path
+;
\ No newline at end of file
@@ -1,4 +0,0 @@
-UPDATE images
-SET preprocess_job_id = %(job_id)s
-WHERE images.image_md5 = %(checksum)s
-;
\ No newline at end of file
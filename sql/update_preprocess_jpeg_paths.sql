@@ -0,0 +1,5 @@
+UPDATE images
+SET preprocess_jpeg_path = updates.unc_path
+FROM unnest(%(cksums)s::text[], %(unc_paths)s::text[]) AS updates(cksum, unc_path)
+WHERE images.image_md5 = updates.cksum
+;
\ No newline at end of file
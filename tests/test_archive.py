@@ -0,0 +1,27 @@
+'''Archive Tests
+'''
+import io
+import tarfile
+
+from fishsense_data_processing_spider.archive import (END_OF_ARCHIVE,
+                                                      member_header,
+                                                      member_padding)
+
+
+def test_streamed_archive():
+    """Tests that streamed members form a readable tar archive
+    """
+    members = {'a.ORF': b'x' * 1000, 'b.ORF': b'', 'missing.json': b'{}'}
+    stream = io.BytesIO()
+    for name, data in members.items():
+        stream.write(member_header(name, len(data)))
+        stream.write(data)
+        stream.write(member_padding(len(data)))
+    stream.write(END_OF_ARCHIVE)
+    assert stream.tell() % tarfile.BLOCKSIZE == 0
+
+    stream.seek(0)
+    with tarfile.open(fileobj=stream, mode='r:') as archive:
+        assert archive.getnames() == list(members)
+        for name, data in members.items():
+            assert archive.extractfile(name).read() == data
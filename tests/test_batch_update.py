@@ -0,0 +1,137 @@
+'''Batched Update Tests
+'''
+import asyncio
+import contextlib
+from typing import Any, Dict, List, Optional
+
+import psycopg
+import pytest
+
+from fishsense_data_processing_spider.batch_update import BatchedPathUpdate
+
+QUERY_PATH = 'sql/update_preprocess_jpeg_paths.sql'
+
+
+class FakeCursor:
+    """Async cursor recording the executed parameters
+    """
+
+    def __init__(self, pool: 'FakePool'):
+        self.__pool = pool
+
+    async def execute(self, query: str, params: Optional[Dict[str, Any]] = None):
+        if self.__pool.error is not None:
+            raise self.__pool.error
+        self.__pool.executed.append(params)
+
+
+class FakeConnection:
+    """Async connection counting commits
+    """
+
+    def __init__(self, pool: 'FakePool'):
+        self.__pool = pool
+
+    def cursor(self) -> contextlib.AbstractAsyncContextManager:
+        @contextlib.asynccontextmanager
+        async def cursor():
+            yield FakeCursor(self.__pool)
+        return cursor()
+
+    async def commit(self):
+        self.__pool.commits += 1
+
+
+class FakePool:
+    """Async connection pool recording the statements written through it
+    """
+
+    def __init__(self, error: Optional[Exception] = None):
+        self.executed: List[Dict[str, Any]] = []
+        self.commits = 0
+        self.error = error
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        yield FakeConnection(self)
+
+
+def test_updates_batched():
+    """Tests that concurrent updates are written together, keeping the last path per checksum
+    """
+    pool = FakePool()
+    updates = BatchedPathUpdate(pool, QUERY_PATH, name='test_batched', max_delay=0.05)
+
+    async def submit():
+        await asyncio.gather(
+            updates.submit('a', '//nas/a1.JPG'),
+            updates.submit('b', '//nas/b.JPG'),
+            updates.submit('a', '//nas/a2.JPG'),
+        )
+
+    asyncio.run(submit())
+    assert pool.executed == [{'cksums': ['a', 'b'], 'unc_paths': ['//nas/a2.JPG', '//nas/b.JPG']}]
+    assert pool.commits == 1
+
+
+def test_full_batch_written_without_delay():
+    """Tests that a full batch is written at once and the rest waits for the next batch
+    """
+    pool = FakePool()
+    updates = BatchedPathUpdate(pool, QUERY_PATH, name='test_full_batch', max_delay=60,
+                                max_batch=2)
+
+    async def submit():
+        first = asyncio.gather(
+            updates.submit('a', '//nas/a.JPG'),
+            updates.submit('b', '//nas/b.JPG'))
+        await asyncio.wait_for(first, 1)
+        pending = asyncio.create_task(updates.submit('c', '//nas/c.JPG'))
+        await asyncio.sleep(0.01)
+        assert not pending.done()
+        await updates.flush()
+        await asyncio.wait_for(pending, 1)
+
+    asyncio.run(submit())
+    assert [params['cksums'] for params in pool.executed] == [['a', 'b'], ['c']]
+
+
+def test_flush_without_pending():
+    """Tests that flushing with nothing pending writes nothing
+    """
+    pool = FakePool()
+    updates = BatchedPathUpdate(pool, QUERY_PATH, name='test_flush_empty')
+
+    asyncio.run(updates.flush())
+    assert not pool.executed
+
+
+def test_failure_raised_to_every_waiter():
+    """Tests that every update in a failed batch raises the failure
+    """
+    error = psycopg.OperationalError('connection lost')
+    updates = BatchedPathUpdate(FakePool(error), QUERY_PATH, name='test_failure')
+
+    async def submit():
+        return await asyncio.gather(
+            updates.submit('a', '//nas/a.JPG'),
+            updates.submit('b', '//nas/b.JPG'),
+            return_exceptions=True)
+
+    assert asyncio.run(submit()) == [error, error]
+
+
+def test_failure_does_not_stop_later_batches():
+    """Tests that a batch after a failed batch is still written
+    """
+    pool = FakePool(psycopg.OperationalError('connection lost'))
+    updates = BatchedPathUpdate(pool, QUERY_PATH, name='test_recovery', max_delay=0.01)
+
+    async def submit():
+        with pytest.raises(psycopg.OperationalError):
+            await updates.submit('a', '//nas/a.JPG')
+        pool.error = None
+        await updates.submit('b', '//nas/b.JPG')
+
+    asyncio.run(submit())
+    assert pool.executed == [{'cksums': ['b'], 'unc_paths': ['//nas/b.JPG']}]
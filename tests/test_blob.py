@@ -0,0 +1,83 @@
+'''Blob Tests
+'''
+import asyncio
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from fishsense_data_processing_spider.blob import (Blob, RangeNotSatisfiable,
+                                                   parse_byte_range)
+
+
+async def _collect(blob: Blob, chunk_size: int) -> List[bytes]:
+    return [chunk async for chunk in blob.iter_chunks(chunk_size)]
+
+
+def test_file_blob_chunks(tmp_path: Path):
+    """Tests that file blobs stream in bounded chunks
+    """
+    path = tmp_path / 'data.bin'
+    path.write_bytes(bytes(range(256)) * 40)
+    blob = Blob.from_file(path)
+    assert blob.size == 10240
+    chunks = asyncio.run(_collect(blob, 4096))
+    assert [len(chunk) for chunk in chunks] == [4096, 4096, 2048]
+    assert b''.join(chunks) == path.read_bytes()
+    assert blob.read() == path.read_bytes()
+
+
+def test_file_blob_max_size(tmp_path: Path):
+    """Tests that file blobs stop at the maximum size
+    """
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'x' * 1000)
+    blob = Blob.from_file(path, max_size=600)
+    assert blob.size == 600
+    assert b''.join(asyncio.run(_collect(blob, 256))) == b'x' * 600
+    assert blob.read() == b'x' * 600
+
+
+def test_bytes_blob_chunks():
+    """Tests that in-memory blobs are chunked without touching disk
+    """
+    blob = Blob.from_bytes(b'abcdefg')
+    assert blob.path is None
+    assert asyncio.run(_collect(blob, 3)) == [b'abc', b'def', b'g']
+
+
+def test_missing_file(tmp_path: Path):
+    """Tests that missing files raise
+    """
+    with pytest.raises(FileNotFoundError):
+        Blob.from_file(tmp_path / 'missing.bin')
+
+
+def test_parse_byte_range():
+    """Tests single byte range parsing
+    """
+    assert parse_byte_range(None, 100) is None
+    assert parse_byte_range('bytes=10-19', 100) == (10, 20)
+    assert parse_byte_range('bytes=90-', 100) == (90, 100)
+    assert parse_byte_range('bytes=90-500', 100) == (90, 100)
+    assert parse_byte_range('bytes=-10', 100) == (90, 100)
+    assert parse_byte_range('bytes=-500', 100) == (0, 100)
+    assert parse_byte_range('bytes=0-1,5-6', 100) is None
+    assert parse_byte_range('items=0-1', 100) is None
+    assert parse_byte_range('bytes=20-10', 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range('bytes=100-', 100)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range('bytes=-0', 100)
+
+
+def test_file_blob_range(tmp_path: Path):
+    """Tests that ranges stream only the requested bytes
+    """
+    path = tmp_path / 'data.bin'
+    path.write_bytes(bytes(range(256)) * 4)
+    blob = Blob.from_file(path)
+
+    async def collect_range() -> bytes:
+        return b''.join([chunk async for chunk in blob.iter_chunks(100, start=300, stop=650)])
+    assert asyncio.run(collect_range()) == path.read_bytes()[300:650]
@@ -0,0 +1,72 @@
+'''Response Compression Tests
+'''
+import zlib
+
+import pytest
+from tornado.httputil import HTTPHeaders, HTTPServerRequest
+
+from fishsense_data_processing_spider.compression import (CompressedJsonEncoding,
+                                                          negotiate_encoding)
+
+
+@pytest.mark.parametrize('header,expected', [
+    ('', None),
+    ('identity', None),
+    ('gzip, deflate, br', 'gzip'),
+    ('deflate', 'deflate'),
+    ('gzip;q=0.5, deflate', 'deflate'),
+    ('gzip;q=0, *', 'deflate'),
+    ('*;q=0', None),
+])
+def test_negotiate(header: str, expected: str):
+    """Tests content coding negotiation
+    """
+    assert negotiate_encoding(header) == expected
+
+
+def _transform(accept_encoding: str, min_length: int = 1024) -> CompressedJsonEncoding:
+    request = HTTPServerRequest(
+        method='GET', uri='/', headers=HTTPHeaders({'Accept-Encoding': accept_encoding}))
+    return CompressedJsonEncoding(request, min_length=min_length)
+
+
+@pytest.mark.parametrize('encoding,wbits', [('gzip', 16 + zlib.MAX_WBITS),
+                                            ('deflate', zlib.MAX_WBITS)])
+def test_compress_json(encoding: str, wbits: int):
+    """Tests that large JSON responses are compressed, including when streamed
+    """
+    body = b'{"checksums": [' + b', '.join([b'"0123456789abcdef"'] * 200) + b']}'
+    headers = HTTPHeaders({'Content-Type': 'application/json; charset=UTF-8',
+                           'Content-Length': str(len(body))})
+    _, headers, chunk = _transform(encoding).transform_first_chunk(200, headers, body, True)
+    assert headers['Content-Encoding'] == encoding
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert int(headers['Content-Length']) == len(chunk) < len(body)
+    assert zlib.decompress(chunk, wbits) == body
+
+    transform = _transform(encoding)
+    headers = HTTPHeaders({'Content-Type': 'application/json'})
+    _, headers, first = transform.transform_first_chunk(200, headers, body[:10], False)
+    rest = transform.transform_chunk(body[10:], True)
+    assert zlib.decompress(first + rest, wbits) == body
+
+
+def test_skip_compression():
+    """Tests that small, binary and unnegotiated responses are sent as is
+    """
+    body = b'{"dives": []}'
+    headers = HTTPHeaders({'Content-Type': 'application/json'})
+    _, headers, chunk = _transform('gzip').transform_first_chunk(200, headers, body, True)
+    assert chunk == body
+    assert 'Content-Encoding' not in headers
+
+    body = bytes(4096)
+    headers = HTTPHeaders({'Content-Type': 'application/octet-stream'})
+    _, headers, chunk = _transform('gzip').transform_first_chunk(200, headers, body, True)
+    assert chunk == body
+    assert 'Content-Encoding' not in headers
+
+    headers = HTTPHeaders({'Content-Type': 'application/json'})
+    _, headers, chunk = _transform('').transform_first_chunk(200, headers, body, True)
+    assert chunk == body
+    assert 'Content-Encoding' not in headers
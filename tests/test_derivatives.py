@@ -0,0 +1,47 @@
+'''Image Derivative Tests
+'''
+import io
+from pathlib import Path
+
+from PIL import Image
+
+from fishsense_data_processing_spider.derivatives import (derivative_artifact,
+                                                          render_jpeg)
+
+
+def make_jpeg(path: Path, size) -> Path:
+    """Writes a gradient JPEG
+    """
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    image.save(path, 'JPEG', quality=95)
+    return path
+
+
+def test_downscale(tmp_path: Path):
+    """Tests that wide images are downscaled, preserving the aspect ratio
+    """
+    source = make_jpeg(tmp_path / 'wide.jpg', (4000, 3000))
+
+    data = render_jpeg(source, 1280, 75)
+
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.format == 'JPEG'
+        assert image.size == (1280, 960)
+        assert image.info.get('progressive')
+    assert len(data) < source.stat().st_size
+
+
+def test_narrow_image_not_upscaled(tmp_path: Path):
+    """Tests that images narrower than the width are only recompressed
+    """
+    source = make_jpeg(tmp_path / 'narrow.jpg', (200, 100))
+
+    with Image.open(io.BytesIO(render_jpeg(source, 1280, 60))) as image:
+        assert image.size == (200, 100)
+        assert image.mode == 'RGB'
+
+
+def test_derivative_artifact():
+    """Tests that derivative names are valid artifact types
+    """
+    assert derivative_artifact('preprocess_jpeg', 640, 75) == 'preprocess_jpeg_w640_q75'
@@ -0,0 +1,315 @@
+'''Endpoint Tests
+'''
+import asyncio
+import contextlib
+import datetime as dt
+import hashlib
+import io
+import json
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+from PIL import Image
+from tornado.httpclient import AsyncHTTPClient, HTTPResponse
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+from tornado.web import Application
+
+from fishsense_data_processing_spider.config import settings
+from fishsense_data_processing_spider.data_model import DataModel
+from fishsense_data_processing_spider.endpoints import (DerivativeHandler,
+                                                       FramesMetadataHandler,
+                                                       PreprocessJpegHandler)
+from fishsense_data_processing_spider.file_cache import CacheArtifact
+from fishsense_data_processing_spider.memory_cache import MemoryCache, TTLCache
+from fishsense_data_processing_spider.web_auth import KeyStore, Permission
+
+async def fetch(app: Application, path: str, **kwargs: Any) -> HTTPResponse:
+    """Serves `app` on a local port for one request
+
+    Args:
+        app (Application): Application
+        path (str): Request path
+        **kwargs: Request options
+
+    Returns:
+        HTTPResponse: Response, including error responses
+    """
+    sock, port = bind_unused_port()
+    server = HTTPServer(app)
+    server.add_sockets([sock])
+    try:
+        return await AsyncHTTPClient().fetch(
+            f'http://127.0.0.1:{port}{path}', raise_error=False, **kwargs)
+    finally:
+        server.stop()
+
+
+def fetch_all(app: Application, requests: List[Dict[str, Any]]) -> List[HTTPResponse]:
+    """Makes requests one after another
+
+    Args:
+        app (Application): Application
+        requests (List[Dict[str, Any]]): Request options, each with a `path`
+
+    Returns:
+        List[HTTPResponse]: Responses
+    """
+    async def run():
+        return [await fetch(app, **request) for request in requests]
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def checksum() -> str:
+    """Creates a checksum that the file cache has not seen
+
+    The file cache is shared between tests and persists between runs.
+
+    Returns:
+        str: Checksum
+    """
+    return uuid.uuid4().hex
+
+
+@pytest.fixture
+def data_model(tmp_path: Path, checksum: str) -> DataModel:
+    """Creates a data model serving artifacts from a temporary store
+
+    `checksum` is a known raw file, so no database is needed to serve its artifacts.
+
+    Args:
+        tmp_path (Path): Temporary path
+        checksum (str): Raw file checksum
+
+    Returns:
+        DataModel: Data model
+    """
+    path_cache = TTLCache(max_entries=16, ttl=3600, name='test_checksum_paths')
+    path_cache.put(checksum, Path('//nas/raw/frame.ORF'))
+    (tmp_path / 'preprocess').mkdir()
+    return DataModel(
+        data_path_mapping={Path('//nas'): tmp_path},
+        pg_pool=None,
+        preprocess_jpeg_path=Path('//nas/preprocess'),
+        preprocess_laser_jpeg_path=Path('//nas/laser'),
+        debug_data_path=Path('//nas/debug'),
+        async_pg_pool=None,
+        memory_cache=MemoryCache(1 << 20, 1 << 16, name='test_hot_tier'),
+        path_cache=path_cache,
+        digest_cache=TTLCache(max_entries=16, ttl=3600, name='test_artifact_digests')
+    )
+
+
+def test_preprocess_jpeg_etag_follows_content(
+        data_model: DataModel, tmp_path: Path, checksum: str):
+    """Tests that a re-uploaded JPEG is not served from stale validators
+    """
+    app = Application([
+        (r'/preprocess_jpeg/(?P<checksum>[a-z0-9]+)$', PreprocessJpegHandler,
+         {'key_store': None, 'data_model': data_model}),
+    ])
+    path = f'/preprocess_jpeg/{checksum}'
+    old, new = b'old jpeg', b'new jpeg contents'
+    old_etag = f'"{hashlib.md5(old).hexdigest()}"'
+    (tmp_path / 'preprocess' / f'{checksum}.JPG').write_bytes(old)
+
+    first, revalidated = fetch_all(app, [
+        {'path': path},
+        {'path': path, 'headers': {'If-None-Match': old_etag}},
+    ])
+    assert first.code == 200
+    assert first.body == old
+    assert first.headers['Etag'] == old_etag
+    assert 'immutable' not in first.headers['Cache-Control']
+    assert revalidated.code == 304
+
+    data_model._write_artifact(checksum, CacheArtifact.PREPROCESS_JPEG, new)
+
+    changed, resumed = fetch_all(app, [
+        {'path': path, 'headers': {'If-None-Match': old_etag}},
+        {'path': path, 'headers': {'Range': 'bytes=3-', 'If-Range': old_etag}},
+    ])
+    assert changed.code == 200
+    assert changed.body == new
+    assert changed.headers['Etag'] == f'"{hashlib.md5(new).hexdigest()}"'
+    assert resumed.code == 200
+    assert resumed.body == new
+
+
+def make_jpeg(color: str) -> bytes:
+    """Encodes a solid color JPEG
+    """
+    with io.BytesIO() as buffer:
+        Image.new('RGB', (800, 600), color).save(buffer, 'JPEG')
+        return buffer.getvalue()
+
+
+def test_derivative_etag_follows_source(
+        data_model: DataModel, tmp_path: Path, checksum: str):
+    """Tests that derivatives of a re-uploaded JPEG are rendered again under a new tag
+    """
+    app = Application([
+        (r'/derivative/(?P<source>preprocess_jpeg|laser_jpeg)/(?P<checksum>[a-z0-9]+)$',
+         DerivativeHandler, {'key_store': None, 'data_model': data_model}),
+    ])
+    path = f'/derivative/preprocess_jpeg/{checksum}?width=320&quality=75'
+    old, new = make_jpeg('red'), make_jpeg('blue')
+    (tmp_path / 'preprocess' / f'{checksum}.JPG').write_bytes(old)
+
+    first, = fetch_all(app, [{'path': path}])
+    assert first.code == 200
+    assert first.headers['Etag'] == f'"{hashlib.md5(old).hexdigest()}_w320_q75"'
+    assert 'immutable' not in first.headers['Cache-Control']
+
+    data_model._write_artifact(checksum, CacheArtifact.PREPROCESS_JPEG, new)
+
+    changed, = fetch_all(app, [{'path': path, 'headers': {'If-None-Match': first.headers['Etag']}}])
+    assert changed.code == 200
+    assert changed.headers['Etag'] == f'"{hashlib.md5(new).hexdigest()}_w320_q75"'
+    with Image.open(io.BytesIO(changed.body)) as image:
+        assert image.size == (320, 240)
+        red, _, blue = image.getpixel((160, 120))
+        assert blue > red
+
+
+class FakeAsyncPool:
+    """Async connection pool answering every query with the given rows
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.executed: List[Optional[Dict[str, Any]]] = []
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        yield self
+
+    @contextlib.asynccontextmanager
+    async def cursor(self):
+        yield self
+
+    async def execute(self, query: str, params: Optional[Dict[str, Any]] = None):
+        self.executed.append(params)
+
+    async def fetchall(self) -> List[Dict[str, Any]]:
+        return [row for row in self.rows if row['cksum'] in self.executed[-1]['cksums']]
+
+
+@pytest.fixture
+def frames_app(tmp_path: Path):
+    """Creates an application serving frame metadata from two known frames
+
+    Args:
+        tmp_path (Path): Temporary path
+
+    Yields:
+        Tuple[Application, str, FakeAsyncPool, TTLCache]: Application, API key authorized for
+        metadata, database and path cache
+    """
+    key_store = KeyStore(tmp_path / 'keys.db')
+    key, _ = key_store.get_new_key('test')
+    key_store.set_perm(key, Permission.GET_METADATA, True)
+    pool = FakeAsyncPool([
+        {'cksum': 'a1', 'path': '//nas/raw/a1.ORF', 'image_path': 'raw/a1.ORF',
+         'dive': 'dive1', 'camera_idx': 1, 'date': dt.datetime(2024, 5, 1, 12, 30)},
+        {'cksum': 'b2', 'path': '//nas/raw/b2.ORF', 'image_path': 'raw/b2.ORF',
+         'dive': 'dive1', 'camera_idx': 2, 'date': None},
+    ])
+    path_cache = TTLCache(max_entries=16, ttl=3600, name='test_frames_paths')
+    data_model = DataModel(
+        data_path_mapping={Path('//nas'): tmp_path},
+        pg_pool=None,
+        preprocess_jpeg_path=Path('//nas/preprocess'),
+        preprocess_laser_jpeg_path=Path('//nas/laser'),
+        debug_data_path=Path('//nas/debug'),
+        async_pg_pool=pool,
+        path_cache=path_cache
+    )
+    app = Application([
+        (r'/api/v1/metadata/frames$', FramesMetadataHandler,
+         {'key_store': key_store, 'data_model': data_model}),
+    ])
+    yield app, key, pool, path_cache
+    key_store.close()
+
+
+def post_frames(app: Application, body: bytes, key: Optional[str]) -> HTTPResponse:
+    """Requests frame metadata
+
+    Args:
+        app (Application): Application
+        body (bytes): Request body
+        key (Optional[str]): API key
+
+    Returns:
+        HTTPResponse: Response
+    """
+    headers = {} if key is None else {'api_key': key}
+    response, = fetch_all(app, [{
+        'path': '/api/v1/metadata/frames', 'method': 'POST', 'body': body, 'headers': headers
+    }])
+    return response
+
+
+def test_frames_metadata(frames_app):
+    """Tests that known frames are described and unknown frames are listed, in request order
+    """
+    app, key, pool, path_cache = frames_app
+    body = json.dumps({'checksums': ['zz', 'b2', 'a1', 'b2']}).encode()
+
+    response = post_frames(app, body, key)
+    assert response.code == 200
+    assert response.headers['Content-Type'].startswith('application/json')
+    document = json.loads(response.body)
+    assert document == {
+        'frames': {
+            'b2': {'image_path': 'raw/b2.ORF', 'dive': 'dive1', 'camera_idx': 2, 'date': None},
+            'a1': {'image_path': 'raw/a1.ORF', 'dive': 'dive1', 'camera_idx': 1,
+                   'date': '2024-05-01T12:30:00'},
+        },
+        'unknown': ['zz'],
+    }
+    assert list(document['frames']) == ['b2', 'a1']
+    # One query for the batch, without duplicates
+    assert pool.executed == [{'cksums': ['zz', 'b2', 'a1']}]
+    assert path_cache.get('a1') == Path('//nas/raw/a1.ORF')
+
+
+@pytest.mark.parametrize('body', [
+    b'not json',
+    b'["a1"]',
+    b'{"checksums": "a1"}',
+    b'{"checksums": ["a1", 2]}',
+])
+def test_frames_metadata_rejects_malformed(frames_app, body: bytes):
+    """Tests that malformed requests are rejected before querying
+    """
+    app, key, pool, _ = frames_app
+
+    assert post_frames(app, body, key).code == 400
+    assert not pool.executed
+
+
+def test_frames_metadata_limits_batch(frames_app, monkeypatch: pytest.MonkeyPatch):
+    """Tests that oversized batches are rejected before querying
+    """
+    app, key, pool, _ = frames_app
+    monkeypatch.setitem(settings.web_api, 'max_batch_checksums', 2)
+
+    response = post_frames(app, json.dumps({'checksums': ['a1', 'b2', 'c3']}).encode(), key)
+    assert response.code == 400
+    assert not pool.executed
+
+
+def test_frames_metadata_requires_key(frames_app):
+    """Tests that requests without an authorized key are refused
+    """
+    app, _, pool, _ = frames_app
+    body = json.dumps({'checksums': ['a1']}).encode()
+
+    assert post_frames(app, body, None).code == 401
+    assert post_frames(app, body, 'not a key').code == 401
+    assert not pool.executed
@@ -0,0 +1,61 @@
+'''Event Bus Tests
+'''
+import asyncio
+import os
+
+import pytest
+
+from fishsense_data_processing_spider.events import EventBus
+from fishsense_data_processing_spider.sql_utils import create_pool
+
+TEST_POSTGRES = os.environ.get('E4EFS_TEST_POSTGRES')
+
+
+def test_relay_between_processes():
+    """Tests that events reach the other buses but not the bus that published them
+    """
+    if TEST_POSTGRES is None:
+        pytest.skip('E4EFS_TEST_POSTGRES not set')
+    pg_pool = create_pool(TEST_POSTGRES, name='test_events', min_size=1, max_size=2)
+    pg_pool.open()
+    publisher = EventBus(TEST_POSTGRES, pg_pool)
+    subscriber = EventBus(TEST_POSTGRES, pg_pool)
+
+    async def relay():
+        received = {'publisher': [], 'sync': [], 'async': []}
+        done = asyncio.Event()
+
+        async def on_async(payload):
+            received['async'].append(payload)
+            done.set()
+
+        publisher.subscribe('test_relay', received['publisher'].append)
+        subscriber.subscribe('test_relay', received['sync'].append)
+        subscriber.subscribe('test_relay', on_async)
+        listeners = [asyncio.create_task(bus.listen()) for bus in (publisher, subscriber)]
+        # Let both connections LISTEN before publishing
+        await asyncio.sleep(0.5)
+        publisher.publish('test_relay', checksum='abc', checksums=['a', 'b'])
+        await asyncio.wait_for(done.wait(), 5)
+        await asyncio.sleep(0.1)
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+        return received
+
+    publisher.start()
+    try:
+        received = asyncio.run(relay())
+    finally:
+        publisher.stop()
+        pg_pool.close()
+    payload = {'checksum': 'abc', 'checksums': ['a', 'b']}
+    assert received == {'publisher': [], 'sync': [payload], 'async': [payload]}
+
+
+def test_publish_rejects_large_payload():
+    """Tests that payloads that NOTIFY would reject are refused up front
+    """
+    bus = EventBus('', None)
+    with pytest.raises(ValueError):
+        bus.publish('test_large', checksums=['0' * 32] * 500)
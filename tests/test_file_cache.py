@@ -1,24 +1,26 @@
 # pylint: disable=all
 
+import threading
+import time
 from hashlib import md5
 from pathlib import Path
 
-from fishsense_data_processing_spider.file_cache import FileCache
+from fishsense_data_processing_spider.file_cache import CacheArtifact, FileCache
 
 
 def test_singleton():
-    file_cache = FileCache.instance
+    file_cache = FileCache.get_instance()
 
     assert isinstance(file_cache, FileCache)
 
 
 def test_add_remove_to_cache():
-    file_cache = FileCache.instance
+    file_cache = FileCache.get_instance()
 
     file_path = Path(__file__)
 
     assert not file_cache.test_cached_file(file_path)
-    file_cache.add_to_cache(file_path)
+    file_cache.add_to_cache(file_path).join()
     assert file_cache.test_cached_file(file_path)
 
     file_cache.remove_from_cache(file_path)
@@ -26,12 +28,12 @@ def test_add_remove_to_cache():
 
 
 def test_get_cached_file():
-    file_cache = FileCache.instance
+    file_cache = FileCache.get_instance()
 
     file_path = Path(__file__)
 
     assert not file_cache.test_cached_file(file_path)
-    file_cache.add_to_cache(file_path)
+    file_cache.add_to_cache(file_path).join()
 
     assert file_cache.test_cached_file(file_path)
 
@@ -50,10 +52,10 @@ def test_get_cached_file():
 
 
 def test_garbage_collection():
-    big_file_cache = FileCache.instance
+    big_file_cache = FileCache.get_instance()
 
     file_path = Path(__file__)
-    big_file_cache.add_to_cache(file_path)
+    big_file_cache.add_to_cache(file_path).join()
 
     small_file_cache = FileCache(max_storage_mb=0)
 
@@ -61,3 +63,146 @@ def test_garbage_collection():
     small_file_cache._collect_garbage()
     small_file_cache._garbage_collector_thread.join()
     assert not small_file_cache.test_cached_file(file_path)
+
+    big_file_cache.remove_from_cache(file_path)
+
+
+def test_add_remove_blob_to_cache():
+    file_cache = FileCache.get_instance()
+
+    file_path = Path(__file__)
+    checksum = md5(file_path.read_bytes()).hexdigest()
+
+    assert not file_cache.test_cached_blob(checksum)
+    file_cache.add_blob_to_cache(checksum, file_path).join()
+    assert file_cache.test_cached_blob(checksum)
+    assert not file_cache.test_cached_blob(checksum, CacheArtifact.PREPROCESS_JPEG)
+
+    cache_path = file_cache.get_cached_blob(checksum, file_path)
+    assert cache_path != file_path
+    assert cache_path.parent.name == checksum[2:4]
+    assert cache_path.parent.parent.name == checksum[:2]
+    assert file_cache.verify_cached_blob(checksum)
+
+    file_cache.remove_blob_from_cache(checksum)
+    assert not file_cache.test_cached_blob(checksum)
+    assert not cache_path.exists()
+
+
+def test_blob_index_rebuild():
+    file_cache = FileCache.get_instance()
+
+    file_path = Path(__file__)
+    checksum = md5(file_path.read_bytes()).hexdigest()
+    file_cache.add_blob_to_cache(checksum, file_path, CacheArtifact.PREPROCESS_JPEG).join()
+    cache_path = file_cache.get_cached_blob(checksum, file_path, CacheArtifact.PREPROCESS_JPEG)
+
+    # A fresh instance must find the blob from the directory layout alone
+    (cache_path.parents[3] / "cache_map.pickle").unlink(missing_ok=True)
+    rebuilt_cache = FileCache()
+    assert rebuilt_cache.wait_for_reconcile(timeout=10)
+    assert rebuilt_cache.test_cached_blob(checksum, CacheArtifact.PREPROCESS_JPEG)
+    assert rebuilt_cache.get_cached_blob(
+        checksum, file_path, CacheArtifact.PREPROCESS_JPEG) == cache_path
+
+    rebuilt_cache.remove_blob_from_cache(checksum, CacheArtifact.PREPROCESS_JPEG)
+    file_cache.remove_blob_from_cache(checksum, CacheArtifact.PREPROCESS_JPEG)
+
+
+def test_corrupt_blob_is_evicted():
+    file_cache = FileCache.get_instance()
+
+    file_path = Path(__file__)
+    bad_checksum = "0" * 32
+    file_cache.add_blob_to_cache(bad_checksum, file_path).join()
+
+    assert file_cache.test_cached_blob(bad_checksum)
+    assert not file_cache.verify_cached_blob(bad_checksum)
+    assert not file_cache.test_cached_blob(bad_checksum)
+
+
+def test_corrupt_index_rebuild():
+    file_cache = FileCache.get_instance()
+
+    file_path = Path(__file__)
+    checksum = md5(file_path.read_bytes()).hexdigest()
+    file_cache.add_blob_to_cache(checksum, file_path).join()
+    cache_path = file_cache.get_cached_blob(checksum, file_path)
+    orphan_path = cache_path.parents[3] / "orphan"
+    orphan_path.write_bytes(b"orphan")
+
+    (cache_path.parents[3] / "cache_map.pickle").write_bytes(b"not a pickle")
+    time.sleep(0.01)
+    rebuilt_cache = FileCache()
+    assert rebuilt_cache.wait_for_reconcile(timeout=10)
+    assert rebuilt_cache.test_cached_blob(checksum)
+    assert not orphan_path.exists()
+
+    rebuilt_cache.remove_blob_from_cache(checksum)
+    file_cache.remove_blob_from_cache(checksum)
+
+
+def test_pinned_blob_survives_garbage_collection():
+    file_path = Path(__file__)
+    checksum = md5(file_path.read_bytes()).hexdigest()
+
+    small_file_cache = FileCache(max_storage_mb=0)
+    assert small_file_cache.wait_for_reconcile(timeout=10)
+    key = FileCache.get_blob_key(checksum)
+    small_file_cache.pin(key)
+    small_file_cache.warm({key: file_path}).join()
+    small_file_cache._garbage_collector_thread.join()
+    assert small_file_cache.test_cached_blob(checksum)
+
+    stats = small_file_cache.get_stats()
+    assert stats["pinned"] == 1
+    assert stats["blobs"] == 1
+    assert stats["fillsInFlight"] == 0
+
+    small_file_cache.unpin(key)
+    small_file_cache.remove_blob_from_cache(checksum)
+    assert small_file_cache.get_stats()["evictedBytes"] > 0
+
+
+def test_put_lookup_blob():
+    file_cache = FileCache.get_instance()
+
+    checksum = md5(b"put_lookup_blob").hexdigest()
+    artifact = "preprocess_jpeg_w320_q75"
+
+    assert file_cache.lookup_blob(checksum, artifact) is None
+    cache_path = file_cache.put_blob(checksum, artifact, b"derived")
+    assert file_cache.lookup_blob(checksum, artifact) == cache_path
+    assert cache_path.read_bytes() == b"derived"
+    assert not list(cache_path.parent.glob(".*.tmp"))
+
+    file_cache.remove_blob_from_cache(checksum, artifact)
+    assert file_cache.lookup_blob(checksum, artifact) is None
+    assert not cache_path.exists()
+
+
+def test_remove_supersedes_fill_in_flight(monkeypatch, tmp_path):
+    file_cache = FileCache.get_instance()
+
+    source = tmp_path / "source"
+    source.write_bytes(b"old content")
+    checksum = md5(str(tmp_path).encode()).hexdigest()
+    copy_file = FileCache._FileCache__copy_file
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_copy(self, source, target):
+        started.set()
+        release.wait(5)
+        return copy_file(self, source, target)
+
+    monkeypatch.setattr(FileCache, "_FileCache__copy_file", slow_copy)
+    fill = file_cache.add_blob_to_cache(checksum, source, CacheArtifact.PREPROCESS_JPEG)
+    assert started.wait(5)
+    file_cache.remove_blob_from_cache(checksum, CacheArtifact.PREPROCESS_JPEG)
+    release.set()
+    fill.join()
+
+    assert not file_cache.test_cached_blob(checksum, CacheArtifact.PREPROCESS_JPEG)
+    assert file_cache.get_cached_blob(
+        checksum, source, CacheArtifact.PREPROCESS_JPEG) == source
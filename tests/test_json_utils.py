@@ -0,0 +1,40 @@
+'''JSON Encoding Tests
+'''
+import datetime as dt
+import uuid
+from pathlib import Path
+
+import pytest
+
+from fishsense_data_processing_spider import json_utils
+
+
+def test_dumps_native_types():
+    """Tests that datetimes, UUIDs and paths are encoded without a custom encoder
+    """
+    job_id = uuid.uuid4()
+    document = {
+        'jobId': job_id,
+        'date': dt.datetime(2024, 5, 1, 12, 30, tzinfo=dt.timezone.utc),
+        'day': dt.date(2024, 5, 1),
+        'path': Path('/mnt/data/frame.ORF'),
+        'checksums': ['a' * 32, 'b' * 32],
+    }
+    encoded = json_utils.dumps(document)
+    assert isinstance(encoded, bytes)
+    assert json_utils.loads(encoded) == {
+        'jobId': str(job_id),
+        'date': '2024-05-01T12:30:00+00:00',
+        'day': '2024-05-01',
+        'path': '/mnt/data/frame.ORF',
+        'checksums': ['a' * 32, 'b' * 32],
+    }
+
+
+def test_loads_invalid():
+    """Tests that malformed and non UTF-8 bodies raise the decode error
+    """
+    with pytest.raises(json_utils.JSONDecodeError):
+        json_utils.loads(b'{"checksums": [')
+    with pytest.raises(json_utils.JSONDecodeError):
+        json_utils.loads(b'\xff\xfe')
@@ -0,0 +1,176 @@
+'''Request Limit Tests
+'''
+import asyncio
+
+import pytest
+
+from fishsense_data_processing_spider import limits as limits_module
+from fishsense_data_processing_spider.limits import (ConcurrencyLimiter,
+                                                     LimitExceeded,
+                                                     RequestLimits, TokenBucket,
+                                                     divide_limits)
+
+
+def test_concurrency_limiter():
+    """Tests that slots are handed over in order and that a full queue sheds
+    """
+    async def run():
+        limiter = ConcurrencyLimiter(2, 2, name='test_concurrency', retry_after=3)
+        order = []
+
+        async def hold(idx: int, release: asyncio.Event):
+            await limiter.acquire()
+            order.append(idx)
+            await release.wait()
+            limiter.release()
+
+        releases = [asyncio.Event() for _ in range(4)]
+        tasks = [asyncio.create_task(hold(idx, releases[idx])) for idx in range(4)]
+        await asyncio.sleep(0)
+        assert (limiter.active, limiter.queued) == (2, 2)
+        with pytest.raises(LimitExceeded) as exc_info:
+            await limiter.acquire()
+        assert exc_info.value.retry_after == 3
+
+        releases[1].set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert order == [0, 1, 2]
+        for release in releases:
+            release.set()
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2, 3]
+        assert (limiter.active, limiter.queued) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_concurrency_limiter_cancel():
+    """Tests that cancelled waiters give up their place in the queue
+    """
+    async def run():
+        limiter = ConcurrencyLimiter(1, 1, name='test_concurrency_cancel')
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.queued == 0
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(run())
+
+
+def test_concurrency_limiter_cancel_after_release():
+    """Tests a waiter cancelled just before a release skips it
+    """
+    async def run():
+        limiter = ConcurrencyLimiter(1, 1, name='test_concurrency_cancel_release')
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        # Runs before the waiter handles its cancellation
+        limiter.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert (limiter.active, limiter.queued) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_token_bucket():
+    """Tests that the bucket refills at its rate and allows overdrafts
+    """
+    now = [0.0]
+    bucket = TokenBucket(100, 200, clock=lambda: now[0])
+    assert bucket.reserve(150) == 0
+    assert bucket.reserve(100) == pytest.approx(0.5)
+    now[0] = 0.5
+    assert bucket.reserve(0) == 0
+    now[0] = 10
+    assert bucket.reserve(400) == pytest.approx(2)
+
+
+def test_request_limits():
+    """Tests that keys are limited separately and unlisted permissions are not limited
+    """
+    async def run():
+        limits = RequestLimits({
+            'getRawFile': {
+                'concurrency': 3,
+                'queue': 0,
+                'key_concurrency': 2,
+                'key_queue': 0,
+                'key_byte_rate': '1M',
+                'retry_after': '10s'
+            }
+        })
+        assert await limits.admit('getLaserFrame', 'a') is None
+        held = [await limits.admit('getRawFile', 'a') for _ in range(2)]
+        with pytest.raises(LimitExceeded) as exc_info:
+            await limits.admit('getRawFile', 'a')
+        assert exc_info.value.retry_after == 10
+        held.append(await limits.admit('getRawFile', 'b'))
+        with pytest.raises(LimitExceeded):
+            await limits.admit('getRawFile', 'c')
+        held[0].release()
+        held[0].release()
+        held.append(await limits.admit('getRawFile', 'c'))
+        await held[1].throttle(1000)
+        for admission in held:
+            admission.release()
+
+    asyncio.run(run())
+
+
+def test_divide_limits():
+    """Tests that each web process enforces its share of every limit, rounded up
+    """
+    assert divide_limits({
+        'getRawFile': {
+            'concurrency': 64,
+            'queue': 250,
+            'key_concurrency': 1,
+            'byte_rate': '400M',
+            'retry_after': '5s'
+        },
+        'getMetadata': {}
+    }, 4) == {
+        'getRawFile': {
+            'concurrency': 16,
+            'queue': 63,
+            'key_concurrency': 1,
+            'byte_rate': 100_000_000,
+            'retry_after': '5s'
+        },
+        'getMetadata': {}
+    }
+
+
+def test_idle_keys_dropped(monkeypatch: pytest.MonkeyPatch):
+    """Tests that per key limits are dropped once idle, but kept while in use
+    """
+    monkeypatch.setattr(limits_module._ClassLimits, 'MAX_KEYS', 2)
+
+    async def run():
+        limits = RequestLimits({
+            'getRawFile': {'key_concurrency': 1, 'key_queue': 0}
+        })
+        keys = limits._RequestLimits__classes['getRawFile']._ClassLimits__keys
+        held = await limits.admit('getRawFile', b'a')
+        for key_id in (b'b', b'c', b'd'):
+            (await limits.admit('getRawFile', key_id)).release()
+        assert set(keys) == {b'a', b'd'}
+        # The busy key still holds its slot
+        with pytest.raises(LimitExceeded):
+            await limits.admit('getRawFile', b'a')
+        held.release()
+        for key_id in (b'e', b'f'):
+            (await limits.admit('getRawFile', key_id)).release()
+        assert set(keys) == {b'e', b'f'}
+
+    asyncio.run(run())
@@ -0,0 +1,111 @@
+'''Memory Cache Tests
+'''
+from fishsense_data_processing_spider.memory_cache import (FrequencySketch,
+                                                           MemoryCache,
+                                                           TTLCache)
+
+
+def test_get_put():
+    """Tests basic storage and retrieval
+    """
+    dut = MemoryCache(max_size=1024, max_blob_size=512, name='test_get_put')
+    assert dut.get('a') is None
+    assert dut.put('a', b'a' * 100)
+    assert dut.get('a') == b'a' * 100
+    assert dut.size == 100
+
+
+def test_oversize_blob_rejected():
+    """Tests that blobs above the size threshold are never stored
+    """
+    dut = MemoryCache(max_size=1024, max_blob_size=512, name='test_oversize')
+    assert not dut.put('a', b'a' * 513)
+    assert 'a' not in dut
+    assert dut.size == 0
+
+
+def test_byte_bound():
+    """Tests that the cache never exceeds its byte budget
+    """
+    dut = MemoryCache(max_size=1000, max_blob_size=400, name='test_byte_bound')
+    for idx in range(10):
+        key = f'key{idx}'
+        for _ in range(idx + 1):
+            dut.get(key)
+        dut.put(key, b'x' * 300)
+        assert dut.size <= 1000
+    assert len(dut) == 3
+
+
+def test_admission_rejects_cold_blob():
+    """Tests that a rarely requested blob does not displace a popular one
+    """
+    dut = MemoryCache(max_size=600, max_blob_size=400, name='test_admission')
+    for _ in range(5):
+        dut.get('hot')
+    assert dut.put('hot', b'h' * 400)
+    dut.get('cold')
+    assert not dut.put('cold', b'c' * 400)
+    assert dut.get('hot') == b'h' * 400
+
+    for _ in range(10):
+        dut.get('warm')
+    assert dut.put('warm', b'w' * 400)
+    assert 'hot' not in dut
+
+
+def test_invalidate():
+    """Tests explicit invalidation
+    """
+    dut = MemoryCache(max_size=1024, max_blob_size=512, name='test_invalidate')
+    dut.put(('abc', 'preprocess_jpeg'), b'data')
+    dut.invalidate(('abc', 'preprocess_jpeg'))
+    assert dut.get(('abc', 'preprocess_jpeg')) is None
+    assert dut.size == 0
+
+
+def test_sketch_aging():
+    """Tests that the frequency sketch forgets old accesses
+    """
+    dut = FrequencySketch(1024, sample_size=40)
+    for _ in range(10):
+        dut.increment('a')
+    assert dut.frequency('a') == 10
+    for idx in range(30):
+        dut.increment(idx)
+    assert dut.frequency('a') <= 5
+
+
+def test_ttl_cache_expiry():
+    """Tests that entries expire after their time to live
+    """
+    now = [0.0]
+    dut = TTLCache(max_entries=10, ttl=60, name='test_ttl_expiry', clock=lambda: now[0])
+    dut.put('known', 'path')
+    dut.put('unknown', None, ttl=5)
+    sentinel = object()
+    assert dut.get('known') == 'path'
+    assert dut.get('unknown', sentinel) is None
+    now[0] = 10
+    assert dut.get('unknown', sentinel) is sentinel
+    assert dut.get('known') == 'path'
+    now[0] = 61
+    assert dut.get('known', sentinel) is sentinel
+    assert len(dut) == 0
+
+
+def test_ttl_cache_bound():
+    """Tests that the least recently used entries are dropped when full
+    """
+    dut = TTLCache(max_entries=3, ttl=60, name='test_ttl_bound')
+    for idx in range(3):
+        dut.put(idx, idx)
+    assert dut.get(0) == 0
+    dut.put(3, 3)
+    assert len(dut) == 3
+    assert 1 not in dut
+    assert 0 in dut
+    dut.invalidate(0)
+    assert 0 not in dut
+    dut.clear()
+    assert len(dut) == 0
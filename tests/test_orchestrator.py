@@ -0,0 +1,392 @@
+'''Job Orchestrator Tests
+'''
+import asyncio
+import datetime as dt
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List
+
+import psycopg
+import psycopg.conninfo
+import pytest
+
+from fishsense_data_processing_spider.orchestrator import (
+    JOB_CLAIM_ORDER, PREPROCESS_JOB_QUERIES, JobNotifier, Orchestrator)
+from fishsense_data_processing_spider.sql_utils import (create_async_pool,
+                                                        create_pool)
+
+
+def test_notify_from_thread():
+    """Tests that a notification from another thread wakes a waiter
+    """
+    notifier = JobNotifier()
+
+    async def wait():
+        generation = notifier.generation
+        threading.Timer(0.05, notifier.notify).start()
+        start = time.monotonic()
+        assert await notifier.wait(generation, 5)
+        return time.monotonic() - start
+
+    assert asyncio.run(wait()) < 1
+
+
+def test_notification_not_lost():
+    """Tests that a notification between reading the generation and waiting is not lost
+    """
+    notifier = JobNotifier()
+
+    async def wait():
+        generation = notifier.generation
+        notifier.notify()
+        assert await notifier.wait(generation, 5)
+        assert not await notifier.wait(notifier.generation, 0.01)
+
+    asyncio.run(wait())
+
+
+def test_notify_wakes_one_waiter():
+    """Tests that each notification wakes only the longest waiting waiter
+    """
+    notifier = JobNotifier()
+
+    async def wait():
+        generation = notifier.generation
+        waiters = [asyncio.create_task(notifier.wait(generation, 5)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        notifier.notify()
+        await asyncio.sleep(0.01)
+        woken = [waiter.done() for waiter in waiters]
+        notifier.notify_all()
+        assert all(await asyncio.gather(*waiters))
+        return woken
+
+    assert asyncio.run(wait()) == [True, False, False]
+
+
+def test_notification_passed_on_from_timed_out_waiter():
+    """Tests that a notification for a waiter that already gave up wakes the next waiter
+    """
+    notifier = JobNotifier()
+
+    async def wait():
+        generation = notifier.generation
+        first = asyncio.create_task(notifier.wait(generation, 5))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(notifier.wait(generation, 5))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        # Wakes the first waiter before its cancellation has removed it
+        notifier.notify()
+        await asyncio.gather(first, return_exceptions=True)
+        return await asyncio.wait_for(second, 1)
+
+    assert asyncio.run(wait())
+
+
+class FakeOrchestrator(Orchestrator):
+    """Orchestrator with jobs provided by the test instead of the database
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(pg_pool=None, async_pg_pool=None, **kwargs)
+        self.available: List[Dict[str, Any]] = []
+        self.claims = 0
+
+    async def _claim_jobs_async(self, worker: str, origin: str, n_images: int, expiration: int):
+        self.claims += 1
+        jobs, self.available = self.available, []
+        return {'jobs': jobs}
+
+
+def test_long_poll_woken():
+    """Tests that a long poll returns jobs as soon as it is notified of them
+    """
+    orchestrator = FakeOrchestrator()
+
+    async def poll():
+        async def add_jobs():
+            await asyncio.sleep(0.05)
+            orchestrator.available = [{'jobId': 'a'}]
+            orchestrator.notify_jobs_available()
+        adder = asyncio.create_task(add_jobs())
+        start = time.monotonic()
+        document = await orchestrator.get_next_job_dict_async(
+            worker='test', origin='test', wait=5)
+        await adder
+        return document, time.monotonic() - start
+
+    document, elapsed = asyncio.run(poll())
+    assert document == {'jobs': [{'jobId': 'a'}]}
+    assert elapsed < 1
+    assert orchestrator.claims == 2
+
+
+def test_long_poll_wakes_next():
+    """Tests that woken long polls wake the next one while they find jobs
+    """
+    orchestrator = FakeOrchestrator()
+
+    async def poll():
+        async def add_jobs():
+            await asyncio.sleep(0.05)
+            orchestrator.available = [{'jobId': 'a'}]
+            orchestrator.notify_jobs_available()
+        polls = [asyncio.create_task(orchestrator.get_next_job_dict_async(
+            worker='test', origin='test', wait=0.5)) for _ in range(3)]
+        adder = asyncio.create_task(add_jobs())
+        await asyncio.sleep(0.1)
+        # The first poll claims the job, then wakes the second, which finds none and waits
+        done = [task.done() for task in polls]
+        documents = await asyncio.gather(*polls)
+        await adder
+        return done, documents
+
+    done, documents = asyncio.run(poll())
+    assert done == [True, False, False]
+    assert documents == [{'jobs': [{'jobId': 'a'}]}, {'jobs': []}, {'jobs': []}]
+    # Three initial claims, the first poll's claim and the second poll's empty claim
+    assert orchestrator.claims >= 5
+
+
+def test_long_poll_timeout():
+    """Tests that a long poll rechecks periodically and returns no jobs at its deadline
+    """
+    orchestrator = FakeOrchestrator(long_poll_recheck=0.05)
+
+    start = time.monotonic()
+    document = asyncio.run(orchestrator.get_next_job_dict_async(
+        worker='test', origin='test', wait=0.2))
+    assert document == {'jobs': []}
+    assert 0.2 <= time.monotonic() - start < 1
+    assert orchestrator.claims >= 3
+
+
+def test_no_wait():
+    """Tests that requests without a wait query once
+    """
+    orchestrator = FakeOrchestrator()
+
+    document = asyncio.run(orchestrator.get_next_job_dict_async(worker='test', origin='test'))
+    assert document == {'jobs': []}
+    assert orchestrator.claims == 1
+
+
+class FakeCursor:
+    """Async cursor returning one job of up to two frames per query
+    """
+
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, query: str, params: Dict[str, Any]):
+        self.executed.append((query, params))
+
+    async def fetchall(self):
+        _, params = self.executed[-1]
+        return [{
+            'job_id': uuid.uuid4(),
+            'camera_idx': len(self.executed),
+            'checksums': [f'{params["priority"]}{idx}' for idx in range(min(2, params['limit']))]
+        }]
+
+
+def test_job_claim_queries():
+    """Tests that each job type and priority is claimed with a single query
+    """
+    orchestrator = Orchestrator(pg_pool=None, async_pg_pool=None)
+    cur = FakeCursor()
+    job_document = {'jobs': []}
+
+    async def claim():
+        n_images = 0
+        for job_type, priority in JOB_CLAIM_ORDER:
+            n_images += await orchestrator._get_preprocess_frames_async(
+                job_document=job_document,
+                image_limit=3 - n_images,
+                cur=cur,
+                worker='test',
+                expiration=dt.timedelta(hours=1),
+                origin='key',
+                priority=priority,
+                job_type=job_type)
+            if n_images >= 3:
+                return n_images
+        return n_images
+
+    assert asyncio.run(claim()) == 3
+    assert len(cur.executed) == 2
+    for query, params in cur.executed:
+        assert set(re.findall(r'%\((\w+)\)s', query)) == set(params)
+    assert [job['operation'] for job in job_document['jobs']] == [
+        'preprocess_with_laser', 'preprocess']
+    assert job_document['jobs'][1]['frameIds'] == ['HIGH0']
+    assert all(len(job['jobId']) == 32 for job in job_document['jobs'])
+
+
+def test_job_claim_query_files():
+    """Tests that the job claim queries take the claim parameters and return the job columns
+    """
+    params = Orchestrator._get_job_params(
+        10, 'test', dt.timedelta(hours=1), 'key', 'HIGH', 'preprocess')
+    for path in PREPROCESS_JOB_QUERIES.values():
+        with open(path, 'r', encoding='utf-8') as handle:
+            query = handle.read()
+        assert set(re.findall(r'%\((\w+)\)s', query)) == set(params)
+        returned = re.match(r'\s*(.+?)\s+FROM new_jobs\s+ORDER BY', query.rsplit('SELECT', 1)[1],
+                            re.DOTALL)
+        assert returned is not None
+        assert [column.strip() for column in returned.group(1).split(',')] == [
+            'job_id', 'camera_idx', 'checksums']
+
+
+TEST_POSTGRES = os.environ.get('E4EFS_TEST_POSTGRES')
+
+
+@pytest.fixture
+def job_database():
+    """Creates the spider schema in a temporary schema of the test database
+
+    Set `E4EFS_TEST_POSTGRES` to a connection string to run the database tests.
+
+    Yields:
+        str: Connection string using the temporary schema
+    """
+    if TEST_POSTGRES is None:
+        pytest.skip('E4EFS_TEST_POSTGRES not set')
+    schema = f'test_{uuid.uuid4().hex}'
+    with psycopg.connect(TEST_POSTGRES, autocommit=True) as con:
+        con.execute(f'CREATE SCHEMA {schema}')
+        try:
+            con.execute(f'SET search_path TO {schema}')
+            for script in sorted(Path('postgres/scripts').glob('*.sql')):
+                for statement in script.read_text(encoding='utf-8').split(';'):
+                    # Grants name roles of the production database
+                    if statement.strip() and not statement.strip().startswith('GRANT'):
+                        con.execute(statement)
+            con.execute("""
+                INSERT INTO cameras (idx, serial_number) VALUES (1, 'sn1'), (2, 'sn2');
+                INSERT INTO dives (path) VALUES ('high'), ('low');
+                INSERT INTO canonical_dives (path, priority) VALUES ('high', 'HIGH'), ('low', 'LOW');
+                INSERT INTO images (path, dive, camera_sn, image_md5, ignore, preprocess_jpeg_path)
+                VALUES
+                    ('h1', 'high', 'sn1', 'h1', FALSE, NULL),
+                    ('h2', 'high', 'sn1', 'h2', FALSE, NULL),
+                    ('h3', 'high', 'sn2', 'h3', FALSE, NULL),
+                    ('done', 'high', 'sn2', 'done', FALSE, 'done.JPG'),
+                    ('ignored', 'high', 'sn2', 'ignored', TRUE, NULL),
+                    ('l1', 'low', 'sn1', 'l1', FALSE, NULL),
+                    ('l2', 'low', 'sn1', 'l2', FALSE, NULL);
+                INSERT INTO laser_labels (cksum, complete) VALUES ('done', TRUE), ('h1', FALSE);
+            """)
+            yield conninfo_with_schema(TEST_POSTGRES, schema)
+        finally:
+            con.execute(f'DROP SCHEMA {schema} CASCADE')
+
+
+def conninfo_with_schema(conninfo: str, schema: str) -> str:
+    """Adds a search path to a connection string
+    """
+    return psycopg.conninfo.make_conninfo(conninfo, options=f'-c search_path={schema}')
+
+
+def test_claim_jobs(job_database: str):
+    """Tests that claiming creates one job per camera and assigns exactly its frames
+    """
+    pg_pool = create_pool(job_database, name='test_claim_jobs', min_size=1, max_size=2)
+    pg_pool.open()
+    try:
+        orchestrator = Orchestrator(pg_pool=pg_pool, async_pg_pool=None)
+        job_document = orchestrator.get_next_job_dict(worker='worker', origin='key', n_images=5)
+        with pg_pool.connection() as con:
+            jobs = {row['job_id'].hex: row for row in con.execute('SELECT * FROM jobs')}
+            assignments = {
+                row['image_md5']: (row['preprocess_job_id'], row['preprocess_laser_job_id'])
+                for row in con.execute('SELECT * FROM images')}
+    finally:
+        pg_pool.close()
+
+    documents = {job['jobId']: job for job in job_document['jobs']}
+    assert set(documents) == set(jobs)
+    # Laser preprocessing is claimed first, then the high priority frames, then one of the
+    # low priority frames to fill the limit
+    low_frames = [frame for job in job_document['jobs'] for frame in job['frameIds']
+                  if frame.startswith('l')]
+    assert len(low_frames) == 1
+    assert sorted((job['operation'], job['cameraId'], sorted(job['frameIds']))
+                  for job in job_document['jobs']) == [
+        ('preprocess', 1, ['h1', 'h2']),
+        ('preprocess', 1, low_frames),
+        ('preprocess', 2, ['h3']),
+        ('preprocess_with_laser', 2, ['done']),
+    ]
+    for job_id, job in jobs.items():
+        assert job['worker'] == 'worker'
+        assert job['origin'] == 'key'
+        assert job['job_type'] == documents[job_id]['operation']
+    claimed = {
+        checksum: job_id
+        for job_id, job in documents.items()
+        for checksum in job['frameIds']
+    }
+    for checksum, (preprocess_job, laser_job) in assignments.items():
+        job_id = preprocess_job or laser_job
+        assert (job_id.hex if job_id else None) == claimed.get(checksum)
+    assert assignments['done'][0] is None
+    assert assignments['ignored'] == (None, None)
+
+
+def test_claim_jobs_async(job_database: str):
+    """Tests that the async claim respects priority and the image limit
+    """
+    async def claim():
+        async_pg_pool = create_async_pool(
+            job_database, name='test_claim_jobs_async', min_size=1, max_size=2)
+        await async_pg_pool.open()
+        try:
+            orchestrator = Orchestrator(pg_pool=None, async_pg_pool=async_pg_pool)
+            return await orchestrator.get_next_job_dict_async(
+                worker='worker', origin='key', n_images=2)
+        finally:
+            await async_pg_pool.close()
+
+    job_document = asyncio.run(claim())
+    assert [(job['operation'], job['cameraId'], len(job['frameIds']))
+            for job in job_document['jobs']] == [
+        ('preprocess_with_laser', 2, 1),
+        ('preprocess', 1, 1),
+    ]
+    assert job_document['jobs'][1]['frameIds'][0] in ('h1', 'h2')
+
+
+def test_concurrent_claims_are_disjoint(job_database: str):
+    """Tests that a claim skips frames locked or assigned by another claim
+    """
+    params = Orchestrator._get_job_params(
+        2, 'first', dt.timedelta(hours=1), 'key', 'HIGH', 'preprocess')
+    with open(PREPROCESS_JOB_QUERIES['preprocess'], 'r', encoding='utf-8') as handle:
+        query = handle.read()
+    pg_pool = create_pool(job_database, name='test_concurrent_claims', min_size=1, max_size=2)
+    pg_pool.open()
+    try:
+        with pg_pool.connection() as first:
+            # The first claim holds its frame locks until it commits
+            first_frames = {checksum for row in first.execute(query, params)
+                            for checksum in row['checksums']}
+            orchestrator = Orchestrator(pg_pool=pg_pool, async_pg_pool=None)
+            second = orchestrator.get_next_job_dict(worker='second', origin='key', n_images=5)
+        third = orchestrator.get_next_job_dict(worker='third', origin='key', n_images=5)
+    finally:
+        pg_pool.close()
+
+    second_frames = {frame for job in second['jobs'] for frame in job['frameIds']
+                     if job['operation'] == 'preprocess'}
+    third_frames = {frame for job in third['jobs'] for frame in job['frameIds']}
+    assert len(first_frames) == 2
+    assert first_frames.isdisjoint(second_frames)
+    assert first_frames | second_frames == {'h1', 'h2', 'h3', 'l1', 'l2'}
+    assert not third_frames
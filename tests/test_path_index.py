@@ -0,0 +1,54 @@
+'''Mount Prefix Index Tests
+'''
+from pathlib import Path
+
+import pytest
+
+from fishsense_data_processing_spider.path_index import MountPrefixIndex
+
+MAPPING = {
+    Path('//e4e-nas.ucsd.edu/fishsense_data/REEF/data'): Path('/mnt/reef'),
+    Path('//e4e-nas.ucsd.edu/fishsense_data'): Path('/mnt/fishsense_data'),
+    Path('//e4e-nas.ucsd.edu/fishsense/Fishsense Lite Calibration Parameters'):
+        Path('/mnt/fishsense_lens_cal'),
+}
+
+
+def test_map_matches_relative_to():
+    """Tests that mapping matches the Path based implementation
+    """
+    dut = MountPrefixIndex(MAPPING)
+    unc_path = Path('//e4e-nas.ucsd.edu/fishsense/Fishsense Lite Calibration Parameters/'
+                    'cam 1/lens.pkg')
+    assert dut.map(unc_path) == Path('/mnt/fishsense_lens_cal/cam 1/lens.pkg')
+    assert dut.map(unc_path.as_posix()) == Path('/mnt/fishsense_lens_cal/cam 1/lens.pkg')
+
+
+def test_longest_prefix_wins():
+    """Tests that nested volumes resolve to the deepest mount regardless of order
+    """
+    for mapping in (MAPPING, dict(reversed(MAPPING.items()))):
+        dut = MountPrefixIndex(mapping)
+        assert dut.split('//e4e-nas.ucsd.edu/fishsense_data/REEF/data/dive/img.ORF') == \
+            ('/mnt/reef', 'dive/img.ORF')
+        assert dut.split('//e4e-nas.ucsd.edu/fishsense_data/REEF/other/img.ORF') == \
+            ('/mnt/fishsense_data', 'REEF/other/img.ORF')
+
+
+def test_component_boundaries():
+    """Tests that a volume only matches on whole path components
+    """
+    dut = MountPrefixIndex(MAPPING)
+    with pytest.raises(FileNotFoundError):
+        dut.map('//e4e-nas.ucsd.edu/fishsense_data_extra/img.ORF')
+    assert dut.map('//e4e-nas.ucsd.edu/fishsense_data/') == Path('/mnt/fishsense_data')
+
+
+def test_unmounted():
+    """Tests that unmounted paths raise
+    """
+    dut = MountPrefixIndex(MAPPING)
+    with pytest.raises(FileNotFoundError):
+        dut.map(Path('//other-nas/share/img.ORF'))
+    with pytest.raises(FileNotFoundError):
+        MountPrefixIndex({}).map('/anything')
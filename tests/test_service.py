@@ -0,0 +1,17 @@
+'''Service Tests
+'''
+import pytest
+
+from fishsense_data_processing_spider.service import route_template
+
+
+@pytest.mark.parametrize('pattern,expected', [
+    (r'/$', '/'),
+    (r'/api/v1/data/raw/(?P<checksum>[a-z0-9]+)$', '/api/v1/data/raw/{checksum}'),
+    (r'/api/v1/debug/(?P<job_id>[a-zA-Z0-9-]+)$', '/api/v1/debug/{job_id}'),
+    (r'/api/v1/data/lens_cal/(\d+)$', '/api/v1/data/lens_cal/{}'),
+])
+def test_route_template(pattern: str, expected: str):
+    """Tests that route patterns are reduced to bounded metric labels
+    """
+    assert route_template(pattern) == expected
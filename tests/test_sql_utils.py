@@ -0,0 +1,136 @@
+'''SQL Utilities Tests
+'''
+import asyncio
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+from unittest import mock
+
+import psycopg
+import pytest
+from prometheus_client import REGISTRY
+from psycopg.rows import dict_row
+from psycopg_pool import PoolClosed
+
+from fishsense_data_processing_spider.sql_utils import (create_async_pool,
+                                                        create_pool,
+                                                        do_many_query_async,
+                                                        do_query_async,
+                                                        load_query)
+from fishsense_data_processing_spider.timing import (current_timings,
+                                                     end_request,
+                                                     start_request)
+
+
+def test_create_pool_is_closed():
+    """Tests that the shared pool is created closed with dict rows
+    """
+    pool = create_pool('postgres://postgres@localhost:5432/postgres',
+                       name='test_create_pool',
+                       min_size=1,
+                       max_size=4)
+    assert pool.closed
+    assert pool.kwargs['row_factory'] is dict_row
+    assert pool.max_size == 4
+    with pytest.raises(PoolClosed):
+        pool.getconn(timeout=0.1)
+
+
+def test_create_async_pool_is_closed():
+    """Tests that the shared async pool is created closed with dict rows
+    """
+    async def check():
+        pool = create_async_pool('postgres://postgres@localhost:5432/postgres',
+                                 name='test_create_async_pool',
+                                 min_size=1,
+                                 max_size=4)
+        assert pool.closed
+        assert pool.kwargs['row_factory'] is dict_row
+        with pytest.raises(PoolClosed):
+            await pool.getconn(timeout=0.1)
+    asyncio.run(check())
+
+
+def test_load_query_is_memoized(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Tests that a query file is only read once, whichever way its path is spelled
+
+    Args:
+        tmp_path (Path): Temporary path
+        monkeypatch (pytest.MonkeyPatch): Monkeypatch fixture
+    """
+    monkeypatch.chdir(tmp_path)
+    query = tmp_path / 'select_one.sql'
+    query.write_text('SELECT 1;', encoding='utf-8')
+    assert load_query(query) == 'SELECT 1;'
+    query.write_text('SELECT 2;', encoding='utf-8')
+    assert load_query('select_one.sql') == 'SELECT 1;'
+
+
+def query_count(stem: str) -> float:
+    """Counts the queries timed under a label
+    """
+    return REGISTRY.get_sample_value(
+        'e4efs_spider_query_duration_count', {'query': stem}) or 0
+
+
+def run_timed(query: Callable) -> Tuple[mock.MagicMock, Dict[str, float]]:
+    """Runs a query against a mocked cursor within a request
+
+    Args:
+        query (Callable): Coroutine function taking the cursor
+
+    Returns:
+        Tuple[mock.MagicMock, Dict[str, float]]: Cursor and request phases
+    """
+    cur = mock.create_autospec(psycopg.AsyncCursor, instance=True)
+
+    async def run():
+        token = start_request()
+        try:
+            await query(cur)
+            return current_timings().phases
+        finally:
+            end_request(token)
+    return cur, asyncio.run(run())
+
+
+def test_do_query_async():
+    """Tests that the query file is executed with the parameters and timed under its name
+    """
+    path = 'sql/select_frame_metadata_by_cksums.sql'
+    params = {'cksums': ['a1', 'b2']}
+    count = query_count('select_frame_metadata_by_cksums')
+
+    cur, phases = run_timed(lambda cur: do_query_async(path=path, cur=cur, params=params))
+    cur.execute.assert_awaited_once_with(query=load_query(path), params=params)
+    assert query_count('select_frame_metadata_by_cksums') == count + 1
+    assert 'db' in phases
+
+
+def test_do_many_query_async():
+    """Tests that the query file is executed for every parameter set and timed under its name
+    """
+    path = 'sql/insert_laser_labels.sql'
+    param_seq = [{'cksum': 'a1', 'task_id': 1}, {'cksum': 'b2', 'task_id': 2}]
+    count = query_count('insert_laser_labels')
+
+    cur, phases = run_timed(lambda cur: do_many_query_async(
+        path=path, cur=cur, param_seq=param_seq, returning=True))
+    cur.executemany.assert_awaited_once_with(
+        query=load_query(path), params_seq=param_seq, returning=True)
+    assert query_count('insert_laser_labels') == count + 1
+    assert 'db' in phases
+
+
+def test_do_query_async_raises():
+    """Tests that failed queries are raised and still timed
+    """
+    path = 'sql/select_frame_metadata_by_cksums.sql'
+    count = query_count('select_frame_metadata_by_cksums')
+
+    async def query(cur):
+        cur.execute.side_effect = psycopg.errors.UndefinedTable('images')
+        with pytest.raises(psycopg.errors.UndefinedTable):
+            await do_query_async(path=path, cur=cur, params={'cksums': []})
+
+    run_timed(query)
+    assert query_count('select_frame_metadata_by_cksums') == count + 1
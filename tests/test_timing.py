@@ -0,0 +1,37 @@
+'''Request Timing Tests
+'''
+import asyncio
+import re
+
+from fishsense_data_processing_spider.timing import (current_timings,
+                                                     end_request, phase,
+                                                     start_request)
+
+
+def test_phases():
+    """Tests that phases are summed per request and ignored outside of one
+    """
+    async def handle():
+        token = start_request()
+        try:
+            with phase('db'):
+                await asyncio.sleep(0.01)
+
+            async def query():
+                with phase('db'):
+                    await asyncio.sleep(0.01)
+            await asyncio.create_task(query())
+            with phase('auth'):
+                pass
+            return current_timings()
+        finally:
+            end_request(token)
+
+    with phase('db'):
+        assert current_timings() is None
+    timings = asyncio.run(handle())
+    assert list(timings.phases) == ['db', 'auth']
+    assert timings.phases['db'] >= 0.02
+    assert re.fullmatch(r'db;dur=\d+\.\d, auth;dur=\d+\.\d, total;dur=\d+\.\d',
+                        timings.server_timing())
+    assert current_timings() is None
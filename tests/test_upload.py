@@ -0,0 +1,52 @@
+'''Upload Tests
+'''
+import asyncio
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from fishsense_data_processing_spider.upload import UploadSpool, UploadTooLarge
+
+
+def test_spool_commit(tmp_path: Path):
+    """Tests that a spooled upload is moved into place with its digest
+    """
+    target = tmp_path / 'store' / 'frame.JPG'
+
+    async def upload() -> UploadSpool:
+        spool = UploadSpool(target, max_size=1024)
+        await spool.open()
+        for chunk in (b'a' * 300, b'b' * 300):
+            await spool.write(chunk)
+        assert not target.exists()
+        spool.commit()
+        return spool
+
+    spool = asyncio.run(upload())
+    data = b'a' * 300 + b'b' * 300
+    assert target.read_bytes() == data
+    assert spool.size == 600
+    assert spool.md5 == hashlib.md5(data).hexdigest()
+    assert list(target.parent.iterdir()) == [target]
+
+
+def test_spool_limit(tmp_path: Path):
+    """Tests that oversized uploads are rejected and leave nothing behind
+    """
+    target = tmp_path / 'frame.JPG'
+    target.write_bytes(b'old')
+
+    async def upload():
+        spool = UploadSpool(target, max_size=500)
+        await spool.open()
+        await spool.write(b'x' * 400)
+        try:
+            with pytest.raises(UploadTooLarge):
+                await spool.write(b'x' * 200)
+        finally:
+            spool.discard()
+
+    asyncio.run(upload())
+    assert target.read_bytes() == b'old'
+    assert list(tmp_path.iterdir()) == [target]
@@ -1,10 +1,13 @@
 '''Web Auth Tests
 '''
+import asyncio
 import contextlib
+import datetime as dt
 import sqlite3
+import time
 from pathlib import Path
 
-from fishsense_data_processing_spider.web_auth import KeyStore
+from fishsense_data_processing_spider.web_auth import KeyStore, Permission
 
 
 def test_from_empty(tmp_path: Path):
@@ -22,3 +25,105 @@ def test_from_empty(tmp_path: Path):
         cur.execute("SELECT name FROM sqlite_master WHERE type='table';")
         table_names = {row[0] for row in cur.fetchall()}
         assert table_names == {'keys', 'params', 'version'}
+
+
+def test_authorize_invalidation(tmp_path: Path):
+    """Tests that permission changes take effect despite the authorization cache
+
+    Args:
+        tmp_path (Path): Temporary path
+    """
+    dut = KeyStore(tmp_path / 'keys.db', cache_ttl=3600)
+    key, _ = dut.get_new_key('test')
+    assert dut.authorize_key(key)
+    assert not dut.authorize_key(key, Permission.GET_RAW_FILE)
+
+    dut.set_perm(key, Permission.GET_RAW_FILE, True)
+    assert dut.authorize_key(key, Permission.GET_RAW_FILE)
+    assert not dut.authorize_key(key, Permission.ADMIN)
+
+    dut.set_perm(key, Permission.GET_RAW_FILE, False)
+    assert not dut.authorize_key(key, Permission.GET_RAW_FILE)
+    assert not dut.authorize_key('not a key')
+
+
+def test_authorize_expired(tmp_path: Path):
+    """Tests that cached authorizations still honor key expiry
+
+    Args:
+        tmp_path (Path): Temporary path
+    """
+    dut = KeyStore(tmp_path / 'keys.db', cache_ttl=3600)
+    key, expires = dut.get_new_key(
+        'test', expires=dt.datetime.now() + dt.timedelta(seconds=2))
+    assert dut.authorize_key(key)
+    # Expiry is stored in whole seconds
+    time.sleep(int(expires.timestamp()) + 0.1 - time.time())
+    assert not dut.authorize_key(key)
+
+
+def test_authorize_async(tmp_path: Path):
+    """Tests that concurrent async authorizations of one key share a lookup
+
+    Args:
+        tmp_path (Path): Temporary path
+    """
+    dut = KeyStore(tmp_path / 'keys.db')
+    key, _ = dut.get_new_key('test')
+    dut.set_perm(key, Permission.GET_METADATA, True)
+
+    async def authorize():
+        return await asyncio.gather(
+            *(dut.authorize_key_async(key, Permission.GET_METADATA) for _ in range(8)),
+            dut.authorize_key_async(key, Permission.ADMIN),
+            dut.authorize_key_async('not a key')
+        )
+
+    assert asyncio.run(authorize()) == [True] * 8 + [False, False]
+    dut.close()
+
+
+def test_admin_async(tmp_path: Path):
+    """Tests creating keys and changing permissions from the event loop
+
+    Args:
+        tmp_path (Path): Temporary path
+    """
+    dut = KeyStore(tmp_path / 'keys.db')
+
+    async def administer():
+        key, _ = await dut.get_new_key_async('test')
+        await dut.set_perm_async(key, Permission.GET_RAW_FILE, True)
+        granted = await dut.get_perm_async(key)
+        await dut.set_perm_async(key, Permission.GET_RAW_FILE, False)
+        return key, granted, await dut.get_perm_async(key)
+
+    key, granted, revoked = asyncio.run(administer())
+    assert granted == [Permission.GET_RAW_FILE]
+    assert revoked == []
+    assert dut.authorize_key(key)
+    dut.close()
+
+def test_bulk_perms(tmp_path: Path):
+    """Tests retrieving the permissions of many keys at once
+
+    Args:
+        tmp_path (Path): Temporary path
+    """
+    dut = KeyStore(tmp_path / 'keys.db')
+    reader, _ = dut.get_new_key('reader')
+    admin, _ = dut.get_new_key('admin')
+    dut.set_perm(reader, Permission.GET_RAW_FILE, True)
+    dut.set_perm(reader, Permission.GET_METADATA, True)
+    dut.set_perm(admin, Permission.ADMIN, True)
+
+    assert dut.get_perm(reader) == [Permission.GET_RAW_FILE, Permission.GET_METADATA]
+    assert dut.get_perms([reader, admin, 'not a key']) == {
+        reader: [Permission.GET_RAW_FILE, Permission.GET_METADATA],
+        admin: [Permission.ADMIN],
+        'not a key': [],
+    }
+    assert sorted(dut.list_perms().values()) == [
+        ('admin', [Permission.ADMIN]),
+        ('reader', [Permission.GET_RAW_FILE, Permission.GET_METADATA]),
+    ]